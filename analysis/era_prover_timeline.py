@@ -0,0 +1,244 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from sshtunnel import SSHTunnelForwarder
+
+from query_era_db import connect_to_db, load_json, time_to_seconds
+
+# FRI job tables and the pipeline stage they represent. prover_jobs_fri is
+# split further by aggregation_round.
+STAGE_TABLES = {
+    'basic_witness': 'witness_inputs_fri',
+    'leaf_witness': 'leaf_aggregation_witness_jobs_fri',
+    'node_witness': 'node_aggregation_witness_jobs_fri',
+    'scheduler_witness': 'scheduler_witness_jobs_fri',
+    'compression': 'proof_compression_jobs_fri',
+}
+
+# Order in which the stages of a single batch depend on each other
+STAGE_ORDER = [
+    'basic_witness',
+    'prover_round_0',
+    'leaf_witness',
+    'prover_round_1',
+    'node_witness',
+    'prover_round_2',
+    'prover_round_3',
+    'scheduler_witness',
+    'prover_round_4',
+    'compression',
+]
+
+JOB_COLUMNS = ['l1_batch_number', 'created_at', 'processing_started_at', 'updated_at', 'time_taken']
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Reconstruct the FRI prover pipeline timeline per batch')
+    parser.add_argument('--ssh-username', required=True, help='SSH username')
+    parser.add_argument('--ssh-host', required=True, help='SSH host')
+    parser.add_argument('--ssh-port', type=int, default=22, help='SSH port')
+    parser.add_argument('--ssh-key', required=True, help='Path to SSH private key')
+    parser.add_argument('--db-password', required=True, help='PostgreSQL database password')
+    parser.add_argument('--json-file', required=True, help='Path to JSON file')
+    parser.add_argument('--output-dir', required=True, help='Directory to write the timeline CSV files')
+    parser.add_argument('--resolution', type=float, default=1.0,
+                        help='Sampling interval (sec) of the concurrency time series')
+    return parser.parse_args()
+
+
+def fetch_rows(conn, query, params):
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    columns = [c[0] for c in cursor.description]
+    rows = cursor.fetchall()
+    cursor.close()
+    return pd.DataFrame(rows, columns=columns)
+
+
+def fetch_jobs(conn_prover, batch_numbers):
+    """
+    Collect every FRI job of the given batches into one frame with a
+    `stage` column.
+    """
+    frames = []
+    for stage, table in STAGE_TABLES.items():
+        df = fetch_rows(
+            conn_prover,
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM {table} WHERE l1_batch_number = ANY(%s)",
+            (batch_numbers,)
+        )
+        frames.append(df.assign(stage=stage))
+    df = fetch_rows(
+        conn_prover,
+        f"SELECT {', '.join(JOB_COLUMNS)}, aggregation_round FROM prover_jobs_fri WHERE l1_batch_number = ANY(%s)",
+        (batch_numbers,)
+    )
+    df['stage'] = 'prover_round_' + df['aggregation_round'].astype(str)
+    frames.append(df.drop(columns=['aggregation_round']))
+    return pd.concat(frames, ignore_index=True)
+
+
+def fetch_seal_times(conn_zksync, batch_numbers):
+    df = fetch_rows(
+        conn_zksync,
+        "SELECT number AS l1_batch_number, created_at AS sealed_at FROM l1_batches WHERE number = ANY(%s)",
+        (batch_numbers,)
+    )
+    df['sealed_at'] = pd.to_datetime(df['sealed_at'])
+    return df
+
+
+def normalize_jobs(jobs):
+    """
+    Derive queue wait, compute time and end time for every job. Jobs that
+    never started are dropped.
+    """
+    jobs = jobs.dropna(subset=['processing_started_at']).copy()
+    for column in ('created_at', 'processing_started_at', 'updated_at'):
+        jobs[column] = pd.to_datetime(jobs[column])
+    compute = jobs['time_taken'].map(lambda t: time_to_seconds(t) if t is not None else np.nan)
+    # Fall back to the last update when the job did not record time_taken
+    fallback = (jobs['updated_at'] - jobs['processing_started_at']).dt.total_seconds()
+    jobs['compute_s'] = compute.fillna(fallback).clip(lower=0)
+    jobs['queue_wait_s'] = (jobs['processing_started_at'] - jobs['created_at']).dt.total_seconds().clip(lower=0)
+    jobs['started_at'] = jobs['processing_started_at']
+    jobs['finished_at'] = jobs['started_at'] + pd.to_timedelta(jobs['compute_s'], unit='s')
+    jobs['stage_rank'] = jobs['stage'].map({s: i for i, s in enumerate(STAGE_ORDER)})
+    return jobs.drop(columns=['processing_started_at', 'time_taken'])
+
+
+def stage_summary(jobs):
+    summary = jobs.groupby(['l1_batch_number', 'stage']).agg(
+        stage_rank=('stage_rank', 'first'),
+        jobs=('compute_s', 'size'),
+        compute_s=('compute_s', 'sum'),
+        queue_wait_mean_s=('queue_wait_s', 'mean'),
+        queue_wait_max_s=('queue_wait_s', 'max'),
+        first_created_at=('created_at', 'min'),
+        first_started_at=('started_at', 'min'),
+        last_finished_at=('finished_at', 'max'),
+    ).reset_index()
+    summary['span_s'] = (summary['last_finished_at'] - summary['first_started_at']).dt.total_seconds()
+    return summary.sort_values(['l1_batch_number', 'stage_rank'], ignore_index=True)
+
+
+def critical_path(jobs, stages, seals):
+    """
+    Walk the stages of every batch in pipeline order. The last job to finish
+    in a stage gates the next one, so each stage contributes the time between
+    the previous stage's end and its own end, split into the gating job's
+    compute and the remainder spent waiting.
+    """
+    last = jobs.sort_values('finished_at').groupby(['l1_batch_number', 'stage']).tail(1)
+    last = last[['l1_batch_number', 'stage', 'compute_s', 'finished_at']].rename(
+        columns={'compute_s': 'critical_compute_s'}
+    )
+    path = stages[['l1_batch_number', 'stage', 'stage_rank']].merge(last, on=['l1_batch_number', 'stage'])
+    path = path.merge(seals, on='l1_batch_number', how='left').sort_values(['l1_batch_number', 'stage_rank'])
+    previous_end = path.groupby('l1_batch_number')['finished_at'].shift(1)
+    previous_end = previous_end.fillna(path['sealed_at'])
+    segment = (path['finished_at'] - previous_end).dt.total_seconds()
+    path['critical_s'] = segment
+    path['critical_compute_s'] = np.minimum(path['critical_compute_s'], segment.fillna(np.inf))
+    path['critical_wait_s'] = (segment - path['critical_compute_s']).clip(lower=0)
+    return path[['l1_batch_number', 'stage', 'critical_s', 'critical_compute_s', 'critical_wait_s']]
+
+
+def batch_summary(jobs, path, seals):
+    summary = jobs.groupby('l1_batch_number').agg(
+        jobs=('compute_s', 'size'),
+        compute_s=('compute_s', 'sum'),
+        queue_wait_s=('queue_wait_s', 'sum'),
+        first_started_at=('started_at', 'min'),
+        proved_at=('finished_at', 'max'),
+    ).reset_index()
+    critical = path.groupby('l1_batch_number')[['critical_s', 'critical_compute_s', 'critical_wait_s']].sum()
+    summary = summary.merge(seals, on='l1_batch_number', how='left').merge(
+        critical.reset_index(), on='l1_batch_number', how='left'
+    )
+    summary['e2e_latency_s'] = (summary['proved_at'] - summary['sealed_at']).dt.total_seconds()
+    busy = (summary['proved_at'] - summary['first_started_at']).dt.total_seconds()
+    # Average number of jobs running at once while the batch was being proved
+    summary['avg_concurrency'] = summary['compute_s'] / busy.replace(0, np.nan)
+    return summary
+
+
+def concurrency_series(jobs, resolution):
+    """
+    Number of running and queued jobs per stage over time, across all
+    selected batches, sampled every `resolution` seconds.
+    """
+    starts = jobs[['started_at', 'stage']].rename(columns={'started_at': 'time'}).assign(running=1, queued=-1)
+    ends = jobs[['finished_at', 'stage']].rename(columns={'finished_at': 'time'}).assign(running=-1, queued=0)
+    created = jobs[['created_at', 'stage']].rename(columns={'created_at': 'time'}).assign(running=0, queued=1)
+    events = pd.concat([created, starts, ends], ignore_index=True).sort_values('time', kind='stable')
+
+    counts = events.groupby(['time', 'stage'])[['running', 'queued']].sum().unstack('stage', fill_value=0)
+    counts = counts.cumsum()
+    counts.columns = [f'{kind}_{stage}' for kind, stage in counts.columns]
+    running = [c for c in counts.columns if c.startswith('running_')]
+    queued = [c for c in counts.columns if c.startswith('queued_')]
+    counts['running_total'] = counts[running].sum(axis=1)
+    counts['queued_total'] = counts[queued].sum(axis=1)
+    # The value at each sample point is the state after the last event up to it
+    series = counts.resample(pd.to_timedelta(resolution, unit='s'), label='right', closed='right').last().ffill()
+    series.index.name = 'time'
+    return series.reset_index()
+
+
+def main():
+    args = parse_arguments()
+
+    with SSHTunnelForwarder(
+        (args.ssh_host, args.ssh_port),
+        ssh_username=args.ssh_username,
+        ssh_pkey=args.ssh_key,
+        remote_bind_addresses=[('localhost', 5432), ('localhost', 5432)],
+        local_bind_addresses=[('localhost', 6543), ('localhost', 6544)]
+    ) as tunnel:
+        print("SSH tunnel established")
+
+        conn_zksync = connect_to_db('zksync_local', 6543, args.db_password)
+        conn_prover = connect_to_db('prover_local', 6544, args.db_password)
+
+        if not conn_zksync or not conn_prover:
+            print("Failed to connect to one or more databases, exiting...")
+            return
+
+        data = load_json(args.json_file)
+        titles = {int(item['Batch Number']): item['Title'] for item in data}
+        batch_numbers = sorted(titles)
+
+        jobs = fetch_jobs(conn_prover, batch_numbers)
+        seals = fetch_seal_times(conn_zksync, batch_numbers)
+
+        conn_zksync.close()
+        conn_prover.close()
+
+    jobs = normalize_jobs(jobs)
+    if jobs.empty:
+        print("No started prover jobs found for the given batches")
+        return
+    stages = stage_summary(jobs)
+    path = critical_path(jobs, stages, seals)
+    stages = stages.merge(path, on=['l1_batch_number', 'stage'], how='left')
+    batches = batch_summary(jobs, path, seals)
+    batches.insert(1, 'title', batches['l1_batch_number'].map(titles))
+    series = concurrency_series(jobs, args.resolution)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    batches.to_csv(os.path.join(args.output_dir, 'batches.csv'), index=False)
+    stages.drop(columns=['stage_rank']).to_csv(os.path.join(args.output_dir, 'stages.csv'), index=False)
+    series.to_csv(os.path.join(args.output_dir, 'concurrency.csv'), index=False)
+
+    with pd.option_context('display.float_format', '{:.1f}'.format, 'display.width', 200,
+                           'display.max_columns', None):
+        print(batches[[
+            'l1_batch_number', 'title', 'jobs', 'e2e_latency_s', 'critical_s',
+            'critical_compute_s', 'critical_wait_s', 'queue_wait_s', 'avg_concurrency'
+        ]].to_string(index=False))
+    print(f"Timeline written to {args.output_dir}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+from sshtunnel import SSHTunnelForwarder
+
+from query_era_db import connect_to_db, load_json, compute_results
+from era_prover_timeline import STAGE_TABLES, STAGE_ORDER
+from report_era_results import build_report, write_report
+
+# Job statuses that will not be picked up again by the prover
+DONE_STATUSES = ('successful', 'skipped', 'sent_to_server')
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Monitor FRI proving progress of benchmark batches')
+    parser.add_argument('--ssh-username', required=True, help='SSH username')
+    parser.add_argument('--ssh-host', required=True, help='SSH host')
+    parser.add_argument('--ssh-port', type=int, default=22, help='SSH port')
+    parser.add_argument('--ssh-key', required=True, help='Path to SSH private key')
+    parser.add_argument('--db-password', required=True, help='PostgreSQL database password')
+    parser.add_argument('--json-file', required=True, help='Path to JSON file with the batches to monitor')
+    parser.add_argument('--interval', type=int, default=60, help='Seconds between two polls of the prover DB')
+    parser.add_argument('--wait', action='store_true', help='Keep polling until all batches are proved')
+    parser.add_argument('--max-wait', type=int, default=0, help='Give up waiting after this many seconds (0: never)')
+    parser.add_argument('--output-file', help='Run query_era_db.py analysis into this CSV once all batches are proved')
+    parser.add_argument('--report-dir', help='Write the report_era_results.py tables into this directory once all '
+                                             'batches are proved (and the analysis into its results.csv without '
+                                             '--output-file)')
+    parser.add_argument('--delta-threshold', type=float, default=0.10,
+                        help='Relative same-vs-different delta above which a row is flagged in the report')
+    return parser.parse_args()
+
+
+def fetch_job_status(conn_prover, batch_numbers):
+    """
+    Count the jobs of every batch per stage and status, with the first time
+    one of them started and the last time one was updated.
+    """
+    cursor = conn_prover.cursor()
+    rows = []
+    for stage, table in STAGE_TABLES.items():
+        cursor.execute(
+            f"SELECT l1_batch_number, status, COUNT(*), MIN(processing_started_at), MAX(updated_at) FROM {table} "
+            f"WHERE l1_batch_number = ANY(%s) GROUP BY l1_batch_number, status",
+            (batch_numbers,)
+        )
+        rows.extend((batch, stage, *columns) for batch, *columns in cursor.fetchall())
+    cursor.execute(
+        "SELECT l1_batch_number, aggregation_round, status, COUNT(*), MIN(processing_started_at), MAX(updated_at) "
+        "FROM prover_jobs_fri WHERE l1_batch_number = ANY(%s) GROUP BY l1_batch_number, aggregation_round, status",
+        (batch_numbers,)
+    )
+    rows.extend(
+        (batch, f"prover_round_{round_}", *columns)
+        for batch, round_, *columns in cursor.fetchall()
+    )
+    cursor.close()
+    # Status columns are enums in some versions of the prover schema
+    df = pd.DataFrame(rows, columns=['l1_batch_number', 'stage', 'status', 'jobs', 'first_started', 'last_updated'])
+    df['status'] = df['status'].astype(str)
+    df['first_started'] = pd.to_datetime(df['first_started'])
+    df['last_updated'] = pd.to_datetime(df['last_updated'])
+    return df
+
+
+def job_throughput(status):
+    """
+    Jobs done per minute, from the timestamps of the prover DB: the done
+    jobs over the time from the first job start to the last job finish. Jobs
+    done before this script started count too, so that a single poll has a
+    rate.
+    """
+    done = status[status['status'].isin(DONE_STATUSES)]
+    if done.empty:
+        return 0
+    span_min = (done['last_updated'].max() - status['first_started'].min()).total_seconds() / 60
+    return done['jobs'].sum() / span_min if span_min > 0 else 0
+
+
+def progress_table(status):
+    """
+    Per batch, the number of done/total jobs in every stage ("d/t"), plus
+    whether the batch is fully proved.
+    """
+    status = status.assign(done=status['jobs'].where(status['status'].isin(DONE_STATUSES), 0))
+    per_stage = status.groupby(['l1_batch_number', 'stage'])[['done', 'jobs']].sum()
+    cells = (per_stage['done'].astype(str) + '/' + per_stage['jobs'].astype(str)).unstack('stage', fill_value='-')
+    cells = cells[[s for s in STAGE_ORDER if s in cells.columns]]
+    # A batch is proved once its compression job is done
+    compression = per_stage.reset_index().query("stage == 'compression'").set_index('l1_batch_number')
+    proved = (compression['done'] > 0).reindex(cells.index, fill_value=False)
+    cells['proved'] = proved
+    return cells, int(status['done'].sum()), int(status['jobs'].sum())
+
+
+def print_progress(cells, batch_numbers, titles, done_jobs, total_jobs, throughput):
+    proved = cells.index[cells['proved']].tolist()
+    pending = [b for b in batch_numbers if b not in proved]
+
+    print(f"=== {time.strftime('%Y-%m-%d %H:%M:%S')} ===")
+    cells = cells.reindex(batch_numbers, fill_value='-')
+    cells.insert(0, 'title', [titles[b] for b in cells.index])
+    print(cells.to_string())
+    print(f"Jobs done: {done_jobs}/{total_jobs} known, throughput: {throughput:.1f} jobs/min")
+    print(f"Batches proved: {len(proved)}/{len(batch_numbers)}")
+    # Later rounds are only created when earlier ones finish, so the number of
+    # remaining jobs is a lower bound and the ETA is optimistic.
+    if pending and throughput > 0:
+        eta_min = (total_jobs - done_jobs) / throughput
+        print(f"ETA (lower bound): {eta_min:.1f} min")
+    elif pending:
+        print("ETA: unknown")
+    print()
+    return pending
+
+
+def run_analysis(conn_zksync, conn_prover, data, output_file, report_dir, delta_threshold):
+    print("All batches proved, running analysis")
+    df = pd.DataFrame(compute_results(conn_zksync, conn_prover, data))
+    df.to_csv(output_file, index=False)
+    print(f"Results written to {output_file}")
+    if report_dir:
+        write_report(report_dir, *build_report(df, delta_threshold))
+
+
+def main():
+    args = parse_arguments()
+
+    with SSHTunnelForwarder(
+        (args.ssh_host, args.ssh_port),
+        ssh_username=args.ssh_username,
+        ssh_pkey=args.ssh_key,
+        remote_bind_addresses=[('localhost', 5432), ('localhost', 5432)],
+        local_bind_addresses=[('localhost', 6543), ('localhost', 6544)]
+    ) as tunnel:
+        print("SSH tunnel established")
+
+        conn_zksync = connect_to_db('zksync_local', 6543, args.db_password)
+        conn_prover = connect_to_db('prover_local', 6544, args.db_password)
+
+        if not conn_zksync or not conn_prover:
+            print("Failed to connect to one or more databases, exiting...")
+            return
+        # Every poll should see the latest committed state
+        conn_zksync.autocommit = True
+        conn_prover.autocommit = True
+
+        data = load_json(args.json_file)
+        titles = {int(item['Batch Number']): item['Title'] for item in data}
+        batch_numbers = sorted(titles)
+
+        start = time.time()
+        while True:
+            status = fetch_job_status(conn_prover, batch_numbers)
+            cells, done_jobs, total_jobs = progress_table(status)
+            pending = print_progress(
+                cells, batch_numbers, titles, done_jobs, total_jobs, job_throughput(status)
+            )
+            if not pending or not args.wait:
+                break
+            if args.max_wait and time.time() - start > args.max_wait:
+                print(f"Gave up waiting after {args.max_wait} sec, {len(pending)} batch(es) not proved")
+                conn_zksync.close()
+                conn_prover.close()
+                sys.exit(1)
+            time.sleep(args.interval)
+
+        if not pending and (args.output_file or args.report_dir):
+            output_file = args.output_file or os.path.join(args.report_dir, 'results.csv')
+            run_analysis(conn_zksync, conn_prover, data, output_file, args.report_dir, args.delta_threshold)
+
+        conn_zksync.close()
+        conn_prover.close()
+
+if __name__ == '__main__':
+    main()
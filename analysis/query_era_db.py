@@ -53,6 +53,51 @@ def get_compressed_state_diffs_size(conn, batch_number):
         return len(bytes(result[0]))
     return 0
 
+def compute_results(conn_zksync, conn_prover, data):
+    # Prepare to store results
+    results = []
+
+    # Compute states for each batch
+    for item in data:
+        batch_number = int(item['Batch Number'])
+        title = item['Title']
+        input_value = title.split('_')[0]  # Extract input value correctly
+        payload = '_'.join(title.split('_')[1:])  # Extract payload correctly
+        
+        # Compute witness time
+        witness_time_inputs = get_time_taken_sum(conn_prover, 'witness_inputs_fri', 'l1_batch_number', batch_number)
+        witness_time_scheduler = get_time_taken_sum(conn_prover, 'scheduler_witness_jobs_fri', 'l1_batch_number', batch_number)
+        witness_time = witness_time_inputs + witness_time_scheduler
+        
+        # Compute proving time
+        proving_time_prover = get_time_taken_sum(conn_prover, 'prover_jobs_fri', 'l1_batch_number', batch_number)
+        proving_time_node = get_time_taken_sum(conn_prover, 'node_aggregation_witness_jobs_fri', 'l1_batch_number', batch_number)
+        proving_time_leaf = get_time_taken_sum(conn_prover, 'leaf_aggregation_witness_jobs_fri', 'l1_batch_number', batch_number)
+        proving_time = proving_time_prover + proving_time_node + proving_time_leaf
+        
+        # Combine witness and proving time
+        witness_and_proving_time = witness_time + proving_time
+        
+        # Get compressed_state_diffs size in bytes
+        compressed_state_diffs_size = get_compressed_state_diffs_size(conn_zksync, batch_number)
+        
+        # Append results for Proving Time
+        results.append({
+            'payload': payload,
+            'input': input_value,
+            'metric': 'Proving Time',
+            'value': witness_and_proving_time
+        })
+        
+        # Append results for DA Bytes
+        results.append({
+            'payload': payload,
+            'input': input_value,
+            'metric': 'DA Bytes',
+            'value': compressed_state_diffs_size
+        })
+    return results
+
 def main():
     args = parse_arguments()
 
@@ -76,48 +121,7 @@ def main():
         # Load and parse the JSON file
         data = load_json(args.json_file)
 
-        # Prepare to store results
-        results = []
-
-        # Compute states for each batch
-        for item in data:
-            batch_number = int(item['Batch Number'])
-            title = item['Title']
-            input_value = title.split('_')[0]  # Extract input value correctly
-            payload = '_'.join(title.split('_')[1:])  # Extract payload correctly
-            
-            # Compute witness time
-            witness_time_inputs = get_time_taken_sum(conn_prover, 'witness_inputs_fri', 'l1_batch_number', batch_number)
-            witness_time_scheduler = get_time_taken_sum(conn_prover, 'scheduler_witness_jobs_fri', 'l1_batch_number', batch_number)
-            witness_time = witness_time_inputs + witness_time_scheduler
-            
-            # Compute proving time
-            proving_time_prover = get_time_taken_sum(conn_prover, 'prover_jobs_fri', 'l1_batch_number', batch_number)
-            proving_time_node = get_time_taken_sum(conn_prover, 'node_aggregation_witness_jobs_fri', 'l1_batch_number', batch_number)
-            proving_time_leaf = get_time_taken_sum(conn_prover, 'leaf_aggregation_witness_jobs_fri', 'l1_batch_number', batch_number)
-            proving_time = proving_time_prover + proving_time_node + proving_time_leaf
-            
-            # Combine witness and proving time
-            witness_and_proving_time = witness_time + proving_time
-            
-            # Get compressed_state_diffs size in bytes
-            compressed_state_diffs_size = get_compressed_state_diffs_size(conn_zksync, batch_number)
-            
-            # Append results for Proving Time
-            results.append({
-                'payload': payload,
-                'input': input_value,
-                'metric': 'Proving Time',
-                'value': witness_and_proving_time
-            })
-            
-            # Append results for DA Bytes
-            results.append({
-                'payload': payload,
-                'input': input_value,
-                'metric': 'DA Bytes',
-                'value': compressed_state_diffs_size
-            })
+        results = compute_results(conn_zksync, conn_prover, data)
 
         # Close the connections
         conn_zksync.close()
@@ -0,0 +1,169 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Map the metric names written by query_era_db.py to column names
+METRIC_COLUMNS = {
+    'Proving Time': 'proving_s',
+    'DA Bytes': 'da_bytes',
+}
+
+# Address strategies encoded as the last token of a payload title
+ADDRESS_MODES = ('same', 'different')
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Amortization and cost-per-tx report for query_era_db.py results')
+    parser.add_argument('--input-file', required=True, help='Path to the CSV written by query_era_db.py')
+    parser.add_argument('--output-dir', help='Directory to write the report tables as CSV files')
+    parser.add_argument('--delta-threshold', type=float, default=0.10,
+                        help='Relative same-vs-different delta above which a row is flagged')
+    return parser.parse_args()
+
+
+def normalize_inputs(df):
+    # Titles that do not start with a number cannot be amortized
+    df['input'] = pd.to_numeric(df['input'], errors='coerce')
+    df = df.dropna(subset=['input'])
+    df['input'] = df['input'].astype(int)
+    return df
+
+
+def pivot_results(df):
+    """
+    Turn the long payload,input,metric,value format into one row per
+    (payload, input) with one column per metric, plus per-tx columns.
+    """
+    table = df.pivot_table(index=['payload', 'input'], columns='metric', values='value', aggfunc='mean')
+    table = table.rename(columns=METRIC_COLUMNS)
+    table.columns.name = None
+    table = table[metric_columns(table)]
+    table = table.reset_index().sort_values(['payload', 'input'], ignore_index=True)
+    for column in metric_columns(table):
+        table[f'{column}_per_tx'] = table[column] / table['input']
+    return table
+
+
+def metric_columns(table):
+    return [c for c in METRIC_COLUMNS.values() if c in table.columns]
+
+
+def fit_cost_models(table):
+    """
+    Fit value = fixed + marginal * input for every (payload, metric) with
+    ordinary least squares. The closed form is computed with group-wise
+    aggregates so that all payloads are fitted in one pass.
+    """
+    long = table.melt(
+        id_vars=['payload', 'input'], value_vars=metric_columns(table),
+        var_name='metric', value_name='value'
+    ).dropna(subset=['value'])
+    groups = long.groupby(['payload', 'metric'])
+    dx = long['input'] - groups['input'].transform('mean')
+    dy = long['value'] - groups['value'].transform('mean')
+    long = long.assign(sxx=dx * dx, sxy=dx * dy, syy=dy * dy)
+
+    agg = long.groupby(['payload', 'metric']).agg(
+        points=('input', 'size'),
+        x_mean=('input', 'mean'),
+        y_mean=('value', 'mean'),
+        sxx=('sxx', 'sum'),
+        sxy=('sxy', 'sum'),
+        syy=('syy', 'sum'),
+    )
+    # A single input size (or identical sizes) leaves the slope undefined
+    sxx = agg['sxx'].to_numpy()
+    syy = agg['syy'].to_numpy()
+    marginal = np.divide(agg['sxy'].to_numpy(), sxx, out=np.full(len(agg), np.nan), where=sxx > 0)
+    fixed = agg['y_mean'].to_numpy() - marginal * agg['x_mean'].to_numpy()
+    ss_res = syy - marginal * agg['sxy'].to_numpy()
+    r2 = 1 - np.divide(ss_res, syy, out=np.full(len(agg), np.nan), where=syy > 0)
+
+    models = pd.DataFrame({
+        'points': agg['points'].to_numpy(),
+        'fixed': fixed,
+        'marginal': marginal,
+        'r2': r2,
+    }, index=agg.index)
+    # One row per payload, metrics side by side
+    models = models.unstack('metric')
+    models.columns = [f'{metric}_{stat}' for stat, metric in models.columns]
+    ordered = [
+        f'{metric}_{stat}'
+        for metric in metric_columns(table)
+        for stat in ('points', 'fixed', 'marginal', 'r2')
+        if f'{metric}_{stat}' in models.columns
+    ]
+    return models[ordered].reset_index()
+
+
+def address_deltas(table, threshold):
+    """
+    Compare payloads that only differ in their address strategy
+    (e.g. eth_transfer_same vs eth_transfer_different) at equal input sizes.
+    """
+    parts = table['payload'].str.rsplit('_', n=1, expand=True)
+    if parts.shape[1] < 2:
+        return pd.DataFrame()
+    modes = table.assign(base=parts[0], mode=parts[1])
+    modes = modes[modes['mode'].isin(ADDRESS_MODES)]
+    columns = metric_columns(table)
+    same = modes[modes['mode'] == 'same'].set_index(['base', 'input'])[columns]
+    different = modes[modes['mode'] == 'different'].set_index(['base', 'input'])[columns]
+    joined = same.join(different, how='inner', lsuffix='_same', rsuffix='_different')
+    if joined.empty:
+        return pd.DataFrame()
+
+    flagged = np.zeros(len(joined), dtype=bool)
+    for column in columns:
+        delta = joined[f'{column}_different'] - joined[f'{column}_same']
+        rel = delta / joined[f'{column}_same'].replace(0, np.nan)
+        joined[f'{column}_delta'] = delta
+        joined[f'{column}_delta_pct'] = rel * 100
+        flagged |= (rel.abs() > threshold).fillna(False).to_numpy()
+    joined['flagged'] = flagged
+    return joined.reset_index().sort_values(['base', 'input'], ignore_index=True)
+
+
+def build_report(df, delta_threshold):
+    """
+    The per-tx costs, cost models and address deltas of query_era_db.py
+    results.
+    """
+    table = pivot_results(normalize_inputs(df))
+    return table, fit_cost_models(table), address_deltas(table, delta_threshold)
+
+
+def write_report(output_dir, table, models, deltas):
+    os.makedirs(output_dir, exist_ok=True)
+    table.to_csv(os.path.join(output_dir, 'per_tx_costs.csv'), index=False)
+    models.to_csv(os.path.join(output_dir, 'cost_models.csv'), index=False)
+    deltas.to_csv(os.path.join(output_dir, 'address_deltas.csv'), index=False)
+    print(f"Report tables written to {output_dir}")
+
+
+def main():
+    args = parse_arguments()
+
+    table, models, deltas = build_report(pd.read_csv(args.input_file), args.delta_threshold)
+
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 200,
+                           'display.max_columns', None):
+        print("Per-tx costs:")
+        print(table.to_string(index=False))
+        print()
+        print("Fixed + marginal cost models (value = fixed + marginal * input):")
+        print(models.to_string(index=False))
+        print()
+        print(f"Same vs different address deltas (flagged above {args.delta_threshold:.0%}):")
+        if deltas.empty:
+            print("No same/different payload pairs found")
+        else:
+            print(deltas.to_string(index=False))
+
+    if args.output_dir:
+        write_report(args.output_dir, table, models, deltas)
+
+if __name__ == '__main__':
+    main()
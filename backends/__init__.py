@@ -0,0 +1,20 @@
+import importlib
+
+# Backends selectable with --node: controller class (module, name), default
+# URL (None for offline backends) and chain id. The module of a backend, and
+# thus its dependencies (web3, zksync2, solcx, ...), is only imported when
+# the backend is loaded.
+BACKENDS = {
+    "geth": ("backends.ethereum", "EthereumController", "http://0.0.0.0:8547", 1337),
+    "zksync": ("backends.zksync", "ZkSyncController", "http://localhost:3050", 270),
+    "zksync-in-memory": ("backends.zksync", "ZkSyncController", "http://127.0.0.1:8011", 260),
+    "polygon": ("backends.polygon", "PolygonController", None, 1000),
+}
+
+
+def load_backend(name):
+    """
+    Import a backend and return its controller class, default URL and chain id.
+    """
+    module, class_name, url, chain_id = BACKENDS[name]
+    return getattr(importlib.import_module(module), class_name), url, chain_id
@@ -0,0 +1,114 @@
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+
+# Root of the repository, where the templates are
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Policies of RoutingProvider (see backends/routing.py)
+ROUTING_POLICIES = ["sender", "round-robin", "least-inflight"]
+
+_TRACE = threading.local()
+
+
+def set_trace(trace):
+    """
+    Make `trace` (a dict of stage -> time, or None) the trace of the
+    transaction sent by the current thread.
+    """
+    _TRACE.current = trace
+
+
+def trace_mark(stage):
+    """
+    Record the time of a lifecycle stage of the transaction sent by the
+    current thread. Does nothing when no transaction is being traced.
+    """
+    trace = getattr(_TRACE, "current", None)
+    if trace is not None:
+        trace[stage] = time.time()
+
+
+def read_source_code(file_name: str) -> str:
+    with open(file_name, 'r') as file:
+        return file.read()
+
+
+def check_executable_exists(executable_name):
+    return shutil.which(executable_name) is not None
+
+
+class BlockchainController(ABC):
+    @abstractmethod
+    def __init__(self, provider_url, chain_id, routing="sender"):
+        pass
+
+    def get_address(self, key):
+        _, _, address = self.get_account(key)
+        return address
+
+    @abstractmethod
+    def get_balance(self, addr):
+        """
+        Get the balance of an address
+        """
+        pass
+
+    @abstractmethod
+    def get_account(self, key=None):
+        """
+        Generate or retrieve an account based on a key.
+        """
+        pass
+
+    @abstractmethod
+    def transfer(self, from_priv_key, to_addr, amount, gas):
+        """
+        Transfer native tokens from one account to another.
+        """
+        pass
+
+    @abstractmethod
+    def deploy_contract(self, contract, contract_name, from_priv_key, constructor_args, is_yul=False):
+        """
+        Deploy a contract to the blockchain.
+        """
+        pass
+
+    @abstractmethod
+    def send_transaction(self, transaction, priv_key, from_addr, gas, include_gas_price):
+        """
+        Send a transaction to the blockchain.
+        """
+        pass
+
+    @abstractmethod
+    def execute(self, priv_key, contract, contract_address, func_name, func_args, call, amount):
+        """
+        Execute a transaction in the blockchain.
+        """
+        pass
+
+    @abstractmethod
+    def compile_contract(self, source_code_path, contract_name):
+        """
+        Compile a contract's source code.
+        """
+        pass
+
+    def load_contract(self, contract_path, contract_name, contract_address, is_yul=False):
+        """
+        Get the contract instance of an already deployed contract, as returned
+        by deploy_contract.
+        """
+        raise NotImplementedError
+
+    def get_block_batch(self, block_number):
+        """
+        Get the batch of an L2 block and the batch's lifecycle timestamps
+        (batch, batch_committed, batch_proved), or None if the node does not
+        have batches.
+        """
+        return None
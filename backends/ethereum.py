@@ -0,0 +1,190 @@
+import json
+import os
+
+from eth_typing import HexStr
+from web3 import Web3
+from solcx import install_solc, compile_standard
+from eth_utils import function_abi_to_4byte_selector
+from eth_utils.abi import collapse_if_tuple
+from eth_abi import encode as abi_encode
+from eth_abi.exceptions import EncodingError
+
+from backends.common import BlockchainController, read_source_code, trace_mark
+from backends.routing import make_provider
+
+
+class CallEncoder:
+    """
+    Calldata encoder of one function of a (web3) contract. The selector and
+    argument types are resolved from the ABI once, so that encoding a call
+    only runs eth_abi. Overloaded functions and arguments eth_abi cannot take
+    as is (e.g. structs given as dicts) go through web3.
+    """
+    def __init__(self, contract, func_name, nr_args):
+        self.contract = contract
+        self.func_name = func_name
+        candidates = [
+            f for f in contract.abi
+            if f.get("type") == "function" and f["name"] == func_name and len(f["inputs"]) == nr_args
+        ]
+        self.selector = None
+        if len(candidates) == 1:
+            self.selector = function_abi_to_4byte_selector(candidates[0])
+            self.types = [collapse_if_tuple(i) for i in candidates[0]["inputs"]]
+
+    def encode(self, args):
+        if self.selector is not None:
+            try:
+                return "0x" + (self.selector + abi_encode(self.types, args)).hex()
+            except EncodingError:
+                pass
+        return self.contract.encodeABI(fn_name=self.func_name, args=args)
+
+
+def get_call_encoder(encoders, contract, func_name, nr_args):
+    key = (contract, func_name, nr_args)
+    if key not in encoders:
+        encoders[key] = CallEncoder(contract, func_name, nr_args)
+    return encoders[key]
+
+
+class EthereumController(BlockchainController):
+    def __init__(self, provider_url, chain_id, routing="sender"):
+        # provider_url is a URL or a list of URLs of the same chain, whose
+        # requests are spread according to `routing` (see RoutingProvider)
+        self.w3 = Web3(make_provider(provider_url, Web3.HTTPProvider, routing))
+        if not self.w3.is_connected():
+            raise ConnectionError("Unable to connect to the Ethereum node.")
+        self.provider_url = provider_url
+        self.chain_id = chain_id
+        self.routing = routing
+        # (contract, function, number of arguments) -> CallEncoder
+        self.call_encoders = {}
+
+    def get_balance(self, addr):
+        balance_wei = self.w3.eth.get_balance(addr)
+        balance_eth = self.w3.from_wei(balance_wei, 'ether')
+        return balance_eth
+
+    def get_account(self, key=None):
+        if key is None:
+            priv_key = Web3.to_hex(os.urandom(32))
+            account = self.w3.eth.account.from_key(priv_key)
+        else: 
+            priv_key = HexStr(key)
+            account = self.w3.eth.account.from_key(priv_key)
+        return priv_key, account, account.address
+
+    def transfer(self, from_priv_key, to_addr, amount, gas):
+        from_addr = self.w3.eth.account.from_key(from_priv_key).address
+        amount = Web3.to_wei(amount, 'ether')
+        transaction = {
+            'to': to_addr,
+            'value': amount,
+            "chainId": self.chain_id,
+            "nonce": self.w3.eth.get_transaction_count(from_addr),
+            "from": from_addr,
+            "gasPrice": self.w3.eth.gas_price,
+            "gas": 500000
+        }
+        trace_mark("built")
+        receipt = self.send_transaction(transaction, from_priv_key, from_addr, gas, True)
+        return receipt
+
+    def deploy_contract(self, contract_path, contract_name, from_priv_key, constructor_args, is_yul=False):
+        from_addr = self.w3.eth.account.from_key(from_priv_key).address
+        bytecode, abi, storage_layout = self.compile_contract(contract_path, contract_name)
+        contract = self.w3.eth.contract(abi=abi, bytecode=bytecode)
+        transaction = contract.constructor(*constructor_args).build_transaction({
+            "chainId": self.chain_id,
+            "nonce": self.w3.eth.get_transaction_count(from_addr),
+            "from": from_addr,
+            "gasPrice": self.w3.eth.gas_price,
+        })
+        trace_mark("built")
+        receipt = self.send_transaction(transaction, from_priv_key, from_addr, 8000000, False)
+        contract_address = receipt['contractAddress']
+        contract_instance = self.w3.eth.contract(address=contract_address, abi=abi)
+        return receipt, contract_instance, contract_address, storage_layout
+
+    def load_contract(self, contract_path, contract_name, contract_address, is_yul=False):
+        _, abi, _ = self.compile_contract(contract_path, contract_name)
+        return self.w3.eth.contract(address=contract_address, abi=abi)
+
+    def send_transaction(self, transaction, priv_key, from_addr, gas, include_gas_price):
+        signed_txn = self.w3.eth.account.sign_transaction(transaction, priv_key)
+        trace_mark("signed")
+        trace_mark("submitted")
+        tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        trace_mark("acked")
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        trace_mark("included")
+        return receipt
+
+    def execute(self, priv_key, contract, contract_address, func_name, func_args, call, amount):
+        amount = Web3.to_wei(amount, 'ether')
+        if call:
+            value = getattr(contract.functions, func_name)(*func_args).call()
+            return None, value
+        else:
+            from_addr = self.w3.eth.account.from_key(priv_key).address
+            encoder = get_call_encoder(self.call_encoders, contract, func_name, len(func_args))
+            transaction = {
+                "chainId": self.chain_id,
+                "nonce": self.w3.eth.get_transaction_count(from_addr),
+                "from": from_addr,
+                "to": contract_address,
+                'value': amount,
+                "gasPrice": self.w3.eth.gas_price,
+                "gas": 500000,
+                "data": encoder.encode(func_args),
+            }
+            trace_mark("built")
+            tx_receipt = self.send_transaction(transaction, priv_key, from_addr, 5000000, False)
+            return tx_receipt, None
+
+    def compile_contract(self, source_code_path, contract_name, is_yul=True):
+        src = read_source_code(source_code_path)
+        install_solc('0.8.19')  # You can choose the version you want
+
+        if is_yul:
+            compiled = compile_standard({
+                "language": "Yul",
+                "sources": {
+                    "Contract.yul": {
+                        "content": src
+                    }
+                },
+                "settings": {
+                    "outputSelection": {
+                        "*": {
+                            "*": ["metadata", "evm.bytecode", "evm.sourceMap", "storageLayout"]
+                        }
+                    }
+                }
+            })
+            bytecode = compiled["contracts"]["Contract.yul"]["Contract1"]["evm"]["bytecode"]["object"]
+            abi, storage_layout = get_yul_abi_storage_layout()
+            return bytecode, abi, storage_layout
+        else:
+            compiled_sol = compile_standard({
+                "language": "Solidity",
+                "sources": {
+                    "Contract.sol": {
+                        "content": src
+                    }
+                },
+                "settings": {
+                    "outputSelection": {
+                        "*": {
+                            "*": ["metadata", "evm.bytecode", "evm.sourceMap", "storageLayout"]
+                        }
+                    }
+                }
+            })
+            # Extract bytecode and ABI
+            bytecode = compiled_sol['contracts']['Contract.sol'][contract_name]['evm']['bytecode']['object']
+            abi = json.loads(compiled_sol['contracts']['Contract.sol'][contract_name]['metadata'])['output']['abi']
+            storage_layout = compiled_sol['contracts']['Contract.sol'][contract_name]['storageLayout']
+
+            return bytecode, abi, storage_layout
@@ -0,0 +1,177 @@
+import contextlib
+import copy
+import json
+import os
+
+from eth_utils import to_wei
+
+from backends.common import REPO_DIR, BlockchainController
+
+
+class PolygonController(BlockchainController):
+    """Transactions are appended to the test vectors of the Polygon prover
+    instead of being sent, so no web3 connection is needed. compile_contract
+    is the one of EthereumController.
+    """
+    def __init__(self, provider_url, chain_id, addresses, gen_template=False):
+        assert provider_url is None
+        assert chain_id == 1000
+        self.chain_id = chain_id
+        self.gen_template = gen_template
+
+        # Extra fields for the Polygon network
+        self.template = None
+        self.genesis = None
+        self.txs = None
+        self.address_map = None
+        self.nonces = None
+
+        template_file = os.path.join(REPO_DIR, "templates", "polygon_gen_template.json")
+        with open(template_file, "r") as f:
+            # The ammendable fields are:
+            # - append self.template[0]["genesis"]["accounts"]
+            # - append self.template[0]["genesis"]["contracts"]
+            # - append self.template[0]["txs"]
+            self.template = json.load(f)
+            self.genesis = self.template[0]["genesis"]["accounts"]
+            self.txs = self.template[0]["txs"]
+
+        # Add the addresses to genesis, addresses is a list of lists of priv_key,address
+        self.address_map = {row[0]: row[1] for row in addresses}
+        for priv, addr in self.address_map.items():
+            self.genesis.append({
+               "address": addr,
+               "nonce": "0",
+               "balance": "1000000000000000000000000000",
+               "pvtKey": priv
+            })
+        self.nonces = {g["address"]: int(g["nonce"]) for g in self.genesis}
+        # Contracts of the next batch while setups are combined (see
+        # combined_new_batch)
+        self.pending_contracts = None
+
+    # currently supporting only using a single contract in the new batch,
+    # unless the setups are combined
+    def set_new_batch(self, contract_name, params_deploy):
+        contract = {
+            "contractName": contract_name,
+            "paramsDeploy": params_deploy
+        }
+        if self.pending_contracts is not None:
+            self.pending_contracts.append(contract)
+            return
+        self.start_batch([contract])
+
+    @contextlib.contextmanager
+    def combined_new_batch(self):
+        """
+        Run several setups in the first batch: their set_new_batch calls are
+        collected, and a single new batch with all their contracts is started
+        at the end.
+        """
+        self.pending_contracts = []
+        try:
+            yield
+        finally:
+            contracts, self.pending_contracts = self.pending_contracts, None
+        if contracts:
+            self.start_batch(contracts)
+
+    def start_batch(self, contracts):
+        template_file = os.path.join(REPO_DIR, "templates", "polygon_gen_template.json")
+        temp_template = None
+        with open(template_file, "r") as f:
+            temp_template = json.load(f)[0]
+        temp_template["id"] = 1
+        self.template.append(temp_template)
+        temp_genesis = copy.deepcopy(self.template[0]["genesis"]["accounts"])
+        for el in temp_genesis:
+            el["nonce"] = str(self.nonces[el["address"]])
+        self.template[-1]["genesis"]["accounts"] = temp_genesis
+        self.template[-1]["genesis"]["contracts"] = contracts
+        self.genesis = temp_genesis
+        self.txs = self.template[-1]["txs"]
+
+
+    def get_nonce(self, addr):
+        """Get the nonce for a given address and increment it by 1"""
+        assert addr in self.nonces
+        nonce = self.nonces[addr]
+        self.nonces[addr] += 1 
+        return nonce
+
+    def get_address(self, key):
+        assert key in self.address_map
+        return self.address_map[key]
+
+    def get_balance(self, addr):
+        raise NotImplementedError("get_balance is not supported")
+
+    def get_account(self, key=None):
+        raise NotImplementedError("get_account is not supported")
+
+    def transfer(self, from_priv_key, to_addr, amount, gas):
+        from_addr = self.get_address(from_priv_key)
+        amount = to_wei(amount, 'ether')
+        transaction = {
+            'to': to_addr,
+            'value': str(amount),
+            "chainId": self.chain_id,
+            "nonce": self.get_nonce(from_addr),
+            "from": from_addr,
+            "gasPrice": "1000000000",
+            "gasLimit": 1000000000
+        }
+        receipt = self.send_transaction(transaction, from_priv_key, from_addr, gas, True)
+        return receipt
+
+    def deploy_contract(self, contract_path, contract_name, from_priv_key, constructor_args, is_yul=False):
+        assert self.gen_template
+        from_addr = self.get_address(from_priv_key)
+        transaction = {
+            "from": from_addr,
+            "to": "deploy",
+            "nonce": self.get_nonce(from_addr),
+            "value": "0",
+            "contractName": contract_name,
+            "params": constructor_args,
+            "gasLimit": 10000000,
+            "gasPrice": "1000000000",
+            "chainId": self.chain_id
+        }
+        receipt = self.send_transaction(transaction, from_priv_key, from_addr, None, True)
+        # Return the transaction instead of a receipt
+        # Return contract name instead of contract address
+        return receipt, None, contract_name, None
+
+    def send_transaction(self, transaction, priv_key, from_addr, gas, include_gas_price):
+        # Instead of the receipt just add the transaction to the batch and return the JSON
+        self.txs.append(transaction)
+        return transaction
+
+    def execute(self, priv_key, contract, contract_address, func_name, func_args, call, amount):
+        assert self.gen_template
+        amount = to_wei(amount, 'ether')
+        if call:
+            raise NotImplementedError("call is not implemented yet")
+        else:
+            from_addr = self.get_address(priv_key)
+            transaction = {
+                "from": from_addr,
+                "to": "contract",
+                "nonce": self.get_nonce(from_addr),
+                "value": amount,
+                "contractName": contract_address,
+                "function": func_name,
+                "params": func_args,
+                "gasLimit": 100000,
+                "gasPrice": "1000000000",
+                "chainId": self.chain_id
+            }
+            tx_receipt = self.send_transaction(transaction, priv_key, from_addr, None, False)
+            return tx_receipt, None
+
+    def compile_contract(self, source_code_path, contract_name, is_yul=True):
+        # Imported here so that generating vectors does not load web3
+        from backends.ethereum import EthereumController
+        return EthereumController.compile_contract(self, source_code_path, contract_name, is_yul)
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import requests
+import urllib3
+from web3 import HTTPProvider
+
+from backends.common import ROUTING_POLICIES
+
+
+_ROUTE = threading.local()
+
+# Requests that must not be sent twice: if the connection fails after the
+# request went out, the node may have accepted the transaction
+SEND_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction"}
+
+# Requests that follow a transaction of a sender, routed by sender under the
+# "sender" policy
+SENDER_METHODS = {"eth_getTransactionCount", "eth_getTransactionReceipt", "eth_getTransactionByHash"} | SEND_METHODS
+
+
+def connection_not_established(error):
+    """
+    Whether a ConnectionError of requests happened before the request was
+    sent: a connect timeout or a failed connection setup (refused, DNS, ...),
+    as opposed to e.g. the node closing the connection after the request.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+
+
+class RoutingProvider(HTTPProvider):
+    """
+    Spreads the requests of a controller over several RPC endpoints of the
+    same chain (e.g. API nodes in front of one sequencer):
+    - "sender": the nonce read, the send and the receipt polling of a thread
+      go to the endpoint of the sender whose nonce it read last, so that they
+      hit the same node and the nonces of a sender stay in order; all other
+      requests (gas price, estimates, calls, ...) are round-robin
+    - "round-robin": every request goes to the next endpoint
+    - "least-inflight": every request goes to the endpoint with the fewest
+      requests in flight
+    Endpoints are checked every `health_interval` sec with eth_blockNumber and
+    skipped while they fail or lag more than `max_lag` blocks behind the
+    highest one. A request that cannot reach its endpoint is retried on the
+    next one; a transaction send only if the connection to its endpoint could
+    not be established, since it may otherwise have been accepted.
+    """
+    def __init__(self, endpoints, policy="sender", health_interval=2, max_lag=5):
+        assert policy in ROUTING_POLICIES, f"Unknown routing policy {policy}"
+        super().__init__(endpoints[0].endpoint_uri)
+        self.endpoints = endpoints
+        self.policy = policy
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        self.healthy = [True] * len(endpoints)
+        self.inflight = [0] * len(endpoints)
+        self.requests = [0] * len(endpoints)
+        self.failures = [0] * len(endpoints)
+        self.next = 0
+        self.lock = threading.Lock()
+        if health_interval > 0:
+            threading.Thread(target=self.check_health_loop, daemon=True).start()
+
+    def __str__(self):
+        return f"RPC connections {', '.join(e.endpoint_uri for e in self.endpoints)} ({self.policy})"
+
+    def choose(self, method, params, tried):
+        count = len(self.endpoints)
+        candidates = [i for i in range(count) if i not in tried and self.healthy[i]]
+        # With no healthy endpoint left, still try the remaining ones
+        candidates = candidates or [i for i in range(count) if i not in tried]
+        if self.policy == "sender":
+            if method == "eth_getTransactionCount":
+                _ROUTE.sender = int(params[0], 16)
+            sender = getattr(_ROUTE, "sender", None)
+            if sender is not None and method in SENDER_METHODS:
+                # The sender's own endpoint, or the next candidate after it
+                return min(candidates, key=lambda i: (i - sender) % count)
+        if self.policy == "least-inflight":
+            return min(candidates, key=lambda i: self.inflight[i])
+        self.next += 1
+        return candidates[self.next % len(candidates)]
+
+    def make_request(self, method, params):
+        tried = set()
+        while True:
+            with self.lock:
+                index = self.choose(method, params, tried)
+                self.inflight[index] += 1
+                self.requests[index] += 1
+            try:
+                return self.endpoints[index].make_request(method, params)
+            except requests.exceptions.ConnectionError as e:
+                with self.lock:
+                    self.failures[index] += 1
+                    self.healthy[index] = False
+                tried.add(index)
+                if len(tried) == len(self.endpoints):
+                    raise
+                if method in SEND_METHODS and not connection_not_established(e):
+                    raise
+            finally:
+                with self.lock:
+                    self.inflight[index] -= 1
+
+    def check_health(self):
+        heights = []
+        for endpoint in self.endpoints:
+            try:
+                response = requests.post(
+                    endpoint.endpoint_uri, json={"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []},
+                    timeout=max(self.health_interval, 1)
+                )
+                heights.append(int(response.json()["result"], 16))
+            except (requests.exceptions.RequestException, ValueError, KeyError, TypeError):
+                heights.append(None)
+        best = max((h for h in heights if h is not None), default=None)
+        with self.lock:
+            for i, height in enumerate(heights):
+                healthy = height is not None and best - height <= self.max_lag
+                if healthy != self.healthy[i]:
+                    print(f"Endpoint {self.endpoints[i].endpoint_uri} is {'back' if healthy else 'down'}",
+                          f"(block {height}, highest {best})")
+                self.healthy[i] = healthy
+
+    def check_health_loop(self):
+        while True:
+            self.check_health()
+            time.sleep(self.health_interval)
+
+    def print_summary(self):
+        print("=======", f"Endpoints ({self.policy})", "=======")
+        for i, endpoint in enumerate(self.endpoints):
+            print(f"{endpoint.endpoint_uri}: {self.requests[i]} request(s), {self.failures[i]} failed,",
+                  "healthy" if self.healthy[i] else "unhealthy")
+
+
+def make_provider(provider_url, provider_cls, routing="sender"):
+    """
+    Provider of one URL, or a RoutingProvider over a list of URLs.
+    """
+    if isinstance(provider_url, str):
+        return provider_cls(provider_url)
+    if len(provider_url) == 1:
+        return provider_cls(provider_url[0])
+    return RoutingProvider([provider_cls(url) for url in provider_url], routing)
@@ -0,0 +1,298 @@
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime
+
+import web3
+from eth_typing import HexStr
+from web3 import Web3
+from eth_account import Account
+from eth_utils import to_checksum_address
+from zksync2.core.types import ZkBlockParams
+from zksync2.module.module_builder import ZkWeb3
+from zksync2.module.zksync_provider import ZkSyncProvider
+from zksync2.signer.eth_signer import PrivateKeyEthSigner
+from zksync2.transaction.transaction_builders import TxFunctionCall
+from zksync2.transaction.transaction_builders import TxCreateContract
+from zksync2.core.types import EthBlockParams
+from zksync2.manage_contracts.contract_encoder_base import ContractEncoder
+
+from backends.common import BlockchainController, check_executable_exists, trace_mark
+from backends.ethereum import get_call_encoder
+from backends.routing import make_provider
+
+
+def run_zksolc(file_path, is_yul):
+    if is_yul:
+        cmd: list[Unknown]  = ["zksolc", "--yul", "--bin", file_path]
+    else:
+        cmd: list[Unknown]  = ["zksolc", "--combined-json", "abi,bin,storage-layout", file_path]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    
+    # Check if zksolc completed successfully
+    if result.returncode != 0:
+        print(f"zksolc failed with the following error:\n{result.stderr}")
+
+    try:
+        # Parsing the output
+        if is_yul:
+            bytecode = result.stdout.strip().split(' ')[-1]
+            abi, storage_layout = get_yul_abi_storage_layout()
+            data = {
+                'contracts': {file_path + ":Contract1": {
+                    'abi': abi, 'storage-layout': storage_layout, 
+                    'bin': bytecode, 'factory-deps': {}
+                }},
+                # Use some hardcoded values here
+                'version': '0.8.20+commit.a1b79de6.Darwin.appleclang', 'zk_version': '1.3.13'
+            }
+        else:
+            data = json.loads(result.stdout)
+        return data
+
+    except json.JSONDecodeError as e:
+        # Handle JSON parsing errors
+        print(f"Failed to parse zksolc output as JSON. Error: {e}")
+        sys.exit(1)
+
+
+class ZkSyncController(BlockchainController):
+    def __init__(self, provider_url, chain_id, routing="sender"):
+        # Same as ZkSyncBuilder.build, with one or more URLs
+        self.w3 = ZkWeb3(make_provider(provider_url, ZkSyncProvider, routing))
+        #if not self.w3.is_connected():
+        #    raise ConnectionError("Unable to connect to the zksync node.")
+        self.provider_url = provider_url
+        self.chain_id = chain_id
+        self.routing = routing
+        # (contract_path, contract_name, is_yul) -> (ContractEncoder, storage layout)
+        self.contract_encoders = {}
+        # (contract_path, contract_name, is_yul, repr(constructor_args)) -> calldata
+        self.encoded_constructors = {}
+        self.encoders_lock = threading.Lock()
+        # (contract, function, number of arguments) -> CallEncoder
+        self.call_encoders = {}
+
+    def get_balance(self, addr):
+        balance_wei = self.w3.eth.get_balance(addr)
+        balance_eth = self.w3.from_wei(balance_wei, 'ether')
+        return balance_eth
+
+    def get_account(self, key=None):
+        if key is None:
+            priv_key = Web3.to_hex(os.urandom(32))
+            account = Account.from_key(priv_key)
+        else: 
+            priv_key = HexStr(key)
+            account = Account.from_key(priv_key)
+        return priv_key, account, account.address
+
+    def transfer(self, from_priv_key, to_addr, amount, gas):
+        account = Account.from_key(from_priv_key)
+        from_addr = account.address
+        # Signer is used to generate signature of provided transaction
+        signer = PrivateKeyEthSigner(account, self.chain_id)
+
+        # Get nonce of ETH address on zkSync network
+        nonce = self.w3.zksync.get_transaction_count(
+            from_addr, ZkBlockParams.COMMITTED.value
+        )
+
+        # Get current gas price in Wei
+        gas_price = self.w3.zksync.gas_price
+
+        # Create transaction
+        tx_func_call = TxFunctionCall(
+            chain_id=self.chain_id,
+            nonce=nonce,
+            from_=from_addr,
+            to=to_checksum_address(to_addr),
+            value=self.w3.to_wei(amount, "ether"),
+            data=HexStr("0x"),
+            gas_limit=0,  # UNKNOWN AT THIS STATE
+            gas_price=gas_price,
+            max_priority_fee_per_gas=100_000_000,
+        )
+
+        # ZkSync transaction gas estimation
+        estimate_gas = self.w3.zksync.eth_estimate_gas(tx_func_call.tx)
+
+        # Convert transaction to EIP-712 format
+        tx_712 = tx_func_call.tx712(estimate_gas)
+        trace_mark("built")
+
+        # Sign message & encode it
+        signed_message = signer.sign_typed_data(tx_712.to_eip712_struct())
+
+        # Encode signed message
+        msg = tx_712.encode(signed_message)
+        trace_mark("signed")
+
+        # Transfer ETH
+        trace_mark("submitted")
+        tx_hash = self.w3.zksync.send_raw_transaction(msg)
+        trace_mark("acked")
+
+        # Wait for transaction to be included in a block
+        tx_receipt = self.w3.zksync.wait_for_transaction_receipt(
+            tx_hash, timeout=240, poll_latency=0.5
+        )
+        trace_mark("included")
+        return tx_receipt
+
+    def deploy_contract(self, contract_path, contract_name, from_priv_key, constructor_args, is_yul=False):
+        account = Account.from_key(from_priv_key)
+        # Signer is used to generate signature of provided transaction
+        signer = PrivateKeyEthSigner(account, self.chain_id)
+
+        # Get nonce of ETH address on zkSync network
+
+        nonce = self.w3.zksync.get_transaction_count(
+            account.address, EthBlockParams.PENDING.value
+        )
+
+        # Get current gas price in Wei
+        gas_price = self.w3.zksync.gas_price
+
+        encoded_contract, storage_layout, encoded_constructor = self.get_contract_encoder(
+            contract_path, contract_name, is_yul, constructor_args
+        )
+
+        # Create deployment contract transaction
+        create_contract = TxCreateContract(
+            web3=self.w3,
+            chain_id=self.chain_id,
+            nonce=nonce,
+            from_=account.address,
+            gas_limit=0,  # UNKNOWN AT THIS STATE
+            gas_price=gas_price,
+            bytecode=encoded_contract.bytecode,
+            call_data=encoded_constructor,
+        )
+
+        # ZkSync transaction gas estimation
+        estimate_gas = self.w3.zksync.eth_estimate_gas(create_contract.tx)
+
+        # Convert transaction to EIP-712 format
+        tx_712 = create_contract.tx712(estimate_gas)
+        trace_mark("built")
+
+        # Sign message
+        signed_message = signer.sign_typed_data(tx_712.to_eip712_struct())
+
+        # Encode signed message
+        msg = tx_712.encode(signed_message)
+        trace_mark("signed")
+
+        # Deploy contract
+        trace_mark("submitted")
+        tx_hash = self.w3.zksync.send_raw_transaction(msg)
+        trace_mark("acked")
+
+        # Wait for deployment contract transaction to be included in a block
+        tx_receipt = self.w3.zksync.wait_for_transaction_receipt(
+            tx_hash, timeout=240, poll_latency=0.5
+        )
+        trace_mark("included")
+        return tx_receipt, encoded_contract, tx_receipt["contractAddress"], storage_layout
+
+    def get_contract_encoder(self, contract_path, contract_name, is_yul, constructor_args=None):
+        """
+        Compile a contract and build its ContractEncoder once, and encode each
+        distinct set of constructor arguments once. Returns the encoder, the
+        storage layout and the encoded constructor (None without arguments).
+        """
+        key = (contract_path, contract_name, is_yul)
+        with self.encoders_lock:
+            if key not in self.contract_encoders:
+                compiled_contract = self.compile_contract(contract_path, contract_name, is_yul)
+                contract = compiled_contract['contracts'][contract_path + ":" + contract_name]
+                self.contract_encoders[key] = (
+                    ContractEncoder(self.w3, abi=contract['abi'], bytecode=contract['bin']),
+                    contract['storage-layout']
+                )
+            encoded_contract, storage_layout = self.contract_encoders[key]
+            if constructor_args is None:
+                return encoded_contract, storage_layout, None
+
+            args_key = key + (repr(constructor_args),)
+            if args_key not in self.encoded_constructors:
+                # Encode the constructor arguments
+                self.encoded_constructors[args_key] = encoded_contract.encode_constructor(*constructor_args)
+            return encoded_contract, storage_layout, self.encoded_constructors[args_key]
+
+    def load_contract(self, contract_path, contract_name, contract_address, is_yul=False):
+        encoded_contract, _, _ = self.get_contract_encoder(contract_path, contract_name, is_yul)
+        return encoded_contract
+
+    def execute(self, priv_key, contract, contract_address, func_name, func_args, call, amount):
+        account = Account.from_key(priv_key)
+        if call:
+            value = getattr(contract.contract.functions, func_name)(*func_args).call({
+                "from": account.address,
+                "to": contract_address
+            })
+            return None, value
+        else:
+            gas_price = self.w3.zksync.gas_price
+
+            # Get nonce of ETH address on zkSync network
+            nonce = self.w3.zksync.get_transaction_count(account.address, EthBlockParams.LATEST.value)
+
+            # Execute function
+            try:
+                encoder = get_call_encoder(self.call_encoders, contract.contract, func_name, len(func_args))
+                tx = {
+                    "chainId": self.chain_id,
+                    "nonce": nonce,
+                    "from": account.address,
+                    "value": self.w3.to_wei(amount, "ether"),
+                    "maxPriorityFeePerGas": 1_000_000,
+                    "maxFeePerGas": gas_price,
+                    "to": contract_address,
+                    "data": encoder.encode(func_args),
+                }
+                tx["gas"] = self.w3.eth.estimate_gas(tx)
+                trace_mark("built")
+                # Sign transaction
+                signed = account.sign_transaction(tx)
+                trace_mark("signed")
+
+                # Send transaction to zkSync network
+                trace_mark("submitted")
+                tx_hash = self.w3.zksync.send_raw_transaction(signed.rawTransaction)
+                trace_mark("acked")
+
+                # Wait for transaction to be finalized
+                receipt = self.w3.zksync.wait_for_transaction_receipt(tx_hash)
+                trace_mark("included")
+            except web3.exceptions.ContractLogicError as e:
+                print("ContractLogicError:", e)
+                receipt = {"status": 0}
+
+            return receipt, None
+
+    def send_transaction(self, transaction, priv_key, from_addr, gas, include_gas_price):
+        raise NotImplementedError
+
+    def get_block_batch(self, block_number):
+        # Seal times are not exposed over RPC; the L1 commit is the closest
+        # upper bound
+        details = self.w3.provider.make_request("zks_getBlockDetails", [block_number]).get("result")
+        if not details or details.get("l1BatchNumber") is None:
+            return None
+        times = {"batch": details["l1BatchNumber"]}
+        for stage, field in (("batch_committed", "committedAt"), ("batch_proved", "provenAt")):
+            value = details.get(field)
+            times[stage] = datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() if value else None
+        return times
+
+    def compile_contract(self, source_code_path, contract_name, is_yul): 
+        if not check_executable_exists("zksolc"):
+            print("Error: zksolc compiler is not installed")
+            sys.exit(1)
+        combined_json = run_zksolc(source_code_path, is_yul)
+        return combined_json
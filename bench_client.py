@@ -0,0 +1,172 @@
+import argparse
+import csv
+import functools
+import multiprocessing
+import socket
+import time
+
+from eth_account import Account
+from zksync2.manage_contracts.contract_encoder_base import ContractEncoder
+
+import mock_node
+import runner
+from backends.ethereum import EthereumController
+from backends.zksync import ZkSyncController
+
+ERC20_ABI = [{
+    "type": "function", "name": "transfer", "stateMutability": "nonpayable",
+    "inputs": [{"name": "to", "type": "address"}, {"name": "amount", "type": "uint256"}],
+    "outputs": [{"name": "", "type": "bool"}],
+}]
+
+GREETER_ABI = [{
+    "type": "constructor", "stateMutability": "nonpayable",
+    "inputs": [{"name": "_greeting", "type": "uint256"}],
+}]
+
+# Placeholder bytecode of a single 32-byte word, which is also a valid zkSync
+# bytecode length
+GREETER_BYTECODE = "0x" + "00" * 32
+
+
+class PrecompiledEthereumController(EthereumController):
+    """
+    Skip solc so that deployments only measure the client side.
+    """
+    def compile_contract(self, source_code_path, contract_name, is_yul=True):
+        return GREETER_BYTECODE, GREETER_ABI, {}
+
+
+class PrecompiledZkSyncController(ZkSyncController):
+    """
+    Skip zksolc so that deployments only measure the client side.
+    """
+    def compile_contract(self, source_code_path, contract_name, is_yul):
+        return {"contracts": {f"{source_code_path}:{contract_name}": {
+            "abi": GREETER_ABI, "bin": GREETER_BYTECODE, "storage-layout": {},
+        }}}
+
+
+def transfer_path(controller, sender, recipient):
+    return functools.partial(runner.transfer_task, controller, sender, recipient, 1, 21000)
+
+
+def erc20_path(controller, sender, recipient):
+    if isinstance(controller, ZkSyncController):
+        instance = ContractEncoder(controller.w3, ERC20_ABI)
+    else:
+        instance = controller.w3.eth.contract(address=recipient, abi=ERC20_ABI)
+    return functools.partial(runner.execute_task, controller, sender, instance, recipient, "transfer", [recipient, 10])
+
+
+def deploy_path(controller, sender, recipient):
+    return functools.partial(runner.deploy_task, controller, sender, "contracts/Greeter.sol", "Greeter", [10])
+
+
+# Benchmark path -> controller class and task factory
+BENCHMARK_PATHS = {
+    "eth_transfer": (PrecompiledEthereumController, transfer_path),
+    "eth_erc20": (PrecompiledEthereumController, erc20_path),
+    "eth_deploy": (PrecompiledEthereumController, deploy_path),
+    "zksync_transfer": (PrecompiledZkSyncController, transfer_path),
+    "zksync_erc20": (PrecompiledZkSyncController, erc20_path),
+    "zksync_deploy": (PrecompiledZkSyncController, deploy_path),
+}
+
+REPORT_PHASES = ["build", "sign", "submit_to_ack", "ack_to_receipt", "end_to_end"]
+
+
+def start_mock_node(port, chain_id, latency):
+    """
+    Run the mock node in its own process, so that its CPU time is not
+    counted against the client.
+    """
+    process = multiprocessing.get_context("spawn").Process(
+        target=mock_node.serve, args=("127.0.0.1", port, chain_id, latency), daemon=True
+    )
+    process.start()
+    deadline = time.time() + 30
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            assert time.time() < deadline, "Mock node did not start"
+            time.sleep(0.1)
+
+
+def run_path(name, url, chain_id, txs, concurrency):
+    """
+    Send `txs` transactions of a path and return its client-side throughput and
+    mean latency (ms) per lifecycle phase.
+    """
+    controller_cls, make_task = BENCHMARK_PATHS[name]
+    controller = controller_cls(url, chain_id)
+    senders = [Account.create() for _ in range(min(txs, 64))]
+    tasks = [
+        make_task(controller, senders[i % len(senders)].key.hex(), senders[(i + 1) % len(senders)].address)
+        for i in range(txs)
+    ]
+    # Warm up connections and caches outside of the measurement
+    runner.traced(tasks[0])
+
+    runner._RECORDER = runner.CellRecorder(name)
+    start = time.time()
+    runner.run_block_tasks(controller, tasks, concurrency)
+    elapsed = time.time() - start
+    histograms = runner._RECORDER.histograms()
+    runner._RECORDER = None
+
+    row = {"path": name, "txs": txs, "concurrency": concurrency, "elapsed": elapsed, "txs_per_sec": txs / elapsed}
+    for phase in REPORT_PHASES:
+        row[f"{phase}_ms"] = histograms[phase].summary()["mean"] * 1000 if phase in histograms else None
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client-side throughput of the controllers against a mock node")
+    parser.add_argument('--paths', nargs='+', choices=list(BENCHMARK_PATHS), default=list(BENCHMARK_PATHS))
+    parser.add_argument('--txs', default=200, type=int)
+    parser.add_argument('--concurrency', nargs='+', default=[1], type=int)
+    # Delay (sec) the mock node adds to every request
+    parser.add_argument('--latency', default=0, type=float)
+    parser.add_argument('--port', default=18545, type=int)
+    parser.add_argument('--chain-id', default=270, type=int)
+    # Benchmark an already running node instead of starting the mock node
+    parser.add_argument('--url')
+    parser.add_argument('--output-file', help="Write the results to this CSV")
+    args = parser.parse_args()
+
+    url = args.url
+    process = None
+    if url is None:
+        process = start_mock_node(args.port, args.chain_id, args.latency)
+        url = f"http://127.0.0.1:{args.port}"
+
+    rows = []
+    try:
+        for name in args.paths:
+            for concurrency in args.concurrency:
+                try:
+                    row = run_path(name, url, args.chain_id, args.txs, concurrency)
+                except Exception as e:
+                    print(f"{name} (concurrency {concurrency}): failed: {e!r}")
+                    continue
+                rows.append(row)
+                phases = ", ".join(
+                    f"{phase} {row[f'{phase}_ms']:.2f}ms" for phase in REPORT_PHASES if row[f"{phase}_ms"] is not None
+                )
+                print(f"{name} (concurrency {concurrency}): {row['txs_per_sec']:.1f} txs/sec ({phases})")
+    finally:
+        if process is not None:
+            process.terminate()
+
+    if args.output_file and rows:
+        with open(args.output_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Results written to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import subprocess
+import sys
+import time
+import concurrent.futures
+from decimal import Decimal
+
+import requests
+from web3 import Web3
+
+from runner import LIVE_NODES, ROUTING_POLICIES, connect_live_node, load_addresses
+
+# Rich L1 account of the dockerized zkSync node (same as era_bridge_to_wallets.sh)
+DEFAULT_L1_KEY = "0x7726827caac94a7f9e1b160f7ea819f172f7b6f9d2a97f992c38edeab82d4110"
+
+
+def get_balances(controller, addrs, batch_size=500):
+    """
+    Get the balances (in ETH) of many addresses with JSON-RPC batch requests
+    instead of one request per address.
+    """
+    balances = {}
+    session = requests.Session()
+    for i in range(0, len(addrs), batch_size):
+        chunk = addrs[i:i+batch_size]
+        payload = [
+            {"jsonrpc": "2.0", "id": j, "method": "eth_getBalance", "params": [addr, "latest"]}
+            for j, addr in enumerate(chunk)
+        ]
+        response = session.post(controller.w3.provider.endpoint_uri, json=payload, timeout=60)
+        response.raise_for_status()
+        for item in response.json():
+            balance_wei = int(item["result"], 16) if "result" in item else 0
+            balances[chunk[item["id"]]] = Decimal(Web3.from_wei(balance_wei, 'ether'))
+    return balances
+
+
+def build_tree(targets, hubs, fanout):
+    """
+    Split the targets into `hubs` k-ary trees. Returns the roots and a map
+    from every target to its children; position i of a hub's list funds
+    positions i*fanout+1 .. i*fanout+fanout.
+    """
+    children = {t: [] for t in targets}
+    roots = []
+    for h in range(hubs):
+        members = targets[h::hubs]
+        if not members:
+            continue
+        roots.append(members[0])
+        for i, member in enumerate(members):
+            children[member] = members[i*fanout+1:i*fanout+fanout+1]
+    return roots, children
+
+
+def subtree_amounts(roots, children, amount, fee):
+    """
+    Amount each target must receive: its own amount, plus what it forwards to
+    its subtree, plus the fee of every transfer it sends.
+    """
+    needed = {}
+
+    def visit(node):
+        total = amount
+        for child in children[node]:
+            total += visit(child) + fee
+        needed[node] = total
+        return total
+
+    for root in roots:
+        visit(root)
+    return needed
+
+
+def bridge_to_hubs(hubs, needed, l1_key, chain):
+    for counter, (_, addr) in enumerate(hubs):
+        print(f"Bridging {needed[addr]} ETH to hub {counter + 1}/{len(hubs)}: {addr}")
+        subprocess.run([
+            "npx", "zksync-cli", "bridge", "deposit", "--to", addr,
+            "--amount", str(needed[addr]),
+            "--token", "0x0000000000000000000000000000000000000000",
+            "--pk", l1_key, "--chain", chain
+        ], stdin=subprocess.DEVNULL, check=True)
+
+
+def wait_for_balances(controller, expected, poll, max_wait):
+    start = time.time()
+    while True:
+        balances = get_balances(controller, list(expected))
+        missing = [a for a, v in expected.items() if balances[a] < v]
+        if not missing:
+            return
+        if time.time() - start > max_wait:
+            print(f"Error: {len(missing)} hub(s) still not funded after {max_wait} sec")
+            sys.exit(1)
+        print(f"Waiting for {len(missing)} hub(s) to be funded")
+        time.sleep(poll)
+
+
+def fund_children(controller, parent_key, parent, children, needed, gas):
+    """
+    Send the subtree amounts of a parent's children. Transfers of one parent
+    are sequential so that its nonces stay in order.
+    """
+    failed = []
+    for child in children:
+        try:
+            receipt = controller.transfer(parent_key, child, needed[child], gas)
+            if receipt["status"] != 1:
+                failed.append(child)
+        except Exception as e:
+            print(f"Error funding {child} from {parent}: {e}")
+            failed.append(child)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--node', choices=list(LIVE_NODES), default="zksync")
+    parser.add_argument('--wallets', default="wallets.csv")
+    # RPC endpoints to use instead of the node's default URL
+    parser.add_argument('--endpoints', nargs='+')
+    parser.add_argument('--routing', choices=ROUTING_POLICIES, default="sender")
+    # Amount (ETH) every wallet should hold; wallets holding at least
+    # --min-balance are skipped
+    parser.add_argument('--amount', default="10")
+    parser.add_argument('--min-balance', default=None)
+    parser.add_argument('--hubs', default=8, type=int)
+    parser.add_argument('--fanout', default=8, type=int)
+    # Margin per transfer sent, covering its fee
+    parser.add_argument('--fee', default="0.01")
+    parser.add_argument('--gas', default=21000, type=int)
+    parser.add_argument('--concurrency', default=64, type=int)
+    # Hubs are funded either by bridging from L1 with zksync-cli, or with L2
+    # transfers from an already funded account
+    parser.add_argument('--l1-key', default=DEFAULT_L1_KEY)
+    parser.add_argument('--chain', default="dockerized-node")
+    parser.add_argument('--l2-source-key', default=None)
+    parser.add_argument('--max-wait', default=1800, type=int)
+    args = parser.parse_args()
+
+    amount = Decimal(args.amount)
+    min_balance = Decimal(args.min_balance) if args.min_balance is not None else amount
+    fee = Decimal(args.fee)
+
+    wallets = load_addresses(args.wallets)
+    keys = {addr: priv for priv, addr in wallets}
+
+    controller = connect_live_node(args.node, args.endpoints, args.routing)
+    balances = get_balances(controller, [addr for _, addr in wallets])
+    targets = [addr for _, addr in wallets if balances[addr] < min_balance]
+    print(f"{len(wallets) - len(targets)}/{len(wallets)} wallets already funded, {len(targets)} to fund")
+    if not targets:
+        return
+
+    roots, children = build_tree(targets, args.hubs, args.fanout)
+    needed = subtree_amounts(roots, children, amount, fee)
+    hubs = [(keys[r], r) for r in roots]
+    print(f"Funding through {len(hubs)} hub(s), {sum(needed[r] for r in roots)} ETH in total")
+
+    if args.l2_source_key:
+        fund_children(controller, args.l2_source_key, "source", roots, needed, args.gas)
+    else:
+        bridge_to_hubs(hubs, needed, args.l1_key, args.chain)
+    wait_for_balances(controller, {r: needed[r] for r in roots}, 10, args.max_wait)
+
+    # Fan out level by level; every funded account funds its own children
+    level = roots
+    depth = 0
+    failed = set()
+    start = time.time()
+    while level:
+        parents = [p for p in level if children[p]]
+        print(f"Level {depth}: {len(parents)} sender(s), {sum(len(children[p]) for p in parents)} transfer(s)")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = [
+                executor.submit(fund_children, controller, keys[p], p, children[p], needed, args.gas)
+                for p in parents
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                failed.update(future.result())
+        # Subtrees of failed children cannot be funded
+        level = [c for p in parents for c in children[p] if c not in failed]
+        depth += 1
+    print(f"Fan-out done in {time.time() - start:.1f} sec")
+
+    balances = get_balances(controller, targets)
+    funded = sum(1 for addr in targets if balances[addr] >= min_balance)
+    print(f"Funded {funded}/{len(targets)} wallets")
+    if funded < len(targets):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,168 @@
 import argparse
 import csv
+import hashlib
+import hmac
+import mmap
+import multiprocessing
 import secrets
+import struct
+from collections.abc import Sequence
 from eth_account import Account
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_account.hdaccount.deterministic import Node, derive_child_key
+from eth_keys import keys
+from eth_utils import to_checksum_address
+
+# Binary wallet files: magic, number of wallets, then for every wallet the
+# 32-byte private key followed by the 20-byte address
+WALLETS_MAGIC = b"ZKRW0001"
+WALLETS_HEADER = struct.Struct("<8sQ")
+WALLET_RECORD_SIZE = 52
+
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+# Wallet i of the deterministic mode is at <DEFAULT_HD_PATH>/i
+DEFAULT_HD_PATH = "m/44'/60'/0'/0"
+
+
+class WalletFile(Sequence):
+    """
+    Read-only view of a binary wallet file. Wallets are decoded on access as
+    [private_key, address] rows, the same as the rows of a wallets CSV, so the
+    file can be used anywhere a list of rows is expected without loading it.
+    """
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = WALLETS_HEADER.unpack_from(self.data, 0)
+        assert magic == WALLETS_MAGIC, f"{filename} is not a wallet file"
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("wallet index out of range")
+        offset = WALLETS_HEADER.size + index * WALLET_RECORD_SIZE
+        record = self.data[offset:offset + WALLET_RECORD_SIZE]
+        return ["0x" + record[:32].hex(), to_checksum_address(record[32:])]
+
+    def __getstate__(self):
+        raise TypeError("WalletFile cannot be pickled, pass its rows instead")
+
+
+def wallet_from_key(key):
+    return key, keys.PrivateKey(key).public_key.to_canonical_address()
+
+
+def random_wallets(args):
+    start, count = args
+    return [wallet_from_key(secrets.token_bytes(32)) for _ in range(count)]
+
+
+def hd_parent(mnemonic, passphrase, path):
+    """
+    Derive the extended key of the parent path once, so that every wallet only
+    needs the last (non-hardened) derivation step.
+    """
+    seed = seed_from_mnemonic(mnemonic, passphrase)
+    master = hmac.new(b"Bitcoin seed", seed, hashlib.sha512).digest()
+    key, chain_code = master[:32], master[32:]
+    for node in path.split("/")[1:]:
+        key, chain_code = derive_child_key(key, chain_code, Node.decode(node))
+    return key, chain_code, keys.PrivateKey(key).public_key.to_compressed_bytes()
+
+
+def hd_child_key(parent_key, chain_code, parent_point, index):
+    # BIP32 CKDpriv for a non-hardened child
+    child = hmac.new(chain_code, parent_point + index.to_bytes(4, "big"), hashlib.sha512).digest()
+    child_int = int.from_bytes(child[:32], "big")
+    key = (child_int + int.from_bytes(parent_key, "big")) % SECP256K1_N
+    if child_int >= SECP256K1_N or key == 0:
+        # Invalid key, use the next index as eth_account does
+        return hd_child_key(parent_key, chain_code, parent_point, index + 1)
+    return key.to_bytes(32, "big")
+
+
+def hd_wallets(args):
+    start, count, parent, start_index = args
+    return [
+        wallet_from_key(hd_child_key(*parent, start_index + i))
+        for i in range(start, start + count)
+    ]
+
+
+def generate(num_addresses, processes, chunk_size, job, extra=()):
+    """
+    Yield the wallets in order, generated in chunks by `processes` workers.
+    """
+    chunks = [
+        (start, min(chunk_size, num_addresses - start)) + extra
+        for start in range(0, num_addresses, chunk_size)
+    ]
+    if processes <= 1:
+        for chunk in chunks:
+            yield from job(chunk)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for wallets in pool.imap(job, chunks):
+            yield from wallets
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--addresses', default=100, type=int)
     parser.add_argument('--filename', default="wallets.csv")
+    # Optional compact binary copy of the wallets, readable by runner.py
+    parser.add_argument('--binary')
+    parser.add_argument('--processes', default=1, type=int)
+    parser.add_argument('--chunk-size', default=1000, type=int)
+    # Deterministic mode: derive wallet i at <hd-path>/<start-index + i> from
+    # a mnemonic. --hd generates a new mnemonic.
+    parser.add_argument('--mnemonic')
+    parser.add_argument('--passphrase', default="")
+    parser.add_argument('--hd', action='store_true')
+    parser.add_argument('--hd-path', default=DEFAULT_HD_PATH)
+    parser.add_argument('--start-index', default=0, type=int)
     args = parser.parse_args()
     num_addresses = args.addresses
     filename = args.filename
 
+    mnemonic = args.mnemonic
+    if args.hd and mnemonic is None:
+        Account.enable_unaudited_hdwallet_features()
+        _, mnemonic = Account.create_with_mnemonic()
+        print(f"Mnemonic: {mnemonic}")
+
+    if mnemonic is not None:
+        parent = hd_parent(mnemonic, args.passphrase, args.hd_path)
+        wallets = generate(
+            num_addresses, args.processes, args.chunk_size, hd_wallets, (parent, args.start_index)
+        )
+    else:
+        wallets = generate(num_addresses, args.processes, args.chunk_size, random_wallets)
+
     # Generate and save addresses
+    binary = open(args.binary, 'wb') if args.binary else None
+    if binary:
+        binary.write(WALLETS_HEADER.pack(WALLETS_MAGIC, num_addresses))
     with open(filename, mode='w', newline='') as file:
         writer = csv.writer(file)
-
-        for _ in range(num_addresses):
-            # Generate a new account
-            priv = secrets.token_hex(32)
-            private_key = "0x" + priv
-            account = Account.from_key(private_key)
-            
+        for key, address in wallets:
             # Write the private key and address to the CSV
-            writer.writerow([private_key, account.address])
+            writer.writerow(["0x" + key.hex(), to_checksum_address(address)])
+            if binary:
+                binary.write(key + address)
+    if binary:
+        binary.close()
 
     print(f"Generated {num_addresses} Ethereum addresses and private keys in {filename}")
+    if args.binary:
+        print(f"Binary wallet file written to {args.binary}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,177 @@
+import argparse
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_utils import keccak
+
+GAS_PRICE = 1_000_000_000
+GAS_ESTIMATE = 2_000_000
+ZERO_HASH = "0x" + "00" * 32
+ZERO_ADDRESS = "0x" + "00" * 20
+
+
+class MockChain:
+    """
+    Just enough chain state to answer the requests of EthereumController and
+    ZkSyncController. Transactions are not decoded nor executed: every raw
+    transaction succeeds, and its receipt is available `receipt_delay`
+    seconds after it was sent, in the block of that moment.
+    """
+    def __init__(self, chain_id, block_time, receipt_delay, txs_per_batch):
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.receipt_delay = receipt_delay
+        self.txs_per_batch = txs_per_batch
+        self.start = time.time()
+        self.txs = {}
+        self.lock = threading.Lock()
+
+    def block_number(self, at=None):
+        elapsed = (at or time.time()) - self.start
+        return int(elapsed / self.block_time) + 1 if self.block_time > 0 else 1
+
+    def send_raw_transaction(self, raw):
+        tx_hash = "0x" + keccak(hexstr=raw).hex()
+        with self.lock:
+            self.txs[tx_hash] = (time.time() + self.receipt_delay, len(self.txs))
+        return tx_hash
+
+    def receipt(self, tx_hash):
+        with self.lock:
+            tx = self.txs.get(tx_hash)
+        if tx is None or tx[0] > time.time():
+            return None
+        included_at, index = tx
+        block = self.block_number(included_at)
+        return {
+            "transactionHash": tx_hash,
+            "transactionIndex": hex(0),
+            "blockHash": "0x" + keccak(block.to_bytes(32, "big")).hex(),
+            "blockNumber": hex(block),
+            "from": ZERO_ADDRESS,
+            "to": None,
+            # The mock cannot tell deployments apart, so every receipt has one
+            "contractAddress": "0x" + keccak(hexstr=tx_hash)[-20:].hex(),
+            "cumulativeGasUsed": hex(21000),
+            "gasUsed": hex(21000),
+            "effectiveGasPrice": hex(GAS_PRICE),
+            "logs": [],
+            "logsBloom": "0x" + "00" * 256,
+            "status": "0x1",
+            "type": "0x0",
+            "l1BatchNumber": hex(index // self.txs_per_batch + 1),
+            "l1BatchTxIndex": hex(index % self.txs_per_batch),
+        }
+
+    def block(self, number):
+        return {
+            "number": hex(number),
+            "hash": "0x" + keccak(number.to_bytes(32, "big")).hex(),
+            "parentHash": ZERO_HASH,
+            "timestamp": hex(int(self.start + number * self.block_time)),
+            "gasLimit": hex(80_000_000),
+            "gasUsed": hex(0),
+            "baseFeePerGas": hex(GAS_PRICE),
+            "miner": ZERO_ADDRESS,
+            "transactions": [],
+        }
+
+    def handle(self, method, params):
+        if method == "eth_chainId":
+            return hex(self.chain_id)
+        if method == "net_version":
+            return str(self.chain_id)
+        if method == "web3_clientVersion":
+            return "mock-node"
+        if method == "eth_blockNumber":
+            return hex(self.block_number())
+        if method in ("eth_gasPrice", "eth_maxPriorityFeePerGas"):
+            return hex(GAS_PRICE)
+        if method == "eth_estimateGas":
+            return hex(GAS_ESTIMATE)
+        if method == "eth_getTransactionCount":
+            return hex(0)
+        if method == "eth_getBalance":
+            return hex(10**24)
+        if method == "eth_call":
+            return "0x" + "00" * 32
+        if method == "eth_sendRawTransaction":
+            return self.send_raw_transaction(params[0])
+        if method == "eth_getTransactionReceipt":
+            return self.receipt(params[0])
+        if method == "eth_getBlockByNumber":
+            number = self.block_number() if params[0] in ("latest", "pending", "committed") else int(params[0], 16)
+            return self.block(number)
+        if method == "zks_getBlockDetails":
+            return {"number": params[0], "l1BatchNumber": params[0], "committedAt": None, "provenAt": None}
+        raise KeyError(method)
+
+
+def make_handler(chain, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # Headers and body are written separately; without this, delayed
+            # ACKs add ~40ms to every keep-alive request
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if latency > 0:
+                time.sleep(latency)
+            if isinstance(request, list):
+                response = [self.call(r) for r in request]
+            else:
+                response = self.call(request)
+            body = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def call(self, request):
+            try:
+                result = chain.handle(request["method"], request.get("params", []))
+                return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+            except KeyError:
+                return {
+                    "jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32601, "message": f"Method {request.get('method')} not supported by the mock node"}
+                }
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host, port, chain_id, latency=0, block_time=1, receipt_delay=0, txs_per_batch=1000):
+    chain = MockChain(chain_id, block_time, receipt_delay, txs_per_batch)
+    server = ThreadingHTTPServer((host, port), make_handler(chain, latency))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local JSON-RPC stand-in for the controllers of runner.py")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', default=8545, type=int)
+    parser.add_argument('--chain-id', default=270, type=int)
+    # Delay (sec) added to every HTTP request
+    parser.add_argument('--latency', default=0, type=float)
+    parser.add_argument('--block-time', default=1, type=float)
+    # Delay (sec) between sending a transaction and its receipt being available
+    parser.add_argument('--receipt-delay', default=0, type=float)
+    parser.add_argument('--txs-per-batch', default=1000, type=int)
+    args = parser.parse_args()
+    print(f"Mock node listening on http://{args.host}:{args.port}")
+    serve(args.host, args.port, args.chain_id, args.latency, args.block_time, args.receipt_delay, args.txs_per_batch)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import glob
+import json
+import math
+import os
+import re
+import sys
+
+# Batch constraints of the zkEVM sequencer for fork 9 (zkevm-node
+# State.Batch.Constraints defaults): a batch whose counters exceed any of them
+# cannot be proved in one batch proof
+COUNTER_LIMITS = {
+    "steps": 7570538,
+    "keccak": 2145,
+    "poseidon": 252357,
+    "padding": 135191,
+    "arith": 236585,
+    "binary": 473170,
+    "mem_align": 236585,
+    "sha256": 1596,
+}
+
+# Names the counters are printed with by the executors: the C++ executor
+# (zkProver) and the JS executor / ROM (zkevm-proverjs). They are matched
+# case-insensitively and without underscores.
+COUNTER_ALIASES = {
+    "cntsteps": "steps",
+    "cntkeccakf": "keccak",
+    "cntkeccakhashes": "keccak",
+    "cntposeidong": "poseidon",
+    "cntposeidonhashes": "poseidon",
+    "cntpaddingpg": "padding",
+    "cntposeidonpaddings": "padding",
+    "cntarith": "arith",
+    "cntarithmetics": "arith",
+    "cntbinary": "binary",
+    "cntbinaries": "binary",
+    "cntmemalign": "mem_align",
+    "cntmemaligns": "mem_align",
+    "cntsha256f": "sha256",
+    "cntsha256hashes": "sha256",
+}
+
+COUNTER_PATTERN = re.compile(r"\b(cnt\w+)\W{0,3}[=:]\s*\"?(\d+)")
+
+
+def parse_counters(text):
+    """
+    The zkEVM counters printed in an executor log. The last value of every
+    counter wins, i.e. that of the whole batch.
+    """
+    counters = {}
+    for name, value in COUNTER_PATTERN.findall(text):
+        counter = COUNTER_ALIASES.get(name.replace("_", "").lower())
+        if counter is not None:
+            counters[counter] = int(value)
+    return counters
+
+
+def count_txs(vector_file):
+    """
+    Transactions of the benchmarked (last) batch of a vector, without the
+    changeL2Block entries.
+    """
+    with open(vector_file, 'r') as f:
+        vector = json.load(f)
+    return sum(1 for tx in vector[-1]["txs"] if "type" not in tx)
+
+
+def check_counters(counters, limits):
+    usage = {name: counters[name] / limit for name, limit in limits.items() if name in counters}
+    bottleneck = max(usage, key=usage.get) if usage else None
+    return {
+        "usage": usage,
+        "bottleneck": bottleneck,
+        "fits": bool(usage) and usage[bottleneck] <= 1,
+    }
+
+
+def counters_file(vector_file):
+    return f"{os.path.splitext(vector_file)[0]}.counters.json"
+
+
+def workload_key(vector_file):
+    """
+    Name of a vector without its size, e.g. N_different_transfers or
+    gen-deploy_N.
+    """
+    stem = os.path.splitext(os.path.basename(vector_file))[0]
+    return re.sub(r"(?:^|(?<=[-_]))\d+(?=[-_]|$)", "N", stem, count=1)
+
+
+def max_txs(reports, limits):
+    """
+    Largest number of transactions of a workload that fits in one batch,
+    extrapolated linearly from the counters of its vectors. Returns it with
+    the counter that limits it, or None without two distinct sizes.
+    """
+    sizes = sorted({r["txs"] for r in reports})
+    if len(sizes) < 2:
+        return None
+    best = None
+    for name, limit in limits.items():
+        points = [(r["txs"], r["counters"][name]) for r in reports if name in r["counters"]]
+        if len({x for x, _ in points}) < 2:
+            continue
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / sum((x - mean_x) ** 2 for x, _ in points)
+        if slope <= 0:
+            continue
+        fitting = math.floor((limit - (mean_y - slope * mean_x)) / slope)
+        if best is None or fitting < best[0]:
+            best = (fitting, name)
+    return best
+
+
+def print_report(report):
+    print(f"{os.path.basename(report['vector'])}: {report['txs']} txs, "
+          f"{'fits' if report['fits'] else 'DOES NOT FIT'} in one batch (bottleneck: {report['bottleneck']})")
+    for name, limit in report["limits"].items():
+        if name in report["counters"]:
+            print(f"  {name:<10} {report['counters'][name]:>10} / {limit:<10} {report['usage'][name]:7.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="zkEVM counters of Polygon vectors from executor-only runs")
+    # Override a batch limit, e.g. --limit steps=8388608 (repeatable)
+    parser.add_argument('--limit', action='append', default=[])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record = subparsers.add_parser('record', help="Store the counters of an executor log next to its vector")
+    record.add_argument('--vector', required=True)
+    record.add_argument('--log', required=True)
+    # Seconds the executor took
+    record.add_argument('--elapsed', type=float)
+    report = subparsers.add_parser('report', help="Show the stored counters of a directory of vectors")
+    report.add_argument('directory', nargs='?', default="polygon_bench")
+    args = parser.parse_args()
+
+    limits = dict(COUNTER_LIMITS)
+    for limit in args.limit:
+        name, _, value = limit.partition("=")
+        assert name in limits, f"Unknown counter {name}, expected one of {list(limits)}"
+        limits[name] = int(value)
+
+    if args.command == 'record':
+        with open(args.log, 'r', errors='replace') as f:
+            counters = parse_counters(f.read())
+        if not counters:
+            print(f"Error: no zkEVM counters found in {args.log}")
+            sys.exit(1)
+        result = {
+            "vector": os.path.basename(args.vector),
+            "txs": count_txs(args.vector),
+            "counters": counters,
+            "limits": limits,
+            "elapsed": args.elapsed,
+        }
+        result.update(check_counters(counters, limits))
+        with open(counters_file(args.vector), 'w') as f:
+            json.dump(result, f, indent=4)
+        print_report(result)
+        return
+
+    reports = []
+    for path in sorted(glob.glob(os.path.join(args.directory, "*.counters.json"))):
+        with open(path, 'r') as f:
+            result = json.load(f)
+        # Check against the current limits, not those of the recording
+        result.update(check_counters(result["counters"], limits), limits=limits)
+        reports.append(result)
+        print_report(result)
+    if not reports:
+        print(f"Error: no counters in {args.directory}, run run_polygon.sh with EXECUTOR_ONLY=1 first")
+        sys.exit(1)
+
+    print()
+    oversized = [r["vector"] for r in reports if not r["fits"]]
+    print(f"{len(reports) - len(oversized)}/{len(reports)} vector(s) fit in one batch")
+    for vector in oversized:
+        print("  Too large:", vector)
+    workloads = {}
+    for r in reports:
+        workloads.setdefault(workload_key(r["vector"]), []).append(r)
+    for key, workload_reports in sorted(workloads.items()):
+        estimate = max_txs(workload_reports, limits)
+        if estimate is not None:
+            print(f"{key}: about {estimate[0]} txs fit in one batch (bottleneck: {estimate[1]})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+
+_CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_RESULTS_DB = os.path.join(_CURRENT_DIR, "results", "results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    node TEXT NOT NULL,
+    benchmark TEXT,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    cell TEXT NOT NULL,
+    workload TEXT NOT NULL,
+    size INTEGER,
+    addresses TEXT,
+    concurrency INTEGER,
+    processes INTEGER,
+    repetition INTEGER,
+    elapsed REAL,
+    txs INTEGER,
+    succeeded INTEGER,
+    failed INTEGER,
+    gas_used INTEGER,
+    first_block INTEGER,
+    last_block INTEGER,
+    first_batch INTEGER,
+    last_batch INTEGER,
+    config TEXT
+);
+CREATE INDEX IF NOT EXISTS blocks_run ON blocks(run_id);
+"""
+
+BLOCK_COLUMNS = [
+    "run_id", "cell", "workload", "size", "addresses", "concurrency", "processes",
+    "repetition", "elapsed", "txs", "succeeded", "failed", "gas_used",
+    "first_block", "last_block", "first_batch", "last_batch", "config",
+]
+
+# Columns of the joined run/block rows returned by query_blocks
+RESULT_COLUMNS = ["node", "benchmark", "started_at"] + BLOCK_COLUMNS
+
+
+def connect(path=DEFAULT_RESULTS_DB):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def add_run(conn, run_id, node, benchmark, config):
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, started_at, node, benchmark, config) VALUES (?, ?, ?, ?, ?)",
+            (run_id, time.time(), node, benchmark, json.dumps(config))
+        )
+
+
+def add_block(conn, run_id, record):
+    """
+    Store the outcome of one benchmark block. `record` has the BLOCK_COLUMNS
+    except run_id; its config is stored as JSON. A block already stored for
+    the same run and cell (a cell run again after an interrupted run was
+    resumed) is replaced.
+    """
+    values = dict(record, run_id=run_id, config=json.dumps(record.get("config")))
+    with conn:
+        conn.execute("DELETE FROM blocks WHERE run_id = ? AND cell = ?", (run_id, values["cell"]))
+        conn.execute(
+            f"INSERT INTO blocks ({', '.join(BLOCK_COLUMNS)}) VALUES ({', '.join('?' for _ in BLOCK_COLUMNS)})",
+            [values.get(column) for column in BLOCK_COLUMNS]
+        )
+
+
+def query_runs(conn):
+    cursor = conn.execute(
+        "SELECT r.run_id, r.started_at, r.node, r.benchmark, COUNT(b.id) "
+        "FROM runs r LEFT JOIN blocks b ON b.run_id = r.run_id "
+        "GROUP BY r.run_id ORDER BY r.started_at"
+    )
+    return [
+        {"run_id": run_id, "started_at": started_at, "node": node, "benchmark": benchmark, "blocks": blocks}
+        for run_id, started_at, node, benchmark, blocks in cursor.fetchall()
+    ]
+
+
+def query_blocks(conn, run_ids=None, node=None, benchmark=None, workload=None):
+    """
+    Blocks joined with their run, optionally filtered, in run and insertion
+    order.
+    """
+    conditions = []
+    params = []
+    if run_ids:
+        conditions.append(f"r.run_id IN ({', '.join('?' for _ in run_ids)})")
+        params.extend(run_ids)
+    for column, value in (("r.node", node), ("r.benchmark", benchmark), ("b.workload", workload)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    columns = ", ".join(["r.node", "r.benchmark", "r.started_at"] + [f"b.{c}" for c in BLOCK_COLUMNS])
+    cursor = conn.execute(
+        f"SELECT {columns} FROM blocks b JOIN runs r ON r.run_id = b.run_id {where} "
+        f"ORDER BY r.started_at, b.id",
+        params
+    )
+    return [dict(zip(RESULT_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def print_table(rows, columns):
+    widths = {c: max([len(c)] + [len(format_value(r[c])) for r in rows]) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(format_value(row[c]).ljust(widths[c]) for c in columns))
+
+
+def format_value(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and export the benchmark results database")
+    parser.add_argument('--db', default=DEFAULT_RESULTS_DB)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('runs', help="List the stored runs")
+    for name in ('blocks', 'export'):
+        subparser = subparsers.add_parser(name, help="Show the blocks" if name == 'blocks' else "Export the blocks")
+        subparser.add_argument('--run', action='append', help="Run id (repeatable)")
+        subparser.add_argument('--node')
+        subparser.add_argument('--benchmark')
+        subparser.add_argument('--workload')
+        if name == 'export':
+            subparser.add_argument('--format', choices=["csv", "json"], default="csv")
+            subparser.add_argument('--output', help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Error: {args.db} does not exist")
+        sys.exit(1)
+    conn = connect(args.db)
+
+    if args.command == 'runs':
+        runs = query_runs(conn)
+        for run in runs:
+            run["started_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started_at"]))
+        print_table(runs, ["run_id", "started_at", "node", "benchmark", "blocks"])
+        return
+
+    rows = query_blocks(conn, args.run, args.node, args.benchmark, args.workload)
+    if args.command == 'blocks':
+        print_table(rows, [
+            "run_id", "node", "cell", "elapsed", "txs", "succeeded", "failed",
+            "gas_used", "first_block", "last_block", "first_batch", "last_batch"
+        ])
+        return
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    if args.format == "json":
+        for row in rows:
+            row["config"] = json.loads(row["config"]) if row["config"] else None
+        json.dump(rows, output, indent=4)
+        output.write("\n")
+    else:
+        writer = csv.DictWriter(output, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    if args.output:
+        output.close()
+        print(f"Exported {len(rows)} block(s) to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -40,8 +40,54 @@ INIT_DIR=$(pwd)
 LOGS="$INIT_DIR/polygon_logs/logs_$test"
 mkdir -p "$LOGS"
 
-# List files in benchmark_inputs_dir
-listOfFiles=$(ls "$benchmark_inputs_dir")
+# Fork directory of the prover the executor inputs are generated for
+FORK="fork_9"
+
+# Cache of the generated executor inputs, keyed by the hash of the vector and
+# of the zkevm-testvectors version. Set INPUT_CACHE=0 to always regenerate.
+INPUT_CACHE="${INPUT_CACHE:-1}"
+INPUT_CACHE_DIR="${INPUT_CACHE_DIR:-$INIT_DIR/polygon_input_cache}"
+mkdir -p "$INPUT_CACHE_DIR"
+
+# The testvectors version is its commit, its local changes (e.g. the
+# hardhat.config.js patch) and the contracts copied into it
+testvectors_version=$(
+  {
+    git -C "$polygon_testvectors" rev-parse HEAD 2>/dev/null || echo "no-git"
+    git -C "$polygon_testvectors" diff HEAD 2>/dev/null
+    find "$polygon_testvectors/tools-inputs/tools-calldata/contracts" -type f -name "*.sol" -exec sha256sum {} + 2>/dev/null | sort
+    echo "$FORK"
+  } | sha256sum | cut -d' ' -f1
+)
+cache_hits=0
+cache_misses=0
+
+# Executor-only pre-flight: EXECUTOR_ONLY=1 runs only the executor on every
+# file instead of the prover, and writes its zkEVM counters next to the file
+# (<file>.counters.json, see polygon_counters.py). The default executor is the
+# zkProver with its batch proof disabled; EXECUTOR_CMD replaces it with any
+# command that prints the counters, given the executor input as last argument.
+EXECUTOR_ONLY="${EXECUTOR_ONLY:-0}"
+EXECUTOR_CMD="${EXECUTOR_CMD:-}"
+SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)
+if [ "$EXECUTOR_ONLY" != "0" ] && [ -z "$EXECUTOR_CMD" ]; then
+  python3 - "$polygon_zkevm_dir/testvectors/config_runFile_e2e.json" "$LOGS/config_executor.json" "$FORK" <<'PY'
+import json, sys
+with open(sys.argv[1]) as f:
+    config = json.load(f)
+# Only process the batch of the input file, without proving it
+for key in config:
+    if key.startswith("run") and isinstance(config[key], bool):
+        config[key] = False
+config["runFileProcessBatch"] = True
+config["inputFile"] = f"testvectors/e2e/{sys.argv[3]}/input_executor_0.json"
+with open(sys.argv[2], "w") as f:
+    json.dump(config, f, indent=4)
+PY
+fi
+
+# List files in benchmark_inputs_dir (without the counters of the pre-flight)
+listOfFiles=$(ls "$benchmark_inputs_dir" | grep -v '\.counters\.json$')
 
 # Print paths at the start
 echo "polygon_zkevm_dir: $polygon_zkevm_dir"
@@ -50,6 +96,7 @@ echo "benchmark_inputs_dir: $benchmark_inputs_dir"
 echo "test: $test"
 echo "INIT_DIR: $INIT_DIR"
 echo "LOGS directory: $LOGS"
+echo "Input cache: $INPUT_CACHE_DIR (testvectors version $testvectors_version)"
 echo "Files in $benchmark_inputs_dir:"
 echo "$listOfFiles"
 
@@ -67,22 +114,63 @@ echo "$listOfFiles" >> "$LOGS/paths.log"
 touch ${polygon_zkevm_dir}/benchmarks_${test}.csv
 for file in $listOfFiles; do
     echo "Processing file: $file"
-    echo "Copying file to zkevm-testvectors"
-    cp "$benchmark_inputs_dir/$file" "$polygon_testvectors/tools-inputs/tools-calldata/generate-test-vectors/gen-$file"
-    
-    cd "$polygon_testvectors"
-    echo "(1/2) Generating inputs for file: $file"
-    npx mocha --max-old-space-size=524288 tools-inputs/tools-calldata/gen-test-vectors-evm.js --vectors "gen-$file"
-    echo "(2/2) Generating inputs for file: $file"
-    npx mocha --max-old-space-size=524288 tools-inputs/generators/calldata-gen-inputs.js --timeout 0 --vectors "$file" --update --output --evm-debug
-
     fileWithoutExtension="${file%.*}"
     echo $fileWithoutExtension
-    echo "Copying generated files to testvectors"
     fileOutput="${fileWithoutExtension}_0.json"
-    cp "$polygon_testvectors/inputs-executor/calldata/$fileOutput" "$polygon_zkevm_dir/testvectors/e2e/fork_9/input_executor_0.json"
+    cache_key=$(
+      { sha256sum < "$benchmark_inputs_dir/$file"; echo "$testvectors_version"; } | sha256sum | cut -d' ' -f1
+    )
+    cached_input="$INPUT_CACHE_DIR/$cache_key.json"
+
+    if [ "$INPUT_CACHE" != "0" ] && [ -f "$cached_input" ]; then
+        echo "Using cached inputs for file: $file ($cache_key)"
+        cache_hits=$((cache_hits + 1))
+    else
+        echo "Copying file to zkevm-testvectors"
+        cp "$benchmark_inputs_dir/$file" "$polygon_testvectors/tools-inputs/tools-calldata/generate-test-vectors/gen-$file"
+
+        cd "$polygon_testvectors"
+        echo "(1/2) Generating inputs for file: $file"
+        npx mocha --max-old-space-size=524288 tools-inputs/tools-calldata/gen-test-vectors-evm.js --vectors "gen-$file"
+        echo "(2/2) Generating inputs for file: $file"
+        npx mocha --max-old-space-size=524288 tools-inputs/generators/calldata-gen-inputs.js --timeout 0 --vectors "$file" --update --output --evm-debug
+
+        # Write to a temporary file first so that an interrupted copy is
+        # never taken for a cached input
+        cp "$polygon_testvectors/inputs-executor/calldata/$fileOutput" "$cached_input.tmp" && \
+            mv "$cached_input.tmp" "$cached_input"
+        cache_misses=$((cache_misses + 1))
+    fi
+
+    echo "Copying generated files to testvectors"
+    cp "$cached_input" "$polygon_zkevm_dir/testvectors/e2e/$FORK/input_executor_0.json"
     
     cd "$polygon_zkevm_dir"
+
+    if [ "$EXECUTOR_ONLY" != "0" ]; then
+        echo "Running executor"
+        executor_log="$LOGS/$fileWithoutExtension.executor.log"
+        executor_start=$(date +%s.%N)
+        if [ -n "$EXECUTOR_CMD" ]; then
+            $EXECUTOR_CMD "$cached_input" > "$executor_log" 2>&1
+        else
+            build/zkProver -c "$LOGS/config_executor.json" > "$executor_log" 2>&1
+        fi
+        executor_elapsed=$(awk "BEGIN {print $(date +%s.%N) - $executor_start}")
+        python3 "$SCRIPT_DIR/polygon_counters.py" record --vector "$benchmark_inputs_dir/$file" \
+            --log "$executor_log" --elapsed "$executor_elapsed"
+        # Leave nothing behind for the backup step of a later prover run,
+        # which would file it under its own payload (the input is cached)
+        rm -f "testvectors/e2e/$FORK/input_executor_0.json"
+        if compgen -G "runtime/output/*.json" > /dev/null; then
+            mkdir -p "runtime/output/${fileWithoutExtension}_executor"
+            mv "runtime/output/"*.json "runtime/output/${fileWithoutExtension}_executor"
+        fi
+        echo "Done processing file: $file"
+        echo
+        continue
+    fi
+
     csv_file="benchmarks.csv"
     
     echo "Running prover"
@@ -93,8 +181,8 @@ for file in $listOfFiles; do
     sed -e '$s/^/'"$fileWithoutExtension"',/' benchmarks.csv > temp && mv temp benchmarks.csv
     echo "" >> benchmarks.csv
     echo "Moving files to backup"
-    mkdir -p "testvectors/e2e/fork_9/$fileWithoutExtension"
-    mv "testvectors/e2e/fork_9/"*.json "testvectors/e2e/fork_9/$fileWithoutExtension"
+    mkdir -p "testvectors/e2e/$FORK/$fileWithoutExtension"
+    mv "testvectors/e2e/$FORK/"*.json "testvectors/e2e/$FORK/$fileWithoutExtension"
 
     mkdir -p "runtime/output/$fileWithoutExtension"
     mv "runtime/output/"*.json "runtime/output/$fileWithoutExtension"
@@ -104,4 +192,9 @@ for file in $listOfFiles; do
     echo
 done
 
-mv benchmarks.csv "benchmarks_$test.csv"
+if [ "$EXECUTOR_ONLY" != "0" ]; then
+    python3 "$SCRIPT_DIR/polygon_counters.py" report "$benchmark_inputs_dir"
+else
+    mv benchmarks.csv "benchmarks_$test.csv"
+fi
+echo "Input cache: $cache_hits hit(s), $cache_misses generated"
@@ -1,683 +1,637 @@
 from __future__ import annotations
+import dataclasses
 from dataclasses import dataclass
-from decimal import Decimal
+import ast
+import cProfile
+import contextlib
 import json
 import argparse
 import sys
 import os
-import shutil
-import subprocess
-import tempfile
-import hashlib
 import csv
 import time
 import copy
+import functools
+import operator
+import re
+import queue
+import random
+import threading
+import tracemalloc
+import multiprocessing
 import concurrent.futures
 
 from pathlib import Path
-from abc import ABC, abstractmethod
-from typing import Any, List
-from eth_typing import HexStr
-from web3 import Web3
-from solcx import install_solc, compile_standard
-
-import web3
-
-from zksync2.core.types import ZkBlockParams
-from zksync2.module.module_builder import ZkSyncBuilder
-from zksync2.signer.eth_signer import PrivateKeyEthSigner
-from zksync2.transaction.transaction_builders import TxFunctionCall
-from zksync2.transaction.transaction_builders import TxCreateContract
-from zksync2.core.types import EthBlockParams
-from zksync2.manage_contracts.contract_encoder_base import ContractEncoder
-from eth_account import Account
+from typing import Any
 from eth_utils import to_checksum_address
-from eth_utils import remove_0x_prefix
+
+# Controllers are in backends/ and only imported when their node is used
+from backends import BACKENDS, load_backend
+from backends.common import ROUTING_POLICIES, set_trace
+from backends.polygon import PolygonController
+import results_db as results_db_module
 
 
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
-def read_source_code(file_name: str) -> str:
-    with open(file_name, 'r') as file:
-        return file.read()
+########################## Run TXs from JSON specs ############################
 
+def transfer(controller, from_priv_key, to_addr, amount, gas):
+    receipt = controller.transfer(
+        from_priv_key, to_addr, amount, gas
+    )
+    return receipt
 
-def check_executable_exists(executable_name):
-    return shutil.which(executable_name) is not None
+def deploy_contract(controller, contract_name, contract_src, is_yul, from_priv_key, constructor_args):
+    receipt, contract_instance, contract_address, storage_layout = controller.deploy_contract(
+        contract_src, contract_name, from_priv_key, constructor_args, is_yul
+    )
+    return receipt, contract_instance, contract_address, storage_layout
 
+def execute(
+        controller, from_priv_key, contract_instance, contract_address, 
+        func_name, func_args, call, amount
+    ):
+    receipt, returned_value = controller.execute(
+            from_priv_key, contract_instance, contract_address, 
+            func_name, func_args, call, amount
+    )
+    return receipt, returned_value
 
-class BlockchainController(ABC):
-    @abstractmethod
-    def __init__(self, provider_url, chain_id):
-        pass
+# One subscript of a reference such as ["accounts"]["pv"]["alice"]
+_REFERENCE_KEY = re.compile(r"""\[\s*("[^"]*"|'[^']*'|-?\d+)\s*\]""")
 
-    def get_address(self, key):
-        _, _, address = self.get_account(key)
-        return address
 
-    @abstractmethod
-    def get_balance(self, addr):
-        """
-        Get the balance of an address
-        """
-        pass
+@functools.lru_cache(maxsize=None)
+def compile_reference(expr):
+    """
+    Parse a reference into the state of a transactions spec, either relative
+    (["contracts"]["Greeter"]["address"]) or prefixed with `data`, into a
+    getter. References are resolved when a transaction runs, so they can point
+    to contracts deployed by earlier transactions.
+    """
+    path = expr.strip()
+    if path.startswith("data"):
+        path = path[len("data"):]
+    keys = []
+    position = 0
+    for match in _REFERENCE_KEY.finditer(path):
+        assert match.start() == position, f"Invalid reference: {expr}"
+        keys.append(ast.literal_eval(match.group(1)))
+        position = match.end()
+    assert keys and position == len(path), f"Invalid reference: {expr}"
+    return functools.partial(functools.reduce, operator.getitem, keys)
+
+
+def compile_arguments(arguments):
+    """
+    Constants stay as they are, "data[...]" strings become getters.
+    """
+    return [
+        compile_reference(a) if isinstance(a, str) and a.startswith('data[') else a
+        for a in arguments
+    ]
 
-    @abstractmethod
-    def get_account(self, key=None):
-        """
-        Generate or retrieve an account based on a key.
-        """
-        pass
 
-    @abstractmethod
-    def transfer(self, from_priv_key, to_addr, amount, gas):
-        """
-        Transfer native tokens from one account to another.
-        """
-        pass
+def resolve_arguments(arguments, data):
+    return [a(data) if isinstance(a, functools.partial) else a for a in arguments]
 
-    @abstractmethod
-    def deploy_contract(self, contract, contract_name, from_priv_key, constructor_args, is_yul=False):
-        """
-        Deploy a contract to the blockchain.
-        """
-        pass
 
-    @abstractmethod
-    def send_transaction(self, transaction, priv_key, from_addr, gas, include_gas_price):
-        """
-        Send a transaction to the blockchain.
-        """
-        pass
+@dataclass
+class TransferTx:
+    id: str
+    from_priv_key: Any
+    to_addr: Any
+    amount: Any
+    gas: int
 
-    @abstractmethod
-    def execute(self, priv_key, contract, contract_address, func_name, func_args, call, amount):
-        """
-        Execute a transaction in the blockchain.
-        """
-        pass
+    def run(self, controller, data):
+        return transfer(controller, self.from_priv_key(data), self.to_addr(data), self.amount, self.gas)
 
-    @abstractmethod
-    def compile_contract(self, source_code_path, contract_name):
-        """
-        Compile a contract's source code.
-        """
-        pass
-
-
-class EthereumController(BlockchainController):
-    def __init__(self, provider_url, chain_id):
-        self.w3 = Web3(Web3.HTTPProvider(provider_url))
-        if not self.w3.is_connected():
-            raise ConnectionError("Unable to connect to the Ethereum node.")
-        self.chain_id = chain_id
-
-    def get_balance(self, addr):
-        balance_wei = self.w3.eth.get_balance(addr)
-        balance_eth = self.w3.from_wei(balance_wei, 'ether')
-        return balance_eth
-
-    def get_account(self, key=None):
-        if key is None:
-            priv_key = Web3.to_hex(os.urandom(32))
-            account = self.w3.eth.account.from_key(priv_key)
-        else: 
-            priv_key = HexStr(key)
-            account = self.w3.eth.account.from_key(priv_key)
-        return priv_key, account, account.address
-
-    def transfer(self, from_priv_key, to_addr, amount, gas):
-        from_addr = self.w3.eth.account.from_key(from_priv_key).address
-        amount = Web3.to_wei(amount, 'ether')
-        transaction = {
-            'to': to_addr,
-            'value': amount,
-            "chainId": self.chain_id,
-            "nonce": self.w3.eth.get_transaction_count(from_addr),
-            "from": from_addr,
-            "gasPrice": self.w3.eth.gas_price,
-            "gas": 500000
-        }
-        receipt = self.send_transaction(transaction, from_priv_key, from_addr, gas, True)
-        return receipt
 
-    def deploy_contract(self, contract_path, contract_name, from_priv_key, constructor_args, is_yul=False):
-        from_addr = self.w3.eth.account.from_key(from_priv_key).address
-        bytecode, abi, storage_layout = self.compile_contract(contract_path, contract_name)
-        contract = self.w3.eth.contract(abi=abi, bytecode=bytecode)
-        transaction = contract.constructor(*constructor_args).build_transaction({
-            "chainId": self.chain_id,
-            "nonce": self.w3.eth.get_transaction_count(from_addr),
-            "from": from_addr,
-            "gasPrice": self.w3.eth.gas_price,
-        })
-        receipt = self.send_transaction(transaction, from_priv_key, from_addr, 8000000, False)
-        contract_address = receipt['contractAddress']
-        contract_instance = self.w3.eth.contract(address=contract_address, abi=abi)
-        return receipt, contract_instance, contract_address, storage_layout
-
-    def send_transaction(self, transaction, priv_key, from_addr, gas, include_gas_price):
-        signed_txn = self.w3.eth.account.sign_transaction(transaction, priv_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        return receipt
+@dataclass
+class DeployTx:
+    id: str
+    contract_name: str
+    from_priv_key: Any
+    constructor_args: list
 
-    def execute(self, priv_key, contract, contract_address, func_name, func_args, call, amount):
-        amount = Web3.to_wei(amount, 'ether')
-        if call:
-            value = getattr(contract.functions, func_name)(*func_args).call()
-            return None, value
-        else:
-            from_addr = self.w3.eth.account.from_key(priv_key).address
-            transaction = getattr(contract.functions, func_name)(*func_args).build_transaction({
-                "chainId": self.chain_id,
-                "nonce": self.w3.eth.get_transaction_count(from_addr),
-                "from": from_addr,
-                'value': amount,
-                "gasPrice": self.w3.eth.gas_price,
-                "gas": 500000
-            })
-            tx_receipt = self.send_transaction(transaction, priv_key, from_addr, 5000000, False)
-            return tx_receipt, None
-
-    def compile_contract(self, source_code_path, contract_name, is_yul=True):
-        src = read_source_code(source_code_path)
-        install_solc('0.8.19')  # You can choose the version you want
-
-        if is_yul:
-            compiled = compile_standard({
-                "language": "Yul",
-                "sources": {
-                    "Contract.yul": {
-                        "content": src
-                    }
-                },
-                "settings": {
-                    "outputSelection": {
-                        "*": {
-                            "*": ["metadata", "evm.bytecode", "evm.sourceMap", "storageLayout"]
-                        }
-                    }
-                }
-            })
-            bytecode = compiled["contracts"]["Contract.yul"]["Contract1"]["evm"]["bytecode"]["object"]
-            abi, storage_layout = get_yul_abi_storage_layout()
-            return bytecode, abi, storage_layout
-        else:
-            compiled_sol = compile_standard({
-                "language": "Solidity",
-                "sources": {
-                    "Contract.sol": {
-                        "content": src
-                    }
-                },
-                "settings": {
-                    "outputSelection": {
-                        "*": {
-                            "*": ["metadata", "evm.bytecode", "evm.sourceMap", "storageLayout"]
-                        }
-                    }
-                }
-            })
-            # Extract bytecode and ABI
-            bytecode = compiled_sol['contracts']['Contract.sol'][contract_name]['evm']['bytecode']['object']
-            abi = json.loads(compiled_sol['contracts']['Contract.sol'][contract_name]['metadata'])['output']['abi']
-            storage_layout = compiled_sol['contracts']['Contract.sol'][contract_name]['storageLayout']
-
-            return bytecode, abi, storage_layout
-
-
-class PolygonController(EthereumController):
-    """We inherit the compile_contract method from the EthereumController class
-    """
-    def __init__(self, provider_url, chain_id, addresses, gen_template=False):
-        assert provider_url is None
-        assert chain_id == 1000
-        self.chain_id = chain_id
-        self.gen_template = gen_template
-
-        # Extra fields for the Polygon network
-        self.template = None
-        self.genesis = None
-        self.txs = None
-        self.address_map = None
-        self.nonces = None
-
-        template_file = os.path.join(_CURRENT_DIR, "templates", "polygon_gen_template.json")
-        with open(template_file, "r") as f:
-            # The ammendable fields are:
-            # - append self.template[0]["genesis"]["accounts"]
-            # - append self.template[0]["genesis"]["contracts"]
-            # - append self.template[0]["txs"]
-            self.template = json.load(f)
-            self.genesis = self.template[0]["genesis"]["accounts"]
-            self.txs = self.template[0]["txs"]
-
-        # Add the addresses to genesis, addresses is a list of lists of priv_key,address
-        self.address_map = {row[0]: row[1] for row in addresses}
-        for priv, addr in self.address_map.items():
-            self.genesis.append({
-               "address": addr,
-               "nonce": "0",
-               "balance": "1000000000000000000000000000",
-               "pvtKey": priv
-            })
-        self.nonces = {g["address"]: int(g["nonce"]) for g in self.genesis}
-
-    # currently supporting only using a single contract in the new batch
-    def set_new_batch(self, contract_name, params_deploy):
-        template_file = os.path.join(_CURRENT_DIR, "templates", "polygon_gen_template.json")
-        temp_template = None
-        with open(template_file, "r") as f:
-            temp_template = json.load(f)[0]
-        temp_template["id"] = 1
-        self.template.append(temp_template)
-        temp_genesis = copy.deepcopy(self.template[0]["genesis"]["accounts"])
-        for el in temp_genesis:
-            el["nonce"] = str(self.nonces[el["address"]])
-        self.template[-1]["genesis"]["accounts"] = temp_genesis
-        self.template[-1]["genesis"]["contracts"] = [{
-            "contractName": contract_name,
-            "paramsDeploy": params_deploy
-        }]
-        self.genesis = temp_genesis
-        self.txs = self.template[-1]["txs"]
-
-
-    def get_nonce(self, addr):
-        """Get the nonce for a given address and increment it by 1"""
-        assert addr in self.nonces
-        nonce = self.nonces[addr]
-        self.nonces[addr] += 1 
-        return nonce
-
-    def get_address(self, key):
-        assert key in self.address_map
-        return self.address_map[key]
-
-    def get_balance(self, addr):
-        raise NotImplementedError("get_balance is not supported")
-
-    def get_account(self, key=None):
-        raise NotImplementedError("get_account is not supported")
-
-    def transfer(self, from_priv_key, to_addr, amount, gas):
-        from_addr = self.get_address(from_priv_key)
-        amount = Web3.to_wei(amount, 'ether')
-        transaction = {
-            'to': to_addr,
-            'value': str(amount),
-            "chainId": self.chain_id,
-            "nonce": self.get_nonce(from_addr),
-            "from": from_addr,
-            "gasPrice": "1000000000",
-            "gasLimit": 1000000000
-        }
-        receipt = self.send_transaction(transaction, from_priv_key, from_addr, gas, True)
+    def run(self, controller, data):
+        contract = data["contracts"][self.contract_name]
+        contract_src = contract["path"]
+        is_yul = contract_src.split('.')[-1] == "yul"
+        receipt, contract_instance, contract_address, storage_layout = deploy_contract(
+            controller, self.contract_name, contract_src, is_yul, self.from_priv_key(data),
+            resolve_arguments(self.constructor_args, data)
+        )
+        print(receipt)
+        contract["instance"] = contract_instance
+        contract["address"] = contract_address
+        contract["storage_layout"] = storage_layout
         return receipt
 
-    def deploy_contract(self, contract_path, contract_name, from_priv_key, constructor_args, is_yul=False):
-        assert self.gen_template
-        from_addr = self.get_address(from_priv_key)
-        transaction = {
-            "from": from_addr,
-            "to": "deploy",
-            "nonce": self.get_nonce(from_addr),
-            "value": "0",
-            "contractName": contract_name,
-            "params": constructor_args,
-            "gasLimit": 10000000,
-            "gasPrice": "1000000000",
-            "chainId": self.chain_id
-        }
-        receipt = self.send_transaction(transaction, from_priv_key, from_addr, None, True)
-        # Return the transaction instead of a receipt
-        # Return contract name instead of contract address
-        return receipt, None, contract_name, None
-
-    def send_transaction(self, transaction, priv_key, from_addr, gas, include_gas_price):
-        # Instead of the receipt just add the transaction to the batch and return the JSON
-        self.txs.append(transaction)
-        return transaction
-
-    def execute(self, priv_key, contract, contract_address, func_name, func_args, call, amount):
-        assert self.gen_template
-        amount = Web3.to_wei(amount, 'ether')
-        if call:
-            raise NotImplementedError("call is not implemented yet")
-        else:
-            from_addr = self.get_address(priv_key)
-            transaction = {
-                "from": from_addr,
-                "to": "contract",
-                "nonce": self.get_nonce(from_addr),
-                "value": amount,
-                "contractName": contract_address,
-                "function": func_name,
-                "params": func_args,
-                "gasLimit": 100000,
-                "gasPrice": "1000000000",
-                "chainId": self.chain_id
-            }
-            tx_receipt = self.send_transaction(transaction, priv_key, from_addr, None, False)
-            return tx_receipt, None
-
 
-def run_zksolc(file_path, is_yul):
-    if is_yul:
-        cmd: list[Unknown]  = ["zksolc", "--yul", "--bin", file_path]
-    else:
-        cmd: list[Unknown]  = ["zksolc", "--combined-json", "abi,bin,storage-layout", file_path]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    # Check if zksolc completed successfully
-    if result.returncode != 0:
-        print(f"zksolc failed with the following error:\n{result.stderr}")
+@dataclass
+class ExecuteTx:
+    id: str
+    from_priv_key: Any
+    contract_instance: Any
+    contract_address: Any
+    func_name: str
+    func_args: list
+    call: bool
+    amount: Any
 
-    try:
-        # Parsing the output
-        if is_yul:
-            bytecode = result.stdout.strip().split(' ')[-1]
-            abi, storage_layout = get_yul_abi_storage_layout()
-            data = {
-                'contracts': {file_path + ":Contract1": {
-                    'abi': abi, 'storage-layout': storage_layout, 
-                    'bin': bytecode, 'factory-deps': {}
-                }},
-                # Use some hardcoded values here
-                'version': '0.8.20+commit.a1b79de6.Darwin.appleclang', 'zk_version': '1.3.13'
-            }
-        else:
-            data = json.loads(result.stdout)
-        return data
-
-    except json.JSONDecodeError as e:
-        # Handle JSON parsing errors
-        print(f"Failed to parse zksolc output as JSON. Error: {e}")
-        sys.exit(1)
+    def run(self, controller, data):
+        receipt, returned_value = execute(
+            controller,
+            self.from_priv_key(data),
+            self.contract_instance(data),
+            self.contract_address(data),
+            self.func_name,
+            resolve_arguments(self.func_args, data),
+            self.call,
+            self.amount
+        )
+        print("-->tx_receipt\n", receipt)
+        print("-->returned_value\n", returned_value)
+        return receipt
 
 
-class ZkSyncController(BlockchainController):
-    def __init__(self, provider_url, chain_id):
-        self.w3 = ZkSyncBuilder.build(provider_url)
-        #if not self.w3.is_connected():
-        #    raise ConnectionError("Unable to connect to the zksync node.")
-        self.chain_id = chain_id
-
-    def get_balance(self, addr):
-        balance_wei = self.w3.eth.get_balance(addr)
-        balance_eth = self.w3.from_wei(balance_wei, 'ether')
-        return balance_eth
-
-    def get_account(self, key=None):
-        if key is None:
-            priv_key = Web3.to_hex(os.urandom(32))
-            account = Account.from_key(priv_key)
-        else: 
-            priv_key = HexStr(key)
-            account = Account.from_key(priv_key)
-        return priv_key, account, account.address
-
-    def transfer(self, from_priv_key, to_addr, amount, gas):
-        account = Account.from_key(from_priv_key)
-        from_addr = account.address
-        # Signer is used to generate signature of provided transaction
-        signer = PrivateKeyEthSigner(account, self.chain_id)
-
-        # Get nonce of ETH address on zkSync network
-        nonce = self.w3.zksync.get_transaction_count(
-            from_addr, ZkBlockParams.COMMITTED.value
+def compile_tx(transaction):
+    tx_type = transaction["type"]
+    tx_args = transaction["args"]
+    tx_id = transaction["id"]
+    if tx_type == "transfer":
+        return TransferTx(
+            tx_id, compile_reference(tx_args["from_priv_key"]), compile_reference(tx_args["to_addr"]),
+            tx_args["amount"], tx_args["gas"]
         )
-
-        # Get current gas price in Wei
-        gas_price = self.w3.zksync.gas_price
-
-        # Create transaction
-        tx_func_call = TxFunctionCall(
-            chain_id=self.chain_id,
-            nonce=nonce,
-            from_=from_addr,
-            to=to_checksum_address(to_addr),
-            value=self.w3.to_wei(amount, "ether"),
-            data=HexStr("0x"),
-            gas_limit=0,  # UNKNOWN AT THIS STATE
-            gas_price=gas_price,
-            max_priority_fee_per_gas=100_000_000,
+    if tx_type == "deploy_contract":
+        return DeployTx(
+            tx_id, tx_args["contract_name"], compile_reference(tx_args["from_priv_key"]),
+            compile_arguments(tx_args["constructor_args"])
         )
+    if tx_type == "execute":
+        return ExecuteTx(
+            tx_id,
+            compile_reference(tx_args["from_priv_key"]),
+            compile_reference(tx_args["contract_instance"]),
+            compile_reference(tx_args["contract_address"]),
+            tx_args["func_name"],
+            compile_arguments(tx_args["func_args"]),
+            tx_args["call"],
+            tx_args.get("amount", 0)
+        )
+    raise ValueError(f"Unknown transaction type: {tx_type}")
 
-        # ZkSync transaction gas estimation
-        estimate_gas = self.w3.zksync.eth_estimate_gas(tx_func_call.tx)
-
-        # Convert transaction to EIP-712 format
-        tx_712 = tx_func_call.tx712(estimate_gas)
 
-        # Sign message & encode it
-        signed_message = signer.sign_typed_data(tx_712.to_eip712_struct())
+def add_accounts(controller, data, accounts):
+    """
+    Merge the accounts of a spec into the state and compute the missing
+    addresses.
+    """
+    state = data.setdefault("accounts", {"pv": {}, "address": {}})
+    for name, pv in accounts.get("pv", {}).items():
+        address = accounts.get("address", {}).get(name)
+        if address is None:
+            _, _, address = controller.get_account(pv)
+        state["pv"][name] = pv
+        state["address"][name] = address
+        print("=>", pv, address)
 
-        # Encode signed message
-        msg = tx_712.encode(signed_message)
 
-        # Transfer ETH
-        tx_hash = self.w3.zksync.send_raw_transaction(msg)
+def read_transactions_spec(transactions_file):
+    """
+    Yield the sections of a transactions spec. A .jsonl spec is streamed: each
+    line is either a transaction or an object with "accounts" and/or
+    "contracts" to add to the state, which must come before the transactions
+    that use them.
+    """
+    if not transactions_file.endswith(".jsonl"):
+        with open(transactions_file, 'r') as f:
+            data = json.load(f)
+        yield {"accounts": data["accounts"], "contracts": data.get("contracts", {})}
+        yield from data["transactions"]
+        return
+    with open(transactions_file, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def reference_keys(tx):
+    """
+    Key paths of all the state references of a compiled transaction.
+    """
+    references = []
+    for field in dataclasses.fields(tx):
+        value = getattr(tx, field.name)
+        values = value if isinstance(value, list) else [value]
+        references.extend(v.args[1] for v in values if isinstance(v, functools.partial))
+    return references
 
-        # Wait for transaction to be included in a block
-        tx_receipt = self.w3.zksync.wait_for_transaction_receipt(
-            tx_hash, timeout=240, poll_latency=0.5
-        )
-        return tx_receipt
 
-    def deploy_contract(self, contract_path, contract_name, from_priv_key, constructor_args, is_yul=False):
-        account = Account.from_key(from_priv_key)
-        # Signer is used to generate signature of provided transaction
-        signer = PrivateKeyEthSigner(account, self.chain_id)
+class TxDependencies:
+    """
+    Track the transactions a transaction has to wait for: the previous
+    transaction of its sender (nonce order), the last deployment of every
+    contract it references, and its explicit "depends_on" ids. Redeploying a
+    contract also waits for the transactions that used the previous
+    deployment.
+    """
+    def __init__(self):
+        self.last_by_sender = {}
+        self.last_deploy = {}
+        self.readers = {}
+        self.by_id = {}
+
+    def add(self, counter, tx, data, depends_on):
+        deps = set()
+        try:
+            sender = tx.from_priv_key(data)
+        except (KeyError, IndexError, TypeError):
+            sender = tx.from_priv_key.args[1]
+        if sender in self.last_by_sender:
+            deps.add(self.last_by_sender[sender])
+        self.last_by_sender[sender] = counter
+
+        for keys in reference_keys(tx):
+            if len(keys) > 1 and keys[0] == "contracts" and keys[1] in self.last_deploy:
+                deps.add(self.last_deploy[keys[1]])
+                self.readers.setdefault(keys[1], []).append(counter)
+        if isinstance(tx, DeployTx):
+            deps.update(self.readers.pop(tx.contract_name, []))
+            if tx.contract_name in self.last_deploy:
+                deps.add(self.last_deploy[tx.contract_name])
+            self.last_deploy[tx.contract_name] = counter
+
+        for tx_id in depends_on:
+            assert tx_id in self.by_id, f"Transaction {tx.id} depends on unknown or later transaction {tx_id}"
+            deps.add(self.by_id[tx_id])
+        self.by_id[tx.id] = counter
+        deps.discard(counter)
+        return deps
+
+
+def execute_txs(controller, transactions_file, concurrency=1):
+    """
+    Run the transactions of a spec, up to `concurrency` at a time. A
+    transaction is only submitted once the transactions it depends on (see
+    TxDependencies) have finished, so with a concurrency of 1 the spec runs in
+    order. At most `concurrency * 32` transactions are read ahead.
+    """
+    data = {"accounts": {"pv": {}, "address": {}}, "contracts": {}}
+    entries = read_transactions_spec(transactions_file)
+    dependencies = TxDependencies()
+    window = concurrency * 32
+    waiting = {}
+    running = {}
+    done = set()
+    exhausted = False
+    counter = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            while not exhausted and len(waiting) < window:
+                entry = next(entries, None)
+                if entry is None:
+                    exhausted = True
+                elif "type" not in entry:
+                    if "accounts" in entry:
+                        # Compute accounts' addresses
+                        print("=== Compute accounts' addresses ===")
+                        add_accounts(controller, data, entry["accounts"])
+                    data["contracts"].update(entry.get("contracts", {}))
+                else:
+                    if counter == 0:
+                        print("=== Execute transactions ===")
+                    tx = compile_tx(entry)
+                    deps = dependencies.add(counter, tx, data, entry.get("depends_on", []))
+                    waiting[counter] = (tx, deps)
+                    counter += 1
+
+            # Waiting transactions are in spec order
+            for tx_counter, (tx, deps) in list(waiting.items()):
+                if len(running) >= concurrency:
+                    break
+                if deps <= done:
+                    del waiting[tx_counter]
+                    print("=>", f"TX-{tx_counter}", tx.id)
+                    running[executor.submit(tx.run, controller, data)] = tx_counter
+
+            if not running:
+                break
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                future.result()
+                done.add(running.pop(future))
 
-        # Get nonce of ETH address on zkSync network
+###############################################################################
 
-        nonce = self.w3.zksync.get_transaction_count(
-            account.address, EthBlockParams.PENDING.value
-        )
+######################## Transaction Lifecycle Metrics ########################
 
-        # Get current gas price in Wei
-        gas_price = self.w3.zksync.gas_price
+# Lifecycle stages recorded for every transaction, in order. The controllers
+# mark them while sending; the batch stages are resolved after a cell.
+TX_STAGES = ["start", "built", "signed", "submitted", "acked", "included", "batch_committed", "batch_proved"]
 
-        compiled_contract = self.compile_contract(contract_path, contract_name, is_yul)
-        t_contract = contract_path + ":" + contract_name
-        compiled_contract['contracts'] = {
-            t_contract: compiled_contract['contracts'][t_contract]
-        }
+# Latency phases reported per cell: (name, from stage, to stage)
+TX_PHASES = [
+    ("build", "start", "built"),
+    ("sign", "built", "signed"),
+    ("submit_to_ack", "submitted", "acked"),
+    ("ack_to_receipt", "acked", "included"),
+    ("end_to_end", "start", "included"),
+    ("to_batch_committed", "start", "batch_committed"),
+    ("to_batch_proved", "start", "batch_proved"),
+]
 
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(mode='w+', suffix=".json") as tmp_file:
-            json.dump(compiled_contract, tmp_file)
-            tmp_file.flush()  # Ensure that all data is written to the file before reading it elsewhere
-            tmp_file_path = Path(tmp_file.name)
-            encoded_contract = ContractEncoder.from_json(self.w3, tmp_file_path)[0]
-
-        # Encode the constructor arguments
-        encoded_constructor = encoded_contract.encode_constructor(*constructor_args)
-
-        # Create deployment contract transaction
-        create_contract = TxCreateContract(
-            web3=self.w3,
-            chain_id=self.chain_id,
-            nonce=nonce,
-            from_=account.address,
-            gas_limit=0,  # UNKNOWN AT THIS STATE
-            gas_price=gas_price,
-            bytecode=encoded_contract.bytecode,
-            call_data=encoded_constructor,
-        )
+_RECORDER = None
 
-        # ZkSync transaction gas estimation
-        estimate_gas = self.w3.zksync.eth_estimate_gas(create_contract.tx)
 
-        # Convert transaction to EIP-712 format
-        tx_712 = create_contract.tx712(estimate_gas)
+def traced(task):
+    """
+    Run a task that sends one transaction, tracing its lifecycle into the
+    current cell recorder.
+    """
+    trace = {"start": time.time()}
+    set_trace(trace)
+    receipt = None
+    try:
+        receipt = task()
+        return receipt
+    finally:
+        set_trace(None)
+        if _RECORDER is not None:
+            _RECORDER.record(trace, receipt)
 
-        # Sign message
-        signed_message = signer.sign_typed_data(tx_712.to_eip712_struct())
 
-        # Encode signed message
-        msg = tx_712.encode(signed_message)
+class LatencyHistogram:
+    """
+    Latency histogram in the spirit of HdrHistogram: values are bucketed with
+    a fixed number of significant digits, so memory stays bounded however
+    many samples are recorded and percentiles are accurate to the bucket width.
+    """
+    def __init__(self, significant_digits=3):
+        self.significant_digits = significant_digits
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def record(self, value):
+        bucket = float(f"{max(value, 0):.{self.significant_digits}g}")
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        if self.total == 0:
+            return 0
+        threshold = q * self.total
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= threshold:
+                return bucket
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "mean": self.sum / self.total if self.total else 0,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
 
-        # Deploy contract
-        tx_hash = self.w3.zksync.send_raw_transaction(msg)
 
-        # Wait for deployment contract transaction to be included in a block
-        tx_receipt = self.w3.zksync.wait_for_transaction_receipt(
-            tx_hash, timeout=240, poll_latency=0.5
-        )
-        storage_layout = compiled_contract['contracts'][contract_path +':' + contract_name]['storage-layout']
-        return tx_receipt, encoded_contract, tx_receipt["contractAddress"], storage_layout
-
-    def execute(self, priv_key, contract, contract_address, func_name, func_args, call, amount):
-        account = Account.from_key(priv_key)
-        if call:
-            value = getattr(contract.contract.functions, func_name)(*func_args).call({
-                "from": account.address,
-                "to": contract_address
+class CellRecorder:
+    """
+    Collects the receipts and lifecycle timestamps of the transactions of a
+    benchmark cell.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.txs = []
+        self.elapsed = None
+        self.lock = threading.Lock()
+
+    def record(self, trace, receipt):
+        receipt = receipt if receipt is not None else {}
+        with self.lock:
+            self.txs.append({
+                "trace": trace,
+                "status": receipt.get("status", 0),
+                "gas_used": receipt.get("gasUsed"),
+                "block": receipt.get("blockNumber"),
+                "batch": None,
             })
-            return None, value
-        else:
-            gas_price = self.w3.zksync.gas_price
-
-            # Get nonce of ETH address on zkSync network
-            nonce = self.w3.zksync.get_transaction_count(account.address, EthBlockParams.LATEST.value)
 
-            # Execute function
-            try:
-                tx = getattr(contract.contract.functions, func_name)(*func_args).build_transaction({
-                    "nonce": nonce,
-                    "from": account.address,
-                    "value": self.w3.to_wei(amount, "ether"),
-                    "maxPriorityFeePerGas": 1_000_000,
-                    "maxFeePerGas": gas_price,
-                    "to": contract_address
-                })
-                # Sign transaction
-                signed = account.sign_transaction(tx)
-
-                # Send transaction to zkSync network
-                tx_hash = self.w3.zksync.send_raw_transaction(signed.rawTransaction)
-
-                # Wait for transaction to be finalized
-                receipt = self.w3.zksync.wait_for_transaction_receipt(tx_hash)
-            except web3.exceptions.ContractLogicError as e:
-                print("ContractLogicError:", e)
-                receipt = {"status": 0}
-
-            return receipt, None
-
-    def send_transaction(self, transaction, priv_key, from_addr, gas, include_gas_price):
-        raise NotImplementedError
-
-    def compile_contract(self, source_code_path, contract_name, is_yul): 
-        if not check_executable_exists("zksolc"):
-            print("Error: zksolc compiler is not installed")
-            sys.exit(1)
-        combined_json = run_zksolc(source_code_path, is_yul)
-        return combined_json
+    def resolve_batches(self, controller):
+        """
+        Fill in the batch and its lifecycle stages from the node, where it
+        exposes them. The node is queried once per L2 block.
+        """
+        blocks = {}
+        for block in {tx["block"] for tx in self.txs if tx["block"] is not None}:
+            blocks[block] = controller.get_block_batch(block)
+        for tx in self.txs:
+            times = blocks.get(tx["block"])
+            if not times:
+                continue
+            tx["batch"] = times["batch"]
+            for stage in ("batch_committed", "batch_proved"):
+                if times[stage] is not None:
+                    tx["trace"][stage] = times[stage]
+
+    def histograms(self):
+        histograms = {}
+        for phase, begin, end in TX_PHASES:
+            histogram = LatencyHistogram()
+            for tx in self.txs:
+                if begin in tx["trace"] and end in tx["trace"]:
+                    histogram.record(tx["trace"][end] - tx["trace"][begin])
+            if histogram.total:
+                histograms[phase] = histogram
+        return histograms
+
+
+def cell_name(cell):
+    """
+    Name of a cell in the reports and the results database. It includes
+    every non-default setting of the cell, so that the cells of a matrix get
+    distinct names, e.g. transfers_100_different_c32_p4 or
+    transfers_openloop_50tps60s_100tps60s_senders20.
+    """
+    if cell.steps:
+        name = f"{cell.workload}_openloop_" + "_".join(f"{rate:g}tps{duration:g}s" for rate, duration in cell.steps)
+        if cell.senders:
+            name += f"_senders{cell.senders}"
+    else:
+        name = f"{cell.workload}_{cell.size}_{'different' if cell.is_different else 'same'}"
+    # Open-loop cells default to one transaction in flight per sender
+    if cell.concurrency != (cell.senders if cell.steps else 1):
+        name += f"_c{cell.concurrency}"
+    if cell.processes != 1:
+        name += f"_p{cell.processes}"
+    if cell.options:
+        if cell.options.get("mix") != DEFAULT_MIX:
+            name += "_" + "-".join(f"{tx_type}{weight:g}" for tx_type, weight in cell.options["mix"].items())
+        name += f"_s{cell.options['seed']}_o{cell.options['overlap']:g}"
+    if cell.repetition > 0:
+        name += f"_r{cell.repetition}"
+    return name
+
+
+def cell_names(cells):
+    """
+    Names of the cells of a matrix (see cell_name), with the index of the
+    cell appended to those that are still not unique (repeated entries).
+    """
+    names = [cell_name(cell) for cell in cells]
+    return [name if names.count(name) == 1 else f"{name}_{i}" for i, name in enumerate(names)]
 
-########################## Run TXs from JSON specs ############################
 
-def transfer(controller, from_priv_key, to_addr, amount, gas):
-    receipt = controller.transfer(
-        from_priv_key, to_addr, amount, gas
-    )
-    return receipt
-
-def deploy_contract(controller, contract_name, contract_src, is_yul, from_priv_key, constructor_args):
-    receipt, contract_instance, contract_address, storage_layout = controller.deploy_contract(
-        contract_src, contract_name, from_priv_key, constructor_args, is_yul
-    )
-    return receipt, contract_instance, contract_address, storage_layout
+def write_latency_report(run_dir, recorders):
+    """
+    Write the per-tx lifecycle timestamps (txs.csv) and the per-cell latency
+    percentiles (latency.csv, latency.json) of a run.
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, "txs.csv"), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["cell", "status", "block", "batch"] + TX_STAGES)
+        for recorder in recorders:
+            for tx in recorder.txs:
+                writer.writerow(
+                    [recorder.name, tx["status"], tx["block"], tx["batch"]] + [tx["trace"].get(s, "") for s in TX_STAGES]
+                )
 
-def execute(
-        controller, from_priv_key, contract_instance, contract_address, 
-        func_name, func_args, call, amount
-    ):
-    receipt, returned_value = controller.execute(
-            from_priv_key, contract_instance, contract_address, 
-            func_name, func_args, call, amount
-    )
-    return receipt, returned_value
+    report = {}
+    for recorder in recorders:
+        report[recorder.name] = {
+            phase: dict(histogram.summary(), buckets=sorted(histogram.counts.items()))
+            for phase, histogram in recorder.histograms().items()
+        }
+    with open(os.path.join(run_dir, "latency.json"), 'w') as f:
+        json.dump(report, f, indent=4)
+    with open(os.path.join(run_dir, "latency.csv"), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["cell", "phase", "count", "mean", "p50", "p90", "p99", "max"])
+        for name, phases in report.items():
+            for phase, stats in phases.items():
+                writer.writerow([name, phase] + [stats[k] for k in ("count", "mean", "p50", "p90", "p99", "max")])
+    print("Latency report written to", run_dir)
 
-def execute_txs(controller, transactions_json):
-    with open(transactions_json, 'r') as f:
-        data = json.load(f)
+###############################################################################
 
-    # Compute accounts' addresses
-    print("=== Compute accounts' addresses ===")
-    for name, pv in data["accounts"]["pv"].items():
-        address = data["accounts"]["address"].get(name)
-        if address is None:
-            _, _, address = controller.get_account(pv)
-            data["accounts"]["address"][name] = address
-        print("=>", pv, address)
+################################## Profiling ##################################
 
-    print("=== Execute transactions ===")
-    for counter, transaction in enumerate(data["transactions"]):
-        tx_type = transaction["type"]
-        tx_args = transaction["args"]
-        tx_id = transaction["id"]
-        print("=>", f"TX-{counter}", tx_id)
-
-        if tx_type == "transfer":
-            from_priv_key = eval("data" + tx_args["from_priv_key"])
-            to_addr = eval("data" + tx_args["to_addr"])
-            amount = tx_args["amount"]
-            gas = tx_args["gas"]
-
-            receipt = transfer(controller, from_priv_key, to_addr, amount, gas)
-
-        if tx_type == "deploy_contract":
-            contract_name = tx_args["contract_name"]
-            contract_src = data["contracts"][contract_name]["path"]
-            is_yul = contract_src.split('.')[-1] == "yul"
-            from_priv_key = eval("data" + tx_args["from_priv_key"])
-            constructor_args = tx_args["constructor_args"]
-            # Replace any argument that is from the state with its current
-            # value. We mainly do that to get addresses
-            for i, element in enumerate(constructor_args):
-                if isinstance(element, str) and element.startswith('data['):
-                    constructor_args[i] = eval(element)
-            receipt, contract_instance, contract_address, storage_layout = deploy_contract(
-                controller, contract_name, contract_src, is_yul, from_priv_key, constructor_args
-            )
-            print(receipt)
-            data["contracts"][contract_name]["instance"] = contract_instance
-            data["contracts"][contract_name]["address"] = contract_address
-            data["contracts"][contract_name]["storage_layout"] = storage_layout
-
-        if tx_type == "execute":
-            from_priv_key = eval("data" + tx_args["from_priv_key"])
-            contract_instance = eval("data" + tx_args["contract_instance"])
-            contract_address = eval("data" + tx_args["contract_address"])
-            storage_layout = eval("data" + tx_args["storage_layout"])
-            contract_name = tx_args["contract_name"]
-            func_name = tx_args["func_name"]
-            func_args = tx_args["func_args"]
-            amount = tx_args.get("amount", 0)
-            for i, element in enumerate(func_args):
-                if isinstance(element, str) and element.startswith('data['):
-                    func_args[i] = eval(element)
-            call = tx_args["call"]
-
-            to_addr = contract_address
-
-            receipt, returned_value = execute(
-                controller,
-                from_priv_key, 
-                contract_instance, 
-                contract_address, 
-                func_name, 
-                func_args, 
-                call, 
-                amount
-            )
-            print("-->tx_receipt\n", receipt)
-            print("-->returned_value\n", returned_value)
+class BlockProfiler:
+    """
+    Profiles benchmark blocks (see --profile). For every block, `output_dir`
+    gets, prefixed with the index of the block:
+    - mode "cprofile": <block>.prof, the cProfile stats of the thread running
+      the block (readable with pstats or snakeviz). Worker threads of
+      concurrent blocks are not profiled, use "sample" for those.
+    - mode "sample": <block>.collapsed, the stacks of all threads sampled every
+      `interval` sec, as "frame;frame;... count" lines (flamegraph.pl,
+      speedscope). This is a wall-clock profile, so time blocked on the node
+      shows up too.
+    - with `memory`: <block>.memory.txt, the top allocation sites (tracemalloc).
+    profile.json collects, per block, its wall and CPU time, the time spent in
+    each transaction phase (build, sign, submit_to_ack, ack_to_receipt, ...)
+    and the traced memory peak.
+    """
+    def __init__(self, output_dir, mode="sample", interval=0.005, memory=False):
+        assert mode in ("cprofile", "sample"), f"Unknown profiling mode {mode}"
+        self.output_dir = output_dir
+        self.mode = mode
+        self.interval = interval
+        self.memory = memory
+        self.blocks = []
+        os.makedirs(output_dir, exist_ok=True)
+        # A resumed run keeps the blocks profiled before the interruption
+        summary_file = os.path.join(output_dir, "profile.json")
+        if os.path.exists(summary_file):
+            with open(summary_file, 'r') as f:
+                self.blocks = json.load(f)
+
+    @contextlib.contextmanager
+    def block(self, name, recorder=None):
+        prefix = os.path.join(self.output_dir, f"{len(self.blocks):03d}_{name}")
+        stacks = {}
+        stop = threading.Event()
+        sampler = profile = None
+        if self.mode == "sample":
+            sampler = threading.Thread(target=self.sample, args=(stacks, stop), daemon=True)
+            sampler.start()
+        else:
+            profile = cProfile.Profile()
+        if self.memory:
+            tracemalloc.start()
+        start, cpu_start = time.time(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall, cpu = time.time() - start, time.process_time() - cpu_start
+            if sampler is not None:
+                stop.set()
+                sampler.join()
+            summary = {
+                "block": name, "wall": wall, "cpu": cpu, "elapsed": recorder.elapsed if recorder else None,
+                "phases": {}, "memory_peak": None,
+            }
+            if profile is not None:
+                profile.dump_stats(prefix + ".prof")
+            else:
+                with open(prefix + ".collapsed", 'w') as f:
+                    for stack, count in sorted(stacks.items()):
+                        f.write(f"{stack} {count}\n")
+            if self.memory:
+                snapshot = tracemalloc.take_snapshot()
+                summary["memory_peak"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                with open(prefix + ".memory.txt", 'w') as f:
+                    for stat in snapshot.statistics("lineno")[:25]:
+                        f.write(f"{stat}\n")
+            if recorder is not None:
+                for phase, histogram in recorder.histograms().items():
+                    summary["phases"][phase] = {
+                        "count": histogram.total, "total": histogram.sum, "mean": histogram.sum / histogram.total
+                    }
+            self.blocks.append(summary)
+            with open(os.path.join(self.output_dir, "profile.json"), 'w') as f:
+                json.dump(self.blocks, f, indent=4)
+            phases = ", ".join(f"{phase} {stats['total']:.2f}s" for phase, stats in summary["phases"].items())
+            print(f"Profile of {name}: wall {wall:.2f}s, cpu {cpu:.2f}s" + (f" ({phases})" if phases else ""))
+
+    def sample(self, stacks, stop):
+        own = threading.get_ident()
+        while not stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack = ";".join(reversed(frames))
+                stacks[stack] = stacks.get(stack, 0) + 1
+
+
+def profile_block(profiler, name, recorder=None):
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.block(name, recorder)
 
 ###############################################################################
 
@@ -687,146 +641,193 @@ def transfer_task(controller, from_priv_key, to_addr, amount, gas):
     return receipt
 
 
-def benchmark_transfers_block(controller, addresses, timeout, nr_transfers, amount, gas, is_different=False, is_parallel=False):
-    assert len(addresses) >= nr_transfers, f"Not enough addresses for transfers benchmark. Need at least {nr_transfers}."
-    # variables to keep track of elapsed time and how much time we need to wait
-    start = 0
-    elapsed = 0
-    to_wait = 0
+def execute_task(controller, from_priv_key, contract_instance, contract_address, func_name, func_args):
+    receipt, _ = execute(
+        controller, from_priv_key, contract_instance,
+        contract_address, func_name, func_args,
+        False, 0
+    )
+    return receipt
 
-    if not is_different:
-        from_priv_key = addresses[0][0]
-        to_addr = addresses[1][1]
 
-    # If it is a PolygonController we need to create a new instance every time
-    if isinstance(controller, PolygonController):
-        controller = PolygonController(None, controller.chain_id, addresses)
+def deploy_task(controller, from_priv_key, contract_src, contract_name, constructor_args):
+    receipt, _, _, _ = controller.deploy_contract(
+        contract_src, contract_name, from_priv_key, constructor_args
+    )
+    return receipt
 
-    print("=======", f"{nr_transfers} transfer(s)", "=======")
-    start = time.time()
 
-    if is_parallel and not isinstance(controller, PolygonController):
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = []
-            for i in range(0, nr_transfers):
-                if is_different:
-                    from_priv_key = addresses[i][0]
-                    to_addr = addresses[i+1][1]
-                futures.append(
-                    executor.submit(transfer_task, controller, from_priv_key, to_addr, amount, gas)
-                )
+def run_block_tasks(controller, tasks, concurrency=1):
+    """
+    Run the transactions of a benchmark block. Every task sends a single
+    transaction and returns its receipt. With concurrency > 1 the tasks are
+    submitted from a thread pool, except for Polygon where transactions are
+    only appended to the batch.
+    """
+    if concurrency > 1 and not isinstance(controller, PolygonController):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(traced, task) for task in tasks]
             # Wait for all futures to complete
             results = [future.result() for future in concurrent.futures.as_completed(futures)]
-            total_succeed = sum(1 for r in results if r['status'] == 1)
-            total_failed = sum(1 for r in results if r['status'] != 1)
-            print("Total succeed", total_succeed)
-            print("Total failed", total_failed)
+        total_succeed = sum(1 for r in results if r['status'] == 1)
+        total_failed = sum(1 for r in results if r['status'] != 1)
+        print("Total succeed", total_succeed)
+        print("Total failed", total_failed)
+        return results
+
+    results = []
+    for task in tasks:
+        receipt = traced(task)
+        if not isinstance(controller, PolygonController):
+            print("Receipt status:", receipt["status"])
+        results.append(receipt)
+    return results
 
-    else:
-        for i in range(0, nr_transfers):
-            if is_different:
-                from_priv_key = addresses[i][0]
-                to_addr = addresses[i+1][1]
-            receipt = transfer(controller, from_priv_key, to_addr, amount, gas)
-            if not isinstance(controller, PolygonController):
-                print("Receipt status:", receipt["status"])
-
-    elapsed = time.time() - start
-    to_wait = timeout - elapsed
+
+def finish_block(controller, start, timeout, result_file, repetition=0, end=None):
+    elapsed = (end or time.time()) - start
+    to_wait = timeout - (time.time() - start)
     print("===>Elapsed time:", elapsed, ", We have to wait:", to_wait, "sec")
+    if _RECORDER is not None:
+        _RECORDER.elapsed = elapsed
     # If we are using Polygon we do not need to wait
     if not isinstance(controller, PolygonController):
-        time.sleep(to_wait)
+        time.sleep(max(to_wait, 0))
     # but we need to save the results into a JSON
     else:
-        # Let's save the results into a JSON
-        is_same = "same" if not is_different else "different"
-        result_name = os.path.join(_CURRENT_DIR, "polygon_bench", f"{nr_transfers}_{is_same}_transfers.json")
+        if repetition > 0:
+            result_file = f"{Path(result_file).stem}_r{repetition}.json"
+        result_name = os.path.join(_CURRENT_DIR, "polygon_bench", result_file)
         with open(result_name, 'w') as f:
             json.dump(controller.template, f, indent=4)
 
 
-def benchmark_transfers(controller, addresses, timeout):
-    assert len(addresses) >= 201, "Not enough addresses for transfers benchmark. Need at least 201."
-    amount = 1
-    gas = 21000
-
-    print("=======", "Same Addresses", "=======")
-    benchmark_transfers_block(controller, addresses, timeout, 1, amount, gas)
-    benchmark_transfers_block(controller, addresses, timeout, 10, amount, gas)
-    benchmark_transfers_block(controller, addresses, timeout, 100, amount, gas)
-    benchmark_transfers_block(controller, addresses, timeout, 200, amount, gas)
-    print("============================")
-    print("=======", "Different Addresses", "=======")
-    benchmark_transfers_block(controller, addresses, timeout, 10, amount, gas, is_different=True)
-    benchmark_transfers_block(controller, addresses, timeout, 100, amount, gas, is_different=True)
-    benchmark_transfers_block(controller, addresses, timeout, 200, amount, gas, is_different=True)
-    print("=================================")
+_SHARD_BARRIER = None
 
 
-def benchmark_transfers_max(controller, addresses, timeout):
-    assert len(addresses) >= 4980, "Not enough addresses for max transfers benchmark. Need at least 4980."
-    amount = 1
-    gas = 21000
+def _init_transfer_shard(barrier):
+    global _SHARD_BARRIER
+    _SHARD_BARRIER = barrier
 
-    print("=======", "Different Addresses", "=======")
-    benchmark_transfers_block(controller, addresses, timeout, 498, amount, gas, is_different=True, is_parallel=True)
-    benchmark_transfers_block(controller, addresses, timeout, 996, amount, gas, is_different=True, is_parallel=True)
-    benchmark_transfers_block(controller, addresses, timeout, 2490, amount, gas, is_different=True, is_parallel=True)
-    benchmark_transfers_block(controller, addresses, timeout, 4980, amount, gas, is_different=True, is_parallel=True)
-    print("=================================")
 
+def _transfer_shard(controller_cls, provider_url, chain_id, routing, pairs, amount, gas, concurrency):
+    """
+    Worker process of a sharded transfers block. It builds its own controller
+    (and thus its own connection pool and signers), waits for the other
+    workers, then sends its share of the transfers.
+    """
+    global _RECORDER
+    controller = controller_cls(provider_url, chain_id, routing)
+    _RECORDER = CellRecorder("shard")
+    tasks = [functools.partial(transfer_task, controller, f, t, amount, gas) for f, t in pairs]
+    _SHARD_BARRIER.wait(timeout=600)
+    start = time.time()
+    run_block_tasks(controller, tasks, concurrency)
+    return {"start": start, "end": time.time(), "txs": _RECORDER.txs}
 
-def benchmark_erc20_block(
-        controller, addresses, timeout, nr_transfers, 
-        amount, contract_instance, contract_address, is_different=False):
-    # variables to keep track of elapsed time and how much time we need to wait
-    start = 0
-    elapsed = 0
-    to_wait = 0
 
+def run_sharded_transfers(controller, pairs, amount, gas, concurrency, processes):
+    """
+    Send the (from_priv_key, to_addr) transfers from `processes` worker
+    processes, each with `concurrency` threads, so that signing and encoding
+    are not bound by a single GIL. Returns when the first worker started and
+    the last one finished sending.
+    """
+    context = multiprocessing.get_context("spawn")
+    # All workers start sending at the same time
+    barrier = context.Barrier(processes)
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, mp_context=context,
+            initializer=_init_transfer_shard, initargs=(barrier,)) as executor:
+        futures = [
+            executor.submit(
+                _transfer_shard, type(controller), controller.provider_url, controller.chain_id, controller.routing,
+                pairs[i::processes], amount, gas, concurrency
+            )
+            for i in range(processes)
+        ]
+        shards = [future.result() for future in futures]
+    start = min(shard["start"] for shard in shards)
+    end = max(shard["end"] for shard in shards)
+
+    txs = [tx for shard in shards for tx in shard["txs"]]
+    if _RECORDER is not None:
+        _RECORDER.txs.extend(txs)
+    print("Total succeed", sum(1 for tx in txs if tx["status"] == 1))
+    print("Total failed", sum(1 for tx in txs if tx["status"] != 1))
+    for i, shard in enumerate(shards):
+        print(f"Shard {i}: {len(shard['txs'])} txs, start skew {shard['start'] - start:.3f}s,",
+              f"elapsed {shard['end'] - shard['start']:.3f}s")
+    return start, end
+
+
+def benchmark_transfers_block(
+        controller, addresses, timeout, nr_transfers, amount, gas,
+        is_different=False, concurrency=1, repetition=0, processes=1):
+    assert len(addresses) >= nr_transfers, f"Not enough addresses for transfers benchmark. Need at least {nr_transfers}."
     if not is_different:
         from_priv_key = addresses[0][0]
         to_addr = addresses[1][1]
 
-    # If it is a PolygonController we need to create a copy of the controller that
-    # includes the mint transactions and reset it to that after every block.
-    # This should also be safe for nonce management
-    # TODO: maybe we should reset the nonces as well because of the hack of
-    # setting the results of mint transactions directly into storage.
+    # If it is a PolygonController we need to create a new instance every time
     if isinstance(controller, PolygonController):
-        initial_controller = copy.deepcopy(controller)
-    print("=======", f"{nr_transfers} transfer(s)", "=======")
-    start = time.time()
+        controller = PolygonController(None, controller.chain_id, addresses)
+
+    pairs = []
     for i in range(0, nr_transfers):
         if is_different:
             from_priv_key = addresses[i][0]
             to_addr = addresses[i+1][1]
-        receipt, _ = execute(
-            controller, from_priv_key, contract_instance, 
-            contract_address, "transfer", [to_addr, amount], 
-            False, 0
-        )
-        if not isinstance(controller, PolygonController):
-            print("Receipt status:", receipt["status"])
-    elapsed = time.time() - start
-    to_wait = timeout - elapsed
-    print("===>Elapsed time:", elapsed, ", We have to wait:", to_wait, "sec")
-    # If we are using Polygon we do not need to wait
-    if not isinstance(controller, PolygonController):
-        time.sleep(to_wait)
-    # but we need to save the results into a JSON
+        pairs.append((from_priv_key, to_addr))
+
+    print("=======", f"{nr_transfers} transfer(s)", "=======")
+    if processes > 1 and not isinstance(controller, PolygonController):
+        assert is_different, "Sharding transfers across processes requires different addresses"
+        start, end = run_sharded_transfers(controller, pairs, amount, gas, concurrency, processes)
     else:
-        # Let's save the results into a JSON
-        is_same = "same" if not is_different else "different"
-        result_name = os.path.join(_CURRENT_DIR, "polygon_bench", f"gen-{nr_transfers}_{is_same}_erc20_transfers.json")
-        with open(result_name, 'w') as f:
-            json.dump(controller.template, f, indent=4)
-        # Reset the controller.
-        controller = initial_controller
+        tasks = [functools.partial(transfer_task, controller, f, t, amount, gas) for f, t in pairs]
+        start = time.time()
+        run_block_tasks(controller, tasks, concurrency)
+        end = None
+    is_same = "same" if not is_different else "different"
+    finish_block(controller, start, timeout, f"{nr_transfers}_{is_same}_transfers.json", repetition, end)
+
 
-def benchmark_erc20(controller, addresses, timeout):
-    assert len(addresses) >= 200, "Not enough addresses for ERC20 benchmark. Need at least 200."
+def benchmark_erc20_block(
+        controller, addresses, timeout, nr_transfers,
+        amount, contract_instance, contract_address,
+        is_different=False, concurrency=1, repetition=0):
+    if not is_different:
+        from_priv_key = addresses[0][0]
+        to_addr = addresses[1][1]
+
+    tasks = []
+    for i in range(0, nr_transfers):
+        if is_different:
+            from_priv_key = addresses[i][0]
+            to_addr = addresses[i+1][1]
+        tasks.append(functools.partial(
+            execute_task, controller, from_priv_key, contract_instance,
+            contract_address, "transfer", [to_addr, amount]
+        ))
+
+    print("=======", f"{nr_transfers} transfer(s)", "=======")
+    start = time.time()
+    run_block_tasks(controller, tasks, concurrency)
+    is_same = "same" if not is_different else "different"
+    finish_block(controller, start, timeout, f"gen-{nr_transfers}_{is_same}_erc20_transfers.json", repetition)
+
+
+def setup_erc20(controller, addresses, timeout, nr_addresses, contract_address=None):
+    """
+    Deploy the ERC20 contract and mint tokens to the first `nr_addresses`
+    addresses (to all of them for Polygon). Returns the contract instance and address. With the
+    `contract_address` of a previous setup (see --resume), only its instance
+    is loaded.
+    """
+    if contract_address is not None:
+        print("Reusing ERC20 contract at:", contract_address)
+        return controller.load_contract("contracts/erc20.sol", "ERC20Template", contract_address), contract_address
     # Initialize the ERC20 contract
     owner_priv_key = addresses[0][0]
     owner_address = addresses[0][1]
@@ -843,13 +844,17 @@ def benchmark_erc20(controller, addresses, timeout):
     print("Contract deployed at:", contract_address)
     if not isinstance(controller, PolygonController):
         print("Receipt status:", receipt["status"])
-    # Then we need to mint tokens to all the addresses
-    for i in addresses:
+    # Then we need to mint tokens to all the addresses we are going to use.
+    # Polygon vectors keep minting to every address, so that their first
+    # batch stays the same as that of the vectors already proved.
+    if isinstance(controller, PolygonController):
+        nr_addresses = len(addresses)
+    for i in addresses[:nr_addresses]:
         address = i[1]
         # Mint 100000 tokens
         receipt, _ = execute(
             controller,
-            owner_priv_key, contract_instance, contract_address, 
+            owner_priv_key, contract_instance, contract_address,
             "mint", [address, 100000], False, 0
         )
         if not isinstance(controller, PolygonController):
@@ -866,111 +871,53 @@ def benchmark_erc20(controller, addresses, timeout):
         }
         controller.set_new_batch("ERC20Template", params)
     print("==========================================")
+    return contract_instance, contract_address
 
-    # Finally we can start transferring tokens
-    amount = 10
-    print("=======", "Same Addresses", "=======")
-    benchmark_erc20_block(controller, addresses, timeout, 1, amount, contract_instance, contract_address)
-    benchmark_erc20_block(controller, addresses, timeout, 10, amount, contract_instance, contract_address)
-    benchmark_erc20_block(controller, addresses, timeout, 100, amount, contract_instance, contract_address)
-    benchmark_erc20_block(controller, addresses, timeout, 200, amount, contract_instance, contract_address)
-    print("============================")
-    print("=======", "Different Addresses", "=======")
-    benchmark_erc20_block(controller, addresses, timeout, 10, amount, contract_instance, contract_address, is_different=True)
-    benchmark_erc20_block(controller, addresses, timeout, 100, amount, contract_instance, contract_address, is_different=True)
-    benchmark_erc20_block(controller, addresses, timeout, 200, amount, contract_instance, contract_address, is_different=True)
-    print("=================================")
 
-
-def benchmark_deploy_block(controller, addresses, timeout, nr_deployments):
+def benchmark_deploy_block(controller, addresses, timeout, nr_deployments, concurrency=1, repetition=0):
     assert len(addresses) >= nr_deployments, f"Not enough addresses for deploy benchmark. Need at least {nr_deployments}."
-    # variables to keep track of elapsed time and how much time we need to wait
-    start = 0
-    elapsed = 0
-    to_wait = 0
-
-    # If it is a PolygonController we need to create a new instance every time
-    if isinstance(controller, PolygonController):
-        initial_controller = copy.deepcopy(controller)
-
-    print("=======", f"{nr_deployments} deployment(s)", "=======")
-    start = time.time()
+    tasks = []
     for i in range(0, nr_deployments):
         from_priv_key = addresses[i][0]
         constructor_args = [10]
-        receipt, _, _, _ = controller.deploy_contract(
-            "contracts/Greeter.sol", "Greeter", from_priv_key, constructor_args
-        )
-        if not isinstance(controller, PolygonController):
-            print("Receipt status:", receipt["status"])
-    elapsed = time.time() - start
-    to_wait = timeout - elapsed
-    print("===>Elapsed time:", elapsed, ", We have to wait:", to_wait, "sec")
-    # If we are using Polygon we do not need to wait
-    if not isinstance(controller, PolygonController):
-        time.sleep(to_wait)
-    # but we need to save the results into a JSON
-    else:
-        # Let's save the results into a JSON
-        result_name = os.path.join(_CURRENT_DIR, "polygon_bench", f"gen-deploy_{nr_deployments}.json")
-        with open(result_name, 'w') as f:
-            json.dump(controller.template, f, indent=4)
-        # Reset the controller.
-        controller = initial_controller
-
+        tasks.append(functools.partial(
+            deploy_task, controller, from_priv_key, "contracts/Greeter.sol", "Greeter", constructor_args
+        ))
 
-def benchmark_deploy(controller, addresses, timeout):
-    assert len(addresses) >= 200, "Not enough addresses for deploy benchmark. Need at least 200."
-    print("=======", "Start Benchmarking", "=======")
-    benchmark_deploy_block(controller, addresses, timeout, 1)
-    benchmark_deploy_block(controller, addresses, timeout, 10)
-    benchmark_deploy_block(controller, addresses, timeout, 100)
-    benchmark_deploy_block(controller, addresses, timeout, 200)
-    print("=====================================")
+    print("=======", f"{nr_deployments} deployment(s)", "=======")
+    start = time.time()
+    run_block_tasks(controller, tasks, concurrency)
+    finish_block(controller, start, timeout, f"gen-deploy_{nr_deployments}.json", repetition)
 
 
 def benchmark_sha256_block(
-        controller, addresses, timeout, nr_hashes, 
-        contract_instance, contract_address):
+        controller, addresses, timeout, nr_hashes,
+        contract_instance, contract_address, concurrency=1, repetition=0):
     assert len(addresses) >= 1, "Not enough addresses for SHA256 benchmark. Need at least 1."
-    # variables to keep track of elapsed time and how much time we need to wait
-    start = 0
-    elapsed = 0
-    to_wait = 0
-
     from_priv_key = addresses[0][0]
-
-    # If it is a PolygonController we need to create a new instance every time
-    if isinstance(controller, PolygonController):
-        initial_controller = copy.deepcopy(controller)
+    tasks = [
+        functools.partial(
+            execute_task, controller, from_priv_key, contract_instance,
+            contract_address, "random_hash_save", []
+        )
+        for _ in range(0, nr_hashes)
+    ]
 
     print("=======", f"{nr_hashes} hashes(s)", "=======")
     start = time.time()
-    for i in range(0, nr_hashes):
-        receipt, _ = execute(
-            controller, from_priv_key, contract_instance, 
-            contract_address, "random_hash_save", [], 
-            False, 0
-        )
-        if not isinstance(controller, PolygonController):
-            print("Receipt status:", receipt["status"])
-    elapsed = time.time() - start
-    to_wait = timeout - elapsed
-    print("===>Elapsed time:", elapsed, ", We have to wait:", to_wait, "sec")
-    # If we are using Polygon we do not need to wait
-    if not isinstance(controller, PolygonController):
-        time.sleep(to_wait)
-    # but we need to save the results into a JSON
-    else:
-        # Let's save the results into a JSON
-        result_name = os.path.join(_CURRENT_DIR, "polygon_bench", f"gen-{contract_address}_{nr_hashes}.json")
-        with open(result_name, 'w') as f:
-            json.dump(controller.template, f, indent=4)
-        # Reset the controller.
-        controller = initial_controller
+    run_block_tasks(controller, tasks, concurrency)
+    finish_block(controller, start, timeout, f"gen-{contract_address}_{nr_hashes}.json", repetition)
 
-def benchmark_sha256(controller, addresses, timeout, contract_src, contract_name):
-    assert len(addresses) >= 1, "Not enough addresses for SHA256 benchmark. Need at least 1."
+
+def setup_sha256(controller, addresses, timeout, nr_addresses, contract_src, contract_name, contract_address=None):
+    """
+    Deploy the hashing contract. Returns the contract instance and address.
+    With the `contract_address` of a previous setup, only its instance is
+    loaded.
+    """
+    if contract_address is not None:
+        print(f"Reusing {contract_name} contract at:", contract_address)
+        return controller.load_contract(contract_src, contract_name, contract_address), contract_address
     # Initialize the SHA256 contract
     owner_priv_key = addresses[0][0]
 
@@ -983,6 +930,7 @@ def benchmark_sha256(controller, addresses, timeout, contract_src, contract_name
     print("Contract deployed at:", contract_address)
     if not isinstance(controller, PolygonController):
         print("Receipt status:", receipt["status"])
+        print(f"We have to wait for a complete block to be mined ({timeout+10} sec)")
         time.sleep(timeout+10)
     else:
         # We have to create a new batch
@@ -991,71 +939,862 @@ def benchmark_sha256(controller, addresses, timeout, contract_src, contract_name
             "values": constructor_args
         }
         controller.set_new_batch(contract_name, params)
-    print(f"We have to wait for a complete block to be mined ({timeout+10} sec)")
     print("====================================================")
+    return contract_instance, contract_address
+
+
+# Transaction types of mixed blocks, and the default weights of a mix
+MIX_TX_TYPES = ["transfers", "erc20", "deploy", "sha256"]
+DEFAULT_MIX = {"transfers": 4, "erc20": 3, "deploy": 1, "sha256": 2}
+
+
+def setup_mixed(controller, addresses, timeout, nr_addresses, contract_address=None):
+    """
+    Set up the contracts of mixed blocks: the ERC20 (with tokens minted to
+    the first `nr_addresses` addresses) and the SHA256 contract. Returns their
+    instances and addresses by transaction type. For Polygon, both contracts
+    are in the genesis of a single new batch.
+    """
+    contract_address = contract_address or {}
+    setups = {
+        "erc20": functools.partial(setup_erc20, controller, addresses, timeout, nr_addresses),
+        "sha256": functools.partial(
+            setup_sha256, controller, addresses, timeout, nr_addresses, "contracts/SHA256.sol", "SHA256"
+        ),
+    }
+    instances = {}
+    contract_addresses = {}
+    if isinstance(controller, PolygonController):
+        combined = controller.combined_new_batch()
+    else:
+        combined = contextlib.nullcontext()
+    with combined:
+        for tx_type, setup in setups.items():
+            instances[tx_type], contract_addresses[tx_type] = setup(contract_address=contract_address.get(tx_type))
+    return instances, contract_addresses
+
+
+def plan_mixed_block(addresses, size, mix, seed, is_different, overlap):
+    """
+    The (type, sender key, recipient address) of every transaction of a mixed
+    block, and the number of transactions of each type. The counts follow the
+    weights of `mix` (largest remainder) and the types are shuffled. With
+    different addresses, transaction i is sent by address i and its recipient
+    is, with probability `overlap`, another sender of the block, or else a
+    fresh address. The same seed always gives the same block.
+    """
+    rng = random.Random(seed)
+    total = sum(mix.values())
+    counts = {t: int(size * mix[t] / total) for t in sorted(mix)}
+    by_remainder = sorted(counts, key=lambda t: size * mix[t] / total - counts[t], reverse=True)
+    for tx_type in by_remainder[:size - sum(counts.values())]:
+        counts[tx_type] += 1
+    types = [t for t in counts for _ in range(counts[t])]
+    rng.shuffle(types)
+
+    txs = []
+    for i, tx_type in enumerate(types):
+        if not is_different:
+            txs.append((tx_type, addresses[0][0], addresses[1][1]))
+            continue
+        if size > 1 and rng.random() < overlap:
+            # Any sender of the block but this one
+            j = rng.randrange(size - 1)
+            recipient = addresses[j + (j >= i)][1]
+        else:
+            recipient = to_checksum_address(rng.getrandbits(160).to_bytes(20, "big"))
+        txs.append((tx_type, addresses[i][0], recipient))
+    return txs, counts
+
+
+def benchmark_mixed_block(
+        controller, addresses, timeout, size, contracts, mix=None, seed=0, overlap=0.0,
+        is_different=False, concurrency=1, repetition=0):
+    instances, contract_addresses = contracts
+    txs, counts = plan_mixed_block(addresses, size, mix or DEFAULT_MIX, seed, is_different, overlap)
+    tasks = []
+    for tx_type, from_priv_key, to_addr in txs:
+        if tx_type == "transfers":
+            task = functools.partial(transfer_task, controller, from_priv_key, to_addr, 1, 21000)
+        elif tx_type == "erc20":
+            task = functools.partial(
+                execute_task, controller, from_priv_key, instances["erc20"],
+                contract_addresses["erc20"], "transfer", [to_addr, 10]
+            )
+        elif tx_type == "deploy":
+            task = functools.partial(deploy_task, controller, from_priv_key, "contracts/Greeter.sol", "Greeter", [10])
+        else:
+            task = functools.partial(
+                execute_task, controller, from_priv_key, instances["sha256"],
+                contract_addresses["sha256"], "random_hash_save", []
+            )
+        tasks.append(task)
+
+    print("=======", f"{size} mixed transaction(s):", ", ".join(f"{n} {t}" for t, n in counts.items() if n), "=======")
+    start = time.time()
+    run_block_tasks(controller, tasks, concurrency)
+    is_same = "same" if not is_different else "different"
+    finish_block(controller, start, timeout, f"gen-mixed_{size}_{is_same}_s{seed}.json", repetition)
+
+###############################################################################
+
+############################## Open-loop Load #################################
+
+def open_loop_schedule(steps):
+    """
+    Compute the send offsets (sec from the start) of an open-loop run. `steps`
+    is a list of [rate, duration] pairs; a constant rate is a single step.
+    Returns the offsets and the step index of every offset.
+    """
+    offsets = []
+    step_ids = []
+    step_start = 0
+    for step_id, (rate, duration) in enumerate(steps):
+        assert rate > 0 and duration > 0, "Open-loop rates and durations must be positive"
+        for i in range(int(rate * duration)):
+            offsets.append(step_start + i / rate)
+            step_ids.append(step_id)
+        step_start += duration
+    return offsets, step_ids
+
+
+def percentile(values, q):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize_open_loop_window(step, records, offered, window_start, window):
+    window_end = window_start + window
+    issued = sum(1 for r in records if r[1] <= window_end)
+    succeeded = sum(1 for r in records if r[3] == 1)
+    last_finished = max((r[2] for r in records), default=window_end)
+    lags = [r[1] - r[0] for r in records]
+    return {
+        "step": step,
+        "offered_tps": offered,
+        "issued_tps": issued / window,
+        "achieved_tps": succeeded / max(last_finished - window_start, window),
+        "txs": len(records),
+        "succeeded": succeeded,
+        "failed": len(records) - succeeded,
+        "lag_mean": sum(lags) / len(lags) if lags else 0,
+        "lag_p99": percentile(lags, 0.99),
+        "lag_max": max(lags, default=0),
+    }
+
+
+def open_loop_summary(records, steps, step_ids, start):
+    """
+    Offered vs achieved rate of an open-loop run, per step and overall.
+    `records` holds (scheduled, started, finished, status) for every tx.
+    """
+    rows = []
+    step_start = start
+    for step_id, (rate, duration) in enumerate(steps):
+        selected = [r for r, s in zip(records, step_ids) if s == step_id]
+        rows.append(summarize_open_loop_window(step_id, selected, rate, step_start, duration))
+        step_start += duration
+    total = sum(duration for _, duration in steps)
+    rows.append(summarize_open_loop_window("all", records, len(records) / total, start, total))
+    return rows
+
+
+def benchmark_open_loop_block(controller, addresses, timeout, steps, make_task, senders, concurrency):
+    """
+    Issue transactions on a fixed schedule, independently of how fast the node
+    answers. Senders are taken round-robin from the first `senders` addresses;
+    a sender is reused only after its previous transaction got a receipt, so
+    that the nonces fetched by the controller stay valid. `concurrency` caps
+    the number of transactions in flight; once it is reached, transactions
+    queue up and the lag between scheduled and actual send time grows.
+    """
+    assert not isinstance(controller, PolygonController), "Open-loop load is not supported for Polygon"
+    assert len(addresses) >= senders + 1, f"Not enough addresses for open-loop load. Need at least {senders + 1}."
+    offsets, step_ids = open_loop_schedule(steps)
+    idle_senders = queue.Queue()
+    for sender in range(senders):
+        idle_senders.put(sender)
+    records = [None] * len(offsets)
+
+    def issue(i, scheduled):
+        sender = idle_senders.get()
+        started = time.time()
+        status = 0
+        try:
+            receipt = traced(make_task(controller, addresses, sender))
+            status = receipt["status"]
+        except Exception as e:
+            print("Error:", e)
+        finally:
+            idle_senders.put(sender)
+        records[i] = (scheduled, started, time.time(), status)
+
+    print("=======", f"Open-loop load ({len(offsets)} txs over {sum(d for _, d in steps)} sec)", "=======")
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, offset in enumerate(offsets):
+            delay = start + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(issue, i, start + offset)
+
+    summary = open_loop_summary(records, steps, step_ids, start)
+    for row in summary:
+        print(
+            f"Step {row['step']}: offered {row['offered_tps']:.2f} tx/s, issued {row['issued_tps']:.2f} tx/s,",
+            f"achieved {row['achieved_tps']:.2f} tx/s, succeeded {row['succeeded']}/{row['txs']},",
+            f"send lag mean {row['lag_mean']:.3f}s p99 {row['lag_p99']:.3f}s max {row['lag_max']:.3f}s"
+        )
+    finish_block(controller, start, timeout, None)
+    return summary
+
+###############################################################################
+
+########################### Benchmark Matrix ##################################
+
+@dataclass
+class Workload:
+    """
+    A benchmark workload that can be instantiated as cells of a matrix.
+
+    `run_block(controller, addresses, timeout, size, is_different, concurrency,
+    setup, repetition, processes)` runs one block, `setup(controller, addresses, timeout,
+    nr_addresses, contract_address=None)` prepares state shared by all the
+    cells of the workload (a deployed contract, returned as its instance and
+    address, or only loaded when given its address), and `required_addresses(size, is_different)`
+    is the number of addresses a block needs. Workloads that can be driven
+    open-loop provide `open_loop_task(controller, addresses, sender, setup)`,
+    which returns the task sending one transaction from `sender`.
+    """
+    run_block: Any
+    required_addresses: Any
+    setup: Any = None
+    open_loop_task: Any = None
+
+
+@dataclass
+class MatrixCell:
+    workload: str
+    size: int
+    is_different: bool = False
+    concurrency: int = 1
+    repetition: int = 0
+    processes: int = 1
+    # Open-loop cells: list of [rate, duration] steps and size of the sender pool
+    steps: Any = None
+    senders: int = 0
+    # Workload-specific keyword arguments of run_block (the mix, seed and
+    # overlap of mixed blocks)
+    options: Any = None
+
+
+def _transfers_cell(controller, addresses, timeout, size, is_different, concurrency, setup, repetition, processes):
+    benchmark_transfers_block(
+        controller, addresses, timeout, size, 1, 21000,
+        is_different=is_different, concurrency=concurrency, repetition=repetition, processes=processes
+    )
+
+
+def _erc20_cell(controller, addresses, timeout, size, is_different, concurrency, setup, repetition, processes):
+    contract_instance, contract_address = setup
+    benchmark_erc20_block(
+        controller, addresses, timeout, size, 10, contract_instance, contract_address,
+        is_different=is_different, concurrency=concurrency, repetition=repetition
+    )
+
+
+def _deploy_cell(controller, addresses, timeout, size, is_different, concurrency, setup, repetition, processes):
+    benchmark_deploy_block(controller, addresses, timeout, size, concurrency=concurrency, repetition=repetition)
+
+
+def _sha256_cell(controller, addresses, timeout, size, is_different, concurrency, setup, repetition, processes):
+    contract_instance, contract_address = setup
+    benchmark_sha256_block(
+        controller, addresses, timeout, size, contract_instance, contract_address,
+        concurrency=concurrency, repetition=repetition
+    )
+
+
+def _mixed_cell(
+        controller, addresses, timeout, size, is_different, concurrency, setup, repetition, processes,
+        mix=None, seed=0, overlap=0.0):
+    benchmark_mixed_block(
+        controller, addresses, timeout, size, setup, mix, seed, overlap,
+        is_different=is_different, concurrency=concurrency, repetition=repetition
+    )
+
+
+def _transfers_open_loop_task(controller, addresses, sender, setup):
+    return functools.partial(transfer_task, controller, addresses[sender][0], addresses[sender+1][1], 1, 21000)
+
+
+def _erc20_open_loop_task(controller, addresses, sender, setup):
+    contract_instance, contract_address = setup
+    return functools.partial(
+        execute_task, controller, addresses[sender][0], contract_instance,
+        contract_address, "transfer", [addresses[sender+1][1], 10]
+    )
+
+
+def _sender_chain_addresses(size, is_different):
+    # a -> b, b -> c, ... needs one more address than transactions
+    return size + 1 if is_different else 2
+
+
+WORKLOADS = {
+    "transfers": Workload(_transfers_cell, _sender_chain_addresses, open_loop_task=_transfers_open_loop_task),
+    "erc20": Workload(_erc20_cell, _sender_chain_addresses, setup_erc20, _erc20_open_loop_task),
+    "deploy": Workload(_deploy_cell, lambda size, is_different: size),
+    "sha256": Workload(
+        _sha256_cell, lambda size, is_different: 1,
+        functools.partial(setup_sha256, contract_src="contracts/SHA256.sol", contract_name="SHA256")
+    ),
+    "precompilesha256": Workload(
+        _sha256_cell, lambda size, is_different: 1,
+        functools.partial(setup_sha256, contract_src="contracts/KeccakPrecompile.sol", contract_name="KeccakPrecompile")
+    ),
+    "mixed": Workload(_mixed_cell, lambda size, is_different: max(size, 2) if is_different else 2, setup_mixed),
+}
+
+# The matrices run by --benchmark
+BENCHMARK_MATRICES = {
+    "transfers": [
+        {"workload": "transfers", "sizes": [1, 10, 100, 200], "addresses": "same"},
+        {"workload": "transfers", "sizes": [10, 100, 200], "addresses": "different"},
+    ],
+    "erc20": [
+        {"workload": "erc20", "sizes": [1, 10, 100, 200], "addresses": "same"},
+        {"workload": "erc20", "sizes": [10, 100, 200], "addresses": "different"},
+    ],
+    "deploy": [
+        {"workload": "deploy", "sizes": [1, 10, 100, 200]},
+    ],
+    "sha256": [
+        {"workload": "sha256", "sizes": [1, 10, 30]},
+    ],
+    "precompilesha256": [
+        {"workload": "precompilesha256", "sizes": [1, 10, 30]},
+    ],
+    "maxethtransfers": [
+        {"workload": "transfers", "sizes": [498, 996, 2490, 4980], "addresses": "different", "concurrency": 32},
+    ],
+    "mixed": [
+        {"workload": "mixed", "sizes": [10, 100, 200], "addresses": "different", "overlap": 0.5},
+    ],
+}
+
+
+def load_matrix(path):
+    """
+    Load a matrix spec file. The spec is either a list of workload entries or
+    an object with a "workloads" list and an optional "timeout".
+    """
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                print("Error: PyYAML is required to read YAML matrix specs")
+                sys.exit(1)
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    if isinstance(spec, list):
+        spec = {"workloads": spec}
+    return spec["workloads"], spec.get("timeout")
+
+
+def expand_matrix(workloads, nr_addresses, default_processes=1):
+    """
+    Expand the workload entries of a spec into the list of cells to run.
+    Each entry has a "workload", a list of "sizes", and optionally an
+    "addresses" strategy (same/different), a "concurrency" and a number of
+    "repetitions". Transfers can be sharded across worker "processes"
+    (default `default_processes`), each running "concurrency" threads. Open-loop entries replace "sizes" with either a "rate"
+    (tx/s) and a "duration" (sec), or a "ramp" of [rate, duration] steps, and
+    may limit the sender pool with "senders". Mixed entries may set the
+    weights of each transaction type ("mix"), a "seed" and the "overlap"
+    between senders and recipients (see plan_mixed_block).
+    """
+    cells = []
+    for entry in workloads:
+        name = entry["workload"]
+        assert name in WORKLOADS, f"Unknown workload {name}. Supported: {', '.join(WORKLOADS)}"
+        strategy = entry.get("addresses", "same")
+        assert strategy in ("same", "different"), f"Unknown address strategy {strategy}"
+        steps = entry.get("ramp")
+        if "rate" in entry:
+            steps = [[entry["rate"], entry["duration"]]]
+        if steps:
+            assert WORKLOADS[name].open_loop_task is not None, f"Workload {name} cannot be driven open-loop"
+            steps = [[float(rate), float(duration)] for rate, duration in steps]
+            senders = int(entry.get("senders", nr_addresses - 1))
+            assert senders >= 1, "An open-loop cell needs at least one sender"
+            size = len(open_loop_schedule(steps)[0])
+            # By default every sender can have a transaction in flight
+            concurrency = int(entry.get("concurrency", senders))
+        else:
+            senders = 0
+            concurrency = int(entry.get("concurrency", 1))
+        assert concurrency >= 1, "concurrency must be at least 1"
+        processes = 1
+        if name == "transfers" and not steps:
+            processes = int(entry.get("processes", default_processes))
+        assert processes >= 1, "processes must be at least 1"
+        assert processes == 1 or name == "transfers", "Only transfers can be sharded across processes"
+        options = None
+        if name == "mixed":
+            mix = entry.get("mix", DEFAULT_MIX)
+            assert mix and all(t in MIX_TX_TYPES for t in mix), \
+                f"Unknown transaction type in mix. Supported: {', '.join(MIX_TX_TYPES)}"
+            assert all(w >= 0 for w in mix.values()) and sum(mix.values()) > 0, \
+                "Mix weights must be non-negative and not all zero"
+            overlap = float(entry.get("overlap", 0))
+            assert 0 <= overlap <= 1, "overlap must be between 0 and 1"
+            options = {"mix": mix, "seed": int(entry.get("seed", 0)), "overlap": overlap}
+        for repetition in range(int(entry.get("repetitions", 1))):
+            if steps:
+                cells.append(MatrixCell(
+                    name, size, True, concurrency, repetition, steps=steps, senders=senders
+                ))
+                continue
+            for size in entry["sizes"]:
+                cells.append(MatrixCell(
+                    name, int(size), strategy == "different", concurrency, repetition, processes=processes,
+                    options=options
+                ))
+    return cells
+
+
+def block_record(cell, recorder):
+    """
+    Results database record (see results_db.py) of a benchmark cell.
+    """
+    blocks = [tx["block"] for tx in recorder.txs if tx["block"] is not None]
+    batches = [tx["batch"] for tx in recorder.txs if tx["batch"] is not None]
+    succeeded = sum(1 for tx in recorder.txs if tx["status"] == 1)
+    gas = [tx["gas_used"] for tx in recorder.txs if tx.get("gas_used") is not None]
+    return {
+        "cell": recorder.name,
+        "workload": cell.workload,
+        "size": cell.size,
+        "addresses": "different" if cell.is_different else "same",
+        "concurrency": cell.concurrency,
+        "processes": cell.processes,
+        "repetition": cell.repetition,
+        "elapsed": recorder.elapsed,
+        "txs": len(recorder.txs),
+        "succeeded": succeeded,
+        "failed": len(recorder.txs) - succeeded,
+        "gas_used": sum(gas) if gas else None,
+        "first_block": min(blocks, default=None),
+        "last_block": max(blocks, default=None),
+        "first_batch": min(batches, default=None),
+        "last_batch": max(batches, default=None),
+        "config": dataclasses.asdict(cell),
+    }
+
+
+def run_cell(controller, addresses, timeout, cell, state, label):
+    workload = WORKLOADS[cell.workload]
+    if cell.steps:
+        print("=======", f"{label}: {cell.workload} open-loop {cell.steps}",
+              f"({cell.senders} senders, concurrency {cell.concurrency}, repetition {cell.repetition})", "=======")
+        benchmark_open_loop_block(
+            controller, addresses, timeout, cell.steps,
+            functools.partial(workload.open_loop_task, setup=state), cell.senders, cell.concurrency
+        )
+    else:
+        is_same = "different" if cell.is_different else "same"
+        print("=======", f"{label}: {cell.workload} {cell.size} {is_same}",
+              f"(processes {cell.processes}, concurrency {cell.concurrency}, repetition {cell.repetition})", "=======")
+        workload.run_block(
+            controller, addresses, timeout, cell.size, cell.is_different,
+            cell.concurrency, state, cell.repetition, cell.processes, **(cell.options or {})
+        )
 
-    print("=======", "Benchmarking hashes", "=======")
-    benchmark_sha256_block(controller, addresses, timeout, 1, contract_instance, contract_address)
-    benchmark_sha256_block(controller, addresses, timeout, 10, contract_instance, contract_address)
-    benchmark_sha256_block(controller, addresses, timeout, 30, contract_instance, contract_address)
-    print("============================")
+
+def save_checkpoint(checkpoint_file, checkpoint):
+    # Write to a temporary file first so that a crash never leaves a partial
+    # checkpoint behind
+    with open(checkpoint_file + ".tmp", 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(checkpoint_file + ".tmp", checkpoint_file)
+
+
+def load_checkpoint(checkpoint_file, workloads, addresses):
+    assert os.path.exists(checkpoint_file), f"No checkpoint to resume from at {checkpoint_file}"
+    with open(checkpoint_file, 'r') as f:
+        checkpoint = json.load(f)
+    assert checkpoint["workloads"] == json.loads(json.dumps(workloads)), \
+        "The benchmark matrix differs from the one of the checkpointed run"
+    assert checkpoint["first_address"] == addresses[0][1], \
+        "The addresses differ from the ones of the checkpointed run"
+    recorders = []
+    for saved in checkpoint["recorders"]:
+        recorder = CellRecorder(saved["name"])
+        recorder.txs = saved["txs"]
+        recorder.elapsed = saved["elapsed"]
+        recorders.append(recorder)
+    print(f"Resuming from {checkpoint_file}: {len(checkpoint['completed'])} cell(s) done,",
+          f"setup of {', '.join(checkpoint['setups']) or 'no workload'} done")
+    return checkpoint, recorders
+
+
+def run_matrix(
+        controller, addresses, timeout, workloads, run_dir=None, processes=1, results_db=None, resume=False,
+        profiler=None):
+    """
+    Run every cell of a benchmark matrix. The setup of each workload runs
+    once, right before its first cell, and is reused by all its cells. For
+    live nodes, the lifecycle of every transaction is recorded and the
+    latency report of the run is written to `run_dir`. With a `results_db`
+    connection, every cell is also stored as a block of the run named after
+    `run_dir`.
+
+    For live nodes, `run_dir` also holds a checkpoint, updated after every
+    setup and every cell, with the deployed contracts and the finished cells.
+    With `resume`, finished cells are skipped and setups are reused. Nonces
+    are read from the node, so they need no checkpointing.
+
+    With a `profiler` (see BlockProfiler), every cell is profiled, including
+    the generation of the Polygon vectors.
+    """
+    global _RECORDER
+    cells = expand_matrix(workloads, len(addresses), processes)
+    needed = {}
+    for cell in cells:
+        if cell.steps:
+            required = cell.senders + 1
+        else:
+            required = WORKLOADS[cell.workload].required_addresses(cell.size, cell.is_different)
+        needed[cell.workload] = max(needed.get(cell.workload, 0), required)
+    max_needed = max(needed.values(), default=0)
+    assert len(addresses) >= max_needed, f"Not enough addresses for the benchmark matrix. Need at least {max_needed}."
+
+    setups = {}
+    recorders = []
+    checkpoint_file = None
+    checkpoint = {
+        "workloads": workloads, "first_address": addresses[0][1] if len(addresses) else None,
+        "setups": {}, "completed": [], "recorders": [],
+    }
+    if run_dir is not None and not isinstance(controller, PolygonController):
+        os.makedirs(run_dir, exist_ok=True)
+        checkpoint_file = os.path.join(run_dir, "checkpoint.json")
+        if resume:
+            checkpoint, recorders = load_checkpoint(checkpoint_file, workloads, addresses)
+    else:
+        assert not resume, "Only runs against live nodes can be resumed"
+
+    print("=======", f"Benchmark matrix ({len(cells)} cells)", "=======")
+    names = cell_names(cells)
+    for counter, cell in enumerate(cells):
+        workload = WORKLOADS[cell.workload]
+        cell_key = f"{counter}:{names[counter]}"
+        if cell_key in checkpoint["completed"]:
+            print("=======", f"Cell {counter + 1}/{len(cells)}: {names[counter]} already done", "=======")
+            continue
+        if cell.workload not in setups:
+            # Polygon controllers accumulate the transactions of the batch, so
+            # every workload starts from a clean copy of the initial controller
+            base = copy.deepcopy(controller) if isinstance(controller, PolygonController) else controller
+            state = None
+            saved = checkpoint["setups"].get(cell.workload)
+            if workload.setup is not None and saved is not None and saved["nr_addresses"] >= needed[cell.workload]:
+                state = workload.setup(base, addresses, timeout, needed[cell.workload], saved["contract_address"])
+            elif workload.setup is not None:
+                state = workload.setup(base, addresses, timeout, needed[cell.workload])
+                if checkpoint_file is not None:
+                    checkpoint["setups"][cell.workload] = {
+                        "contract_address": state[1], "nr_addresses": needed[cell.workload]
+                    }
+                    save_checkpoint(checkpoint_file, checkpoint)
+            setups[cell.workload] = (base, state)
+        base, state = setups[cell.workload]
+        # ... and every cell from a clean copy of the workload's setup
+        cell_controller = copy.deepcopy(base) if isinstance(controller, PolygonController) else base
+        if run_dir is not None and not isinstance(controller, PolygonController):
+            _RECORDER = CellRecorder(names[counter])
+            recorders.append(_RECORDER)
+
+        with profile_block(profiler, names[counter], _RECORDER):
+            run_cell(cell_controller, addresses, timeout, cell, state, f"Cell {counter + 1}/{len(cells)}")
+        if _RECORDER is not None:
+            _RECORDER.resolve_batches(controller)
+            if results_db is not None:
+                results_db_module.add_block(results_db, os.path.basename(run_dir), block_record(cell, _RECORDER))
+            checkpoint["completed"].append(cell_key)
+            checkpoint["recorders"].append({"name": _RECORDER.name, "txs": _RECORDER.txs, "elapsed": _RECORDER.elapsed})
+            save_checkpoint(checkpoint_file, checkpoint)
+            _RECORDER = None
+    print("=================================")
+    if recorders:
+        write_latency_report(run_dir, recorders)
 
 ###############################################################################
 
+############################# Saturation Search ###############################
+
+def evaluate_probe(recorder, slo):
+    """
+    Whether a probe block passed: no transaction failed and either all of them
+    landed in a single batch (a single block on nodes without batches) or,
+    with an `slo`, the p99 end-to-end latency stayed within it.
+    """
+    txs = recorder.txs
+    succeeded = sum(1 for tx in txs if tx["status"] == 1)
+    batches = {tx["batch"] if tx["batch"] is not None else ("block", tx["block"]) for tx in txs}
+    histogram = recorder.histograms().get("end_to_end")
+    p99 = histogram.percentile(0.99) if histogram else None
+    passed = bool(txs) and succeeded == len(txs)
+    if slo is None:
+        passed = passed and len(batches) == 1
+    else:
+        passed = passed and p99 is not None and p99 <= slo
+    return {
+        "passed": passed,
+        "succeeded": succeeded,
+        "failed": len(txs) - succeeded,
+        "batches": len(batches),
+        "elapsed": recorder.elapsed,
+        "tps": succeeded / recorder.elapsed if recorder.elapsed else None,
+        "p99_end_to_end": p99,
+    }
+
+
+def saturation_search(
+        controller, addresses, timeout, workload_name, start, maximum, is_different=True,
+        concurrency=1, processes=1, slo=None, tolerance=0.05, run_dir=None, results_db=None, profiler=None):
+    """
+    Find the largest block size of a workload that still passes (see
+    evaluate_probe): double the size from `start` until a probe fails or
+    `maximum` is reached, then bisect between the last passing and the first
+    failing size until they are within `tolerance`. A probe that raises
+    counts as failed. Returns the knee (largest passing size, 0 if none) and
+    the curve of all probes.
+    """
+    assert not isinstance(controller, PolygonController), "Saturation search needs a live node"
+    workload = WORKLOADS[workload_name]
+    while maximum > start and workload.required_addresses(maximum, is_different) > len(addresses):
+        maximum -= 1
+    assert workload.required_addresses(start, is_different) <= len(addresses), \
+        f"Not enough addresses for a {workload_name} block of {start}"
+
+    state = None
+    if workload.setup is not None:
+        state = workload.setup(controller, addresses, timeout, workload.required_addresses(maximum, is_different))
+
+    curve = []
+    recorders = []
+
+    def probe(size):
+        global _RECORDER
+        cell = MatrixCell(workload_name, size, is_different, concurrency, len(curve), processes)
+        _RECORDER = CellRecorder(cell_name(cell))
+        recorders.append(_RECORDER)
+        try:
+            with profile_block(profiler, cell_name(cell), _RECORDER):
+                run_cell(controller, addresses, timeout, cell, state, f"Probe {len(curve) + 1}")
+        except Exception as e:
+            print(f"Probe of {size} failed: {e!r}")
+        _RECORDER.resolve_batches(controller)
+        if results_db is not None:
+            results_db_module.add_block(results_db, os.path.basename(run_dir), block_record(cell, _RECORDER))
+        point = dict(size=size, **evaluate_probe(_RECORDER, slo))
+        _RECORDER = None
+        curve.append(point)
+        p99 = f"{point['p99_end_to_end']:.3f}s" if point["p99_end_to_end"] is not None else "-"
+        print(f"Probe of {size}: {'passed' if point['passed'] else 'failed'} ({point['failed']} failed tx(s),",
+              f"{point['batches']} batch(es), p99 {p99})")
+        return point["passed"]
+
+    # Doubling: stop at the first failure
+    passing, failing = 0, None
+    size = start
+    while failing is None:
+        if probe(size):
+            passing = size
+            if size >= maximum:
+                break
+            size = min(size * 2, maximum)
+        else:
+            failing = size
+
+    # Bisection between the last passing and the first failing size
+    while failing is not None and failing - passing > max(1, int(tolerance * max(passing, 1))):
+        size = (passing + failing) // 2
+        if probe(size):
+            passing = size
+        else:
+            failing = size
+
+    print("=======", f"Saturation search of {workload_name}", "=======")
+    print(f"{'size':>8} {'passed':>7} {'failed':>7} {'batches':>8} {'tps':>10} {'p99':>10}")
+    for point in sorted(curve, key=lambda p: p["size"]):
+        tps = f"{point['tps']:.1f}" if point["tps"] is not None else "-"
+        p99 = f"{point['p99_end_to_end']:.3f}" if point["p99_end_to_end"] is not None else "-"
+        print(f"{point['size']:>8} {str(point['passed']):>7} {point['failed']:>7} {point['batches']:>8} {tps:>10} {p99:>10}")
+    print(f"Knee: {passing} tx(s) per block" + (f" (first failing size {failing})" if failing else ""))
+    passed = [p for p in curve if p["passed"] and p["tps"] is not None]
+    if passed:
+        peak = max(passed, key=lambda p: p["tps"])
+        print(f"Peak throughput of a passing block: {peak['tps']:.1f} tx/s at {peak['size']} tx(s)")
+
+    if run_dir is not None:
+        os.makedirs(run_dir, exist_ok=True)
+        with open(os.path.join(run_dir, "saturation.csv"), 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(curve[0]))
+            writer.writeheader()
+            writer.writerows(curve)
+        write_latency_report(run_dir, recorders)
+    return passing, curve
+
+###############################################################################
+
+# Backends of nodes reachable over RPC
+LIVE_NODES = [name for name, (_, _, url, _) in BACKENDS.items() if url is not None]
+
+
+def connect_live_node(node, endpoints=None, routing="sender"):
+    """
+    Controller of a live node, talking to its default URL or to `endpoints`
+    (see RoutingProvider).
+    """
+    controller_cls, node_url, chain_id = load_backend(node)
+    return controller_cls(endpoints or node_url, chain_id, routing)
+
+
+def print_routing_summary(controller):
+    # Only a RoutingProvider has a summary
+    if not isinstance(controller, PolygonController) and hasattr(controller.w3.provider, "print_summary"):
+        controller.w3.provider.print_summary()
+
+
+def load_addresses(path):
+    """
+    Load the [private_key, address] rows written by gen_wallets.py, either from
+    its CSV or, lazily, from its binary wallet file.
+    """
+    if path.endswith(".bin"):
+        # gen_wallets loads eth_account, which CSV wallets do not need
+        from gen_wallets import WalletFile
+        return WalletFile(path)
+    with open(path, 'r') as f:
+        return [row for row in csv.reader(f)]
+
+
 def main(args):
     print("Connect to node")
-    if args.benchmark:
-        with open(args.addresses, 'r') as f:
-            reader = csv.reader(f)
-            addresses = [row for row in reader]
-    if args.node == "geth":
-        node_url = "http://0.0.0.0:8547"  
-        chain_id = 1337
-        controller = EthereumController(node_url, chain_id)
-    elif args.node == "zksync":
-        node_url = "http://localhost:3050"  
-        chain_id = 270
-        controller = ZkSyncController(node_url, chain_id)
-    elif args.node == "zksync-in-memory":
-        node_url = "http://127.0.0.1:8011" 
-        chain_id = 260
-        controller = ZkSyncController(node_url, chain_id)
+    if args.benchmark or args.matrix or args.search:
+        addresses = load_addresses(args.addresses)
+    if args.node in LIVE_NODES:
+        controller = connect_live_node(args.node, args.endpoints, args.routing)
     elif args.node == "polygon":
-        node_url = None
-        chain_id = 1000
+        controller_cls, node_url, chain_id = load_backend(args.node)
         # Check if _CURRENT_DIR/polygon_bench exists
         if not os.path.exists(os.path.join(_CURRENT_DIR, "polygon_bench")):
             os.mkdir(os.path.join(_CURRENT_DIR, "polygon_bench"))
-        controller = PolygonController(node_url, chain_id, addresses, gen_template=True)
+        controller = controller_cls(node_url, chain_id, addresses, gen_template=True)
     else:
         print("Error: Node {node} is not supported")
         sys.exit(1)
     if args.transactions:
         assert args.node != "polygon", "Transactions are not supported for Polygon"
-        execute_txs(controller, args.transactions)
+        execute_txs(controller, args.transactions, args.tx_concurrency)
+        print_routing_summary(controller)
         sys.exit() 
-    if args.benchmark == "transfers":
-        benchmark_transfers(controller, addresses, args.timeout)
-    elif args.benchmark == "erc20":
-        benchmark_erc20(controller, addresses, args.timeout)
-    elif args.benchmark == "deploy":
-        benchmark_deploy(controller, addresses, args.timeout)
-    elif args.benchmark == "sha256":
-        benchmark_sha256(controller, addresses, args.timeout, "contracts/SHA256.sol", "SHA256")
-    elif args.benchmark == "precompilesha256":
-        benchmark_sha256(controller, addresses, args.timeout, "contracts/KeccakPrecompile.sol", "KeccakPrecompile")
-    elif args.benchmark == "maxethtransfers":
-        benchmark_transfers_max(controller, addresses, args.timeout)
+    run_dir = args.resume or os.path.join(args.results_dir, time.strftime("%Y%m%d-%H%M%S"))
+    profiler = None
+    if args.profile:
+        profiler = BlockProfiler(
+            os.path.join(run_dir, "profile"), args.profile, args.profile_interval / 1000, args.profile_memory
+        )
+    if args.search:
+        results_db = None
+        if args.results_db:
+            results_db = results_db_module.connect(args.results_db)
+            results_db_module.add_run(results_db, os.path.basename(run_dir), args.node, f"search-{args.search}", {
+                "workload": args.search, "start": args.search_start, "max": args.search_max,
+                "slo": args.search_slo, "tolerance": args.search_tolerance, "timeout": args.timeout,
+                "addresses": args.addresses, "provider_url": controller.provider_url, "routing": args.routing,
+            })
+        saturation_search(
+            controller, addresses, args.timeout, args.search, args.search_start, args.search_max,
+            args.search_addresses == "different", args.search_concurrency, args.processes,
+            args.search_slo, args.search_tolerance, run_dir, results_db, profiler
+        )
+        print_routing_summary(controller)
+        return
+    if args.matrix:
+        workloads, timeout = load_matrix(args.matrix)
+        timeout = timeout or args.timeout
+    else:
+        workloads, timeout = BENCHMARK_MATRICES[args.benchmark], args.timeout
+    results_db = None
+    if args.results_db and args.node in LIVE_NODES:
+        results_db = results_db_module.connect(args.results_db)
+        results_db_module.add_run(results_db, os.path.basename(run_dir), args.node, args.benchmark or args.matrix, {
+            "workloads": workloads,
+            "timeout": timeout,
+            "processes": args.processes,
+            "addresses": args.addresses,
+            "provider_url": controller.provider_url,
+            "routing": args.routing,
+        })
+    run_matrix(
+        controller, addresses, timeout, workloads, run_dir, args.processes, results_db, bool(args.resume), profiler
+    )
+    print_routing_summary(controller)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('--node', choices=["geth", "zksync", "polygon"], required=True)
+    parser.add_argument('--node', choices=list(BACKENDS), required=True)
     parser.add_argument('--transactions')
-    parser.add_argument('--benchmark', choices=["transfers", "erc20", "deploy", "sha256", "precompilesha256", "maxethtransfers"])
+    # Number of independent transactions of --transactions in flight at once
+    parser.add_argument('--tx-concurrency', default=1, type=int)
+    parser.add_argument('--benchmark', choices=list(BENCHMARK_MATRICES))
+    # JSON/YAML spec of the workloads, sizes, address strategies, concurrency
+    # and repetitions to run
+    parser.add_argument('--matrix')
+    # Saturation search: largest block of a workload whose transactions all
+    # land in one batch (or, with --search-slo, stay within a p99 latency)
+    parser.add_argument('--search', choices=list(WORKLOADS))
+    parser.add_argument('--search-start', default=100, type=int)
+    parser.add_argument('--search-max', default=10000, type=int)
+    parser.add_argument('--search-addresses', choices=["same", "different"], default="different")
+    parser.add_argument('--search-concurrency', default=32, type=int)
+    parser.add_argument('--search-slo', type=float)
+    parser.add_argument('--search-tolerance', default=0.05, type=float)
     # Addresses are pk, address
     parser.add_argument('--addresses', default="addresses.csv")
+    # RPC endpoints of the node to use instead of its default URL (e.g. several
+    # API nodes in front of one sequencer), and how requests are spread over them
+    parser.add_argument('--endpoints', nargs='+')
+    parser.add_argument('--routing', choices=ROUTING_POLICIES, default="sender")
     parser.add_argument('--timeout', default=180, type=int)
+    # Number of worker processes sharding the transfers of a block (e.g. for
+    # maxethtransfers), unless the matrix sets "processes"
+    parser.add_argument('--processes', default=1, type=int)
+    # Per-run latency reports are written to a timestamped directory in here
+    parser.add_argument('--results-dir', default=os.path.join(_CURRENT_DIR, "results"))
+    # SQLite database every benchmark block of a live node is recorded in
+    # (query it with results_db.py); an empty value disables it
+    parser.add_argument('--results-db', default=results_db_module.DEFAULT_RESULTS_DB)
+    # Run directory of an interrupted run (same --benchmark/--matrix and
+    # --addresses) to continue from its checkpoint
+    parser.add_argument('--resume')
+    # Profile every benchmark block into <run dir>/profile: "sample" samples
+    # the stacks of all threads (collapsed stacks for flamegraphs), "cprofile"
+    # runs cProfile on the thread running the block
+    parser.add_argument('--profile', nargs='?', const="sample", choices=["sample", "cprofile"])
+    # Sampling interval (ms) of --profile sample
+    parser.add_argument('--profile-interval', default=5, type=float)
+    # Also record the allocations of every block with tracemalloc
+    parser.add_argument('--profile-memory', action='store_true')
     args = parser.parse_args()
-    assert args.transactions or args.benchmark
-    assert not (args.transactions and args.benchmark)
+    assert sum(1 for mode in (args.transactions, args.benchmark, args.matrix, args.search) if mode) == 1, \
+        "Exactly one of --transactions, --benchmark, --matrix and --search is required"
     main(args)
\ No newline at end of file
@@ -0,0 +1,68 @@
+import pytest
+
+from polygon_counters import COUNTER_LIMITS, max_txs, parse_counters, workload_key
+
+
+def test_parse_counters_cpp_executor():
+    log = (
+        "ExecutorServiceImpl::ProcessBatch() returns cnt_steps=45000 cnt_keccak_hashes=8 "
+        "cnt_poseidon_hashes=400 cnt_poseidon_paddings=100 cnt_arithmetics=50 cnt_binaries=500 "
+        "cnt_mem_aligns=10 cnt_sha256_hashes=0"
+    )
+    assert parse_counters(log) == {
+        "steps": 45000, "keccak": 8, "poseidon": 400, "padding": 100,
+        "arith": 50, "binary": 500, "mem_align": 10, "sha256": 0,
+    }
+
+
+def test_parse_counters_js_executor():
+    log = '{ cntArith: 20, cntBinary: 30, "cntKeccakF": 4, cntMemAlign: 0, cntPaddingPG: 7, ' \
+          'cntPoseidonG: 9, cntSteps: 10000, cntSha256F: 1 }'
+    assert parse_counters(log) == {
+        "arith": 20, "binary": 30, "keccak": 4, "mem_align": 0,
+        "padding": 7, "poseidon": 9, "steps": 10000, "sha256": 1,
+    }
+
+
+def test_parse_counters_last_value_wins():
+    assert parse_counters("cntSteps=10\ncntSteps=25\ncntUnknown=3") == {"steps": 25}
+
+
+def test_parse_counters_none():
+    assert parse_counters("Prover done") == {}
+
+
+@pytest.mark.parametrize("vector, key", [
+    ("polygon_bench/498_different_transfers.json", "N_different_transfers"),
+    ("10_same_transfers_r1.json", "N_same_transfers_r1"),
+    ("gen-100_same_erc20_transfers.json", "gen-N_same_erc20_transfers"),
+    ("gen-deploy_10.json", "gen-deploy_N"),
+    ("gen-mixed_10_different_s0.json", "gen-mixed_N_different_s0"),
+    ("gen-0x5FbDB2315678afecb367f032d93F642f64180aa3_30.json", "gen-0x5FbDB2315678afecb367f032d93F642f64180aa3_N"),
+])
+def test_workload_key(vector, key):
+    assert workload_key(vector) == key
+
+
+def test_workload_key_groups_sizes():
+    assert workload_key("10_different_transfers.json") == workload_key("4980_different_transfers.json")
+
+
+def report(txs, steps, keccak):
+    return {"txs": txs, "counters": {"steps": steps, "keccak": keccak}}
+
+
+def test_max_txs_bottleneck():
+    # steps: 30000 + 1500 per tx, keccak: 5 + 1 per tx
+    reports = [report(n, 30000 + 1500 * n, 5 + n) for n in (10, 100, 200)]
+    assert max_txs(reports, COUNTER_LIMITS) == ((COUNTER_LIMITS["keccak"] - 5), "keccak")
+    assert max_txs(reports, {"steps": COUNTER_LIMITS["steps"]}) == ((COUNTER_LIMITS["steps"] - 30000) // 1500, "steps")
+
+
+def test_max_txs_needs_two_sizes():
+    assert max_txs([report(10, 45000, 15), report(10, 45000, 15)], COUNTER_LIMITS) is None
+
+
+def test_max_txs_ignores_flat_counters():
+    reports = [report(n, 1000, 5 + n) for n in (10, 20)]
+    assert max_txs(reports, {"steps": 2000, "keccak": 105}) == (100, "keccak")
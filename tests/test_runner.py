@@ -0,0 +1,175 @@
+import json
+import threading
+
+import pytest
+
+from runner import TxDependencies, compile_reference, compile_tx, execute_txs
+
+STATE = {
+    "accounts": {"pv": {"alice": "0xa"}, "address": {"alice": "0xA"}},
+    "contracts": {"Greeter": {"address": "0xC"}},
+    "list": [1, 2, 3],
+}
+
+
+@pytest.mark.parametrize("reference, value", [
+    ('["accounts"]["pv"]["alice"]', "0xa"),
+    ("['accounts']['address']['alice']", "0xA"),
+    ('data["contracts"]["Greeter"]["address"]', "0xC"),
+    (' data[ "contracts" ][ "Greeter" ]["address"] ', "0xC"),
+    ('["list"][0]', 1),
+    ('["list"][-1]', 3),
+])
+def test_compile_reference(reference, value):
+    assert compile_reference(reference)(STATE) == value
+
+
+@pytest.mark.parametrize("reference", [
+    "",
+    "data",
+    "foo",
+    '["a"]x',
+    '["a"]["b"',
+    'x["a"]',
+    '["a"].b',
+    '[len("a")]',
+    '["a"] + ["b"]',
+])
+def test_compile_reference_invalid(reference):
+    with pytest.raises(AssertionError):
+        compile_reference(reference)
+
+
+def test_compile_reference_is_resolved_late():
+    getter = compile_reference('["contracts"]["Token"]["address"]')
+    state = {"contracts": {}}
+    with pytest.raises(KeyError):
+        getter(state)
+    state["contracts"]["Token"] = {"address": "0xT"}
+    assert getter(state) == "0xT"
+
+
+def transfer_tx(tx_id, sender, depends_on=None):
+    tx = {
+        "id": tx_id, "type": "transfer",
+        "args": {
+            "from_priv_key": f'["accounts"]["pv"]["{sender}"]', "to_addr": '["accounts"]["address"]["bob"]',
+            "amount": 1, "gas": 21000,
+        },
+    }
+    if depends_on:
+        tx["depends_on"] = depends_on
+    return tx
+
+
+def deploy_tx(tx_id, sender, contract="Greeter"):
+    return {
+        "id": tx_id, "type": "deploy_contract",
+        "args": {"contract_name": contract, "from_priv_key": f'["accounts"]["pv"]["{sender}"]', "constructor_args": []},
+    }
+
+
+def execute_tx(tx_id, sender, contract="Greeter"):
+    return {
+        "id": tx_id, "type": "execute",
+        "args": {
+            "from_priv_key": f'["accounts"]["pv"]["{sender}"]',
+            "contract_instance": f'["contracts"]["{contract}"]["instance"]',
+            "contract_address": f'["contracts"]["{contract}"]["address"]',
+            "func_name": "greet", "func_args": [], "call": False,
+        },
+    }
+
+
+SPEC_STATE = {
+    "accounts": {"pv": {"alice": "0xa", "bob": "0xb", "carol": "0xc"}, "address": {"bob": "0xB"}},
+    "contracts": {"Greeter": {"path": "contracts/Greeter.sol"}},
+}
+
+
+def dependencies_of(txs):
+    dependencies = TxDependencies()
+    return [dependencies.add(i, compile_tx(tx), SPEC_STATE, tx.get("depends_on", [])) for i, tx in enumerate(txs)]
+
+
+def test_dependencies_sender_order():
+    assert dependencies_of([
+        transfer_tx("t0", "alice"),
+        transfer_tx("t1", "bob"),
+        transfer_tx("t2", "alice"),
+        transfer_tx("t3", "alice"),
+    ]) == [set(), set(), {0}, {2}]
+
+
+def test_dependencies_contract_deployment():
+    assert dependencies_of([
+        deploy_tx("d0", "alice"),
+        execute_tx("e1", "bob"),
+        execute_tx("e2", "carol"),
+        # The redeployment waits for the users of the previous deployment
+        deploy_tx("d3", "bob"),
+        execute_tx("e4", "carol"),
+    ]) == [set(), {0}, {0}, {0, 1, 2}, {2, 3}]
+
+
+def test_dependencies_depends_on():
+    assert dependencies_of([
+        transfer_tx("t0", "alice"),
+        transfer_tx("t1", "bob", depends_on=["t0"]),
+    ]) == [set(), {0}]
+
+
+@pytest.mark.parametrize("depends_on", [["missing"], ["t1"]])
+def test_dependencies_unknown_depends_on(depends_on):
+    with pytest.raises(AssertionError):
+        dependencies_of([transfer_tx("t0", "alice", depends_on=depends_on), transfer_tx("t1", "bob")])
+
+
+class RecordingController:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_account(self, pv):
+        return None, None, "0x" + pv[2:].upper()
+
+    def record(self, call):
+        with self.lock:
+            self.calls.append(call)
+
+    def transfer(self, from_priv_key, to_addr, amount, gas):
+        self.record(("transfer", from_priv_key, to_addr))
+        return {"status": 1}
+
+    def deploy_contract(self, contract_src, contract_name, from_priv_key, constructor_args, is_yul):
+        self.record(("deploy", contract_name, from_priv_key))
+        return {"status": 1}, f"instance-{contract_name}", f"address-{contract_name}", {}
+
+    def execute(self, from_priv_key, contract_instance, contract_address, func_name, func_args, call, amount):
+        self.record(("execute", from_priv_key, contract_address))
+        return {"status": 1}, None
+
+
+@pytest.mark.parametrize("extension", ["json", "jsonl"])
+def test_execute_txs_in_spec_order(tmp_path, extension):
+    txs = [
+        transfer_tx("t0", "alice"),
+        transfer_tx("t1", "bob"),
+        deploy_tx("d2", "carol"),
+        execute_tx("e3", "alice"),
+        transfer_tx("t4", "carol"),
+    ]
+    spec = tmp_path / f"spec.{extension}"
+    if extension == "json":
+        spec.write_text(json.dumps(dict(SPEC_STATE, transactions=txs)))
+    else:
+        spec.write_text("\n".join(json.dumps(entry) for entry in [SPEC_STATE] + txs))
+    controller = RecordingController()
+    execute_txs(controller, str(spec), concurrency=1)
+    assert controller.calls == [
+        ("transfer", "0xa", "0xB"),
+        ("transfer", "0xb", "0xB"),
+        ("deploy", "Greeter", "0xc"),
+        ("execute", "0xa", "address-Greeter"),
+        ("transfer", "0xc", "0xB"),
+    ]